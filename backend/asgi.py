@@ -0,0 +1,227 @@
+# --- START OF FILE backend/asgi.py ---
+
+import os
+import sys
+import asyncio
+import warnings
+from contextlib import asynccontextmanager
+
+import anyio
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+with warnings.catch_warnings():
+    # Deprecated in favour of a2wsgi, but still the bridge Starlette ships with.
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+# Add the backend directory to the path to allow importing our modules
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import main
+from utils.action_stream import ActionStreamParser
+from utils.database import Database
+from utils.lazy import LazyResource
+from utils.sse import format_sse, last_event_id, SSE_HEADERS
+
+# Async serving mode: the same routes as main.py, with the long-lived
+# streams (/api/chat, /api/chat/stream and /api/changes) served natively on
+# the event loop so an open stream costs a coroutine instead of a worker
+# thread. Every other route is the Flask app, run on the thread pool, as
+# are the blocking database and prompt-building calls the streams make.
+#   uvicorn asgi:app --app-dir backend --port 5001
+# or: python3 backend/asgi.py
+THREAD_POOL_SIZE = int(os.getenv("ASGI_THREAD_POOL_SIZE", "64"))
+CHANGES_ASYNC_POLL_SECONDS = 0.25
+
+
+def create_async_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(
+        api_key=os.environ.get("OPENROUTER_API_KEY"),
+        base_url="https://openrouter.ai/api/v1"
+    )
+
+async_openai_client = LazyResource("openai-async", create_async_openai_client)
+
+
+async def chat_turn_events(user_id, session_id, conversation_history):
+    """
+    The async counterpart of main.chat_turn_events: yields the same
+    (type, data) events while the completion streams on the event loop.
+    """
+    latest_user_message = conversation_history[-1]['content']
+    visible_response = ""
+    api_messages = await run_in_threadpool(main.build_chat_messages, user_id, session_id, conversation_history)
+
+    action_parser = ActionStreamParser()
+    try:
+        client = await run_in_threadpool(async_openai_client.get)
+        stream = await client.chat.completions.create(messages=api_messages, **main.CHAT_COMPLETION_OPTIONS)
+
+        async for chunk in stream:
+            content = chunk.choices[0].delta.content
+            if content:
+                visible_text, actions = action_parser.feed(content)
+                visible_response += visible_text
+                # Actions are queued as soon as their payload is complete.
+                for action in actions:
+                    yield "action", await run_in_threadpool(main.enqueue_action, action, session_id)
+                if visible_text:
+                    yield "token", {"text": visible_text}
+
+    except Exception as e:
+        print(f"Error with OpenRouter API: {e}")
+        yield "error", {"message": main.CHAT_ERROR_MESSAGE}
+
+    visible_text, actions = action_parser.flush()
+    visible_response += visible_text
+    for action in actions:
+        yield "action", await run_in_threadpool(main.enqueue_action, action, session_id)
+    if visible_text:
+        yield "token", {"text": visible_text}
+
+    await run_in_threadpool(main.remember_chat_turn, user_id, session_id, latest_user_message, visible_response)
+
+
+# Generations in SSE mode keep running after their client disconnects;
+# holding the tasks here stops them from being garbage collected.
+chat_stream_tasks = set()
+
+
+async def run_chat_stream(stream, events):
+    try:
+        async for event, data in events:
+            stream.append(event, data)
+    except Exception as e:
+        print(f"--- [CHAT STREAM ERROR] {e} ---")
+        stream.append("error", {"message": main.CHAT_ERROR_MESSAGE})
+    finally:
+        stream.finish()
+
+
+async def follow_chat_stream(stream, seq, chars):
+    """
+    Yields a stream's events after (seq, chars) as SSE until its done event,
+    waking on appended events instead of holding a thread.
+    """
+    loop = asyncio.get_running_loop()
+    appended = asyncio.Event()
+    listener = lambda: loop.call_soon_threadsafe(appended.set)
+    stream.add_listener(listener)
+    try:
+        while True:
+            appended.clear()
+            for event_seq, event_chars, event, data in stream.events_after(seq, chars):
+                seq, chars = event_seq, event_chars
+                yield format_sse(data, event=event, event_id=stream.event_id(seq, chars))
+                if event == "done":
+                    return
+            try:
+                await asyncio.wait_for(appended.wait(), main.CHAT_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+    finally:
+        stream.remove_listener(listener)
+
+
+async def chat(request: Request):
+    data = await request.json()
+    user_id = data.get("user_id", "default_user")
+    session_id = data.get("session_id", "default_session")
+    conversation_history = data.get('messages', [])
+    if not conversation_history:
+        return PlainTextResponse("No messages provided", status_code=400)
+
+    events = chat_turn_events(user_id, session_id, conversation_history)
+    if request.query_params.get('stream') == 'sse' or 'text/event-stream' in request.headers.get('accept', ''):
+        stream = main.chat_streams.create(session_id)
+        task = asyncio.create_task(run_chat_stream(stream, events))
+        chat_stream_tasks.add(task)
+        task.add_done_callback(chat_stream_tasks.discard)
+        return StreamingResponse(follow_chat_stream(stream, 0, 0), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    async def generate():
+        async for event, data in events:
+            if event == "token":
+                yield data["text"]
+            elif event == "error":
+                yield data["message"]
+
+    return StreamingResponse(generate(), media_type="text/plain")
+
+
+async def resume_chat_stream(request: Request):
+    session_id = request.query_params.get('session_id', 'default_session')
+    stream, position = main.chat_streams.resolve(session_id, last_event_id(request.headers, request.query_params))
+    if stream is None:
+        return JSONResponse({"error": "No chat stream to resume for this session."}, status_code=404)
+    return StreamingResponse(follow_chat_stream(stream, *position), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def stream_changes(request: Request):
+    resume_from = last_event_id(request.headers, request.query_params)
+    try:
+        tables, offset = main.parse_change_feed_args(request.query_params, resume_from)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    async def generate(offset):
+        offset, chunks = await run_in_threadpool(main.change_feed_start, tables, offset, resume_from)
+        for chunk in chunks:
+            yield chunk
+        idle_seconds = 0
+        while True:
+            # Checking the log end reads only its header; events are read once it grew.
+            if Database.changes.end_offset() > offset:
+                offset, chunks = await run_in_threadpool(main.change_feed_events, tables, offset)
+                for chunk in chunks:
+                    yield chunk
+                idle_seconds = 0
+                continue
+            await asyncio.sleep(CHANGES_ASYNC_POLL_SECONDS)
+            idle_seconds += CHANGES_ASYNC_POLL_SECONDS
+            if idle_seconds >= main.CHANGES_HEARTBEAT_SECONDS:
+                idle_seconds = 0
+                yield ": heartbeat\n\n"
+
+    return StreamingResponse(generate(offset), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Bounds the threads used for Flask routes and blocking calls together.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREAD_POOL_SIZE
+    main.warm_up_subsystems()
+    yield
+
+
+# The Flask app sets CORS headers itself; only the native routes need the middleware.
+native_cors = [Middleware(
+    CORSMiddleware,
+    allow_origins=main.CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type", "Authorization"]
+)]
+
+app = Starlette(
+    routes=[
+        Route('/api/chat', chat, methods=["POST", "OPTIONS"], middleware=native_cors),
+        Route('/api/chat/stream', resume_chat_stream, methods=["GET", "OPTIONS"], middleware=native_cors),
+        Route('/api/changes', stream_changes, methods=["GET", "OPTIONS"], middleware=native_cors),
+        Mount('/', app=WSGIMiddleware(main.app)),
+    ],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.getenv("PORT", "5001")))
+
+# --- END OF FILE backend/asgi.py ---
@@ -0,0 +1,97 @@
+# --- START OF FILE backend/convert_database.py ---
+
+import os
+import json
+import stat
+import sys
+import argparse
+
+# Add the backend directory to the path to allow importing our modules
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from utils.database import Database
+from utils.snapshot import SnapshotTable, write_snapshot, SNAPSHOT_EXTENSION
+
+# Converts the database tables between the indented JSON files and the
+# compact snapshot format used with DATABASE_FORMAT=snapshot, and exports
+# snapshots as read-only JSON for debugging:
+#   python3 backend/convert_database.py to-snapshot
+#   python3 backend/convert_database.py to-json
+#   python3 backend/convert_database.py export --out database/export
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database", "export")
+
+
+def snapshot_path(table_name):
+    return os.path.splitext(Database.tables[table_name])[0] + SNAPSHOT_EXTENSION
+
+
+def read_snapshot(table_name):
+    table = SnapshotTable(snapshot_path(table_name))
+    rows = list(table)
+    table.close()
+    return rows
+
+
+def to_snapshot(table_names):
+    for table_name in table_names:
+        json_path = Database.tables[table_name]
+        if not os.path.exists(json_path):
+            print(f"  - {table_name}: no JSON file, skipping.")
+            continue
+        with open(json_path, "r") as f:
+            rows = json.load(f)
+        write_snapshot(snapshot_path(table_name), rows)
+        Database.notify_changed(table_name)
+        print(f"  - {table_name}: {len(rows)} rows, {os.path.getsize(json_path)} -> {os.path.getsize(snapshot_path(table_name))} bytes")
+
+
+def to_json(table_names):
+    for table_name in table_names:
+        if not os.path.exists(snapshot_path(table_name)):
+            print(f"  - {table_name}: no snapshot, skipping.")
+            continue
+        rows = read_snapshot(table_name)
+        with open(Database.tables[table_name], "w") as f:
+            json.dump(rows, f, indent=2)
+        Database.notify_changed(table_name)
+        print(f"  - {table_name}: {len(rows)} rows written to {Database.tables[table_name]}")
+
+
+def export(table_names, out_dir):
+    """
+    Writes each snapshot as indented JSON marked read-only, so it can be
+    inspected without being mistaken for the live table.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for table_name in table_names:
+        if not os.path.exists(snapshot_path(table_name)):
+            print(f"  - {table_name}: no snapshot, skipping.")
+            continue
+        path = os.path.join(out_dir, f"{table_name}.json")
+        if os.path.exists(path):
+            os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+        with open(path, "w") as f:
+            json.dump(read_snapshot(table_name), f, indent=2)
+        os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        print(f"  - {table_name}: exported to {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert database tables between JSON and snapshot files.")
+    parser.add_argument("command", choices=["to-snapshot", "to-json", "export"])
+    parser.add_argument("tables", nargs="*", help=f"Tables to convert (default: all of {', '.join(Database.tables)}).")
+    parser.add_argument("--out", default=EXPORT_DIR, help="Directory for the read-only JSON export.")
+    args = parser.parse_args()
+
+    table_names = args.tables or list(Database.tables)
+    unknown = [table_name for table_name in table_names if table_name not in Database.tables]
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(unknown)}")
+    if args.command == "to-snapshot":
+        to_snapshot(table_names)
+    elif args.command == "to-json":
+        to_json(table_names)
+    else:
+        export(table_names, args.out)
+
+# --- END OF FILE backend/convert_database.py ---
@@ -0,0 +1,104 @@
+# --- START OF FILE backend/extract_memories.py ---
+
+import os
+import json
+import re
+import sys
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+# Add the backend directory to the path to allow importing our modules
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from utils.memory_store import LocalMemoryStore, MEMORY_DIR
+
+load_dotenv()
+
+# Optional offline step: distils stored conversation turns into short, durable
+# facts about the learner with one LLM call per batch, instead of one call per
+# chat turn. Run it periodically, e.g. from cron: python3 backend/extract_memories.py
+BATCH_SIZE = 20
+EXTRACTION_MODEL = os.environ.get("MEMORY_EXTRACTION_MODEL", "google/gemma-3-27b-it:free")
+STATE_PATH = os.path.join(MEMORY_DIR, "extraction_state.json")
+
+EXTRACTION_PROMPT = """You maintain the long-term memory of a tutoring assistant.
+Below are conversation turns between a student and their tutor.
+Extract the durable facts worth remembering about the student: learning preferences,
+background, goals, concepts they have mastered, and misconceptions they showed.
+Reply with a JSON array of short strings and nothing else. Reply [] if there is nothing durable.
+
+Turns:
+{turns}
+"""
+
+
+def load_cursor():
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, "r") as f:
+            return json.load(f).get("cursor", 0)
+    return 0
+
+
+def save_cursor(cursor):
+    os.makedirs(MEMORY_DIR, exist_ok=True)
+    with open(STATE_PATH, "w") as f:
+        json.dump({"cursor": cursor}, f)
+
+
+def extract_facts(client, turns):
+    prompt = EXTRACTION_PROMPT.format(turns="\n\n".join(turn["text"] for turn in turns))
+    response = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=EXTRACTION_MODEL,
+        temperature=0.2
+    )
+    content = response.choices[0].message.content or "[]"
+    match = re.search(r"\[.*\]", content, re.DOTALL)
+    if not match:
+        return []
+    facts = json.loads(match.group(0))
+    return [fact.strip() for fact in facts if isinstance(fact, str) and fact.strip()]
+
+
+def extract_memories():
+    from openai import OpenAI
+
+    print("--- Starting Memory Extraction ---")
+    store = LocalMemoryStore()
+    cursor = load_cursor()
+    records = store.get_records(start=cursor)
+
+    turns_by_user = defaultdict(list)
+    for record in records:
+        if record.get("kind") == "turn":
+            turns_by_user[record["user_id"]].append(record)
+
+    if not turns_by_user:
+        print("No new conversation turns to process.")
+        return
+
+    client = OpenAI(
+        api_key=os.environ.get("OPENROUTER_API_KEY"),
+        base_url="https://openrouter.ai/api/v1"
+    )
+
+    total_facts = 0
+    for user_id, turns in turns_by_user.items():
+        for i in range(0, len(turns), BATCH_SIZE):
+            batch = turns[i:i + BATCH_SIZE]
+            facts = extract_facts(client, batch)
+            for fact in facts:
+                store.add(user_id, fact, session_id=batch[-1].get("session_id"), kind="fact")
+            total_facts += len(facts)
+            print(f"  - {user_id}: {len(batch)} turns -> {len(facts)} facts")
+
+    save_cursor(cursor + len(records))
+    print(f"Extraction complete. Added {total_facts} facts from {len(records)} new records.")
+    print("--- Memory Extraction Finished ---")
+
+
+if __name__ == '__main__':
+    extract_memories()
+
+# --- END OF FILE backend/extract_memories.py ---
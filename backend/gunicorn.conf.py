@@ -0,0 +1,18 @@
+# Gunicorn settings for serving the Flask app with several workers.
+# Picked up automatically when gunicorn is started from this directory:
+#   cd backend && gunicorn main:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Chat responses and /api/changes are long-lived streams, so each worker
+# serves several of them on threads.
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = 120
+
+
+def post_worker_init(worker):
+    # Runs in each worker after it imported the app; the heavy SDKs and
+    # models load on a background thread while the worker starts serving.
+    from main import warm_up_subsystems
+    warm_up_subsystems()
@@ -1,39 +1,57 @@
-from flask import Flask, request, Response, jsonify, send_file
+from flask import Flask, request, Response, jsonify, send_file, url_for
 from flask_cors import CORS
 import os
-import re
 import json
 import uuid
 import requests
 import csv
 import io
+import time
+import threading
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from collections import defaultdict
 
-from openai import OpenAI
-from cerebras.cloud.sdk import Cerebras
 from dotenv import load_dotenv
-from mem0 import Memory
 
-from prompts.socratic_tutor import get_socratic_tutor_prompt
+from prompts.socratic_tutor import get_cached_socratic_tutor_prompt
 from tools.flash_cards_tool import FlashCardsTool
 from tools.quizz_tool import QuizzTool
 from tools.decks_tool import DecksTool
 from tools.image_analysis_tool import analyze_image_with_openrouter
-from utils.database import Database
+from utils.database import Database, VersionConflictError, row_version
+from utils.uploads import get_upload_backend, LocalUploadBackend, UnsupportedUploadError, UploadTooLargeError, IMAGE_TYPES, UPLOAD_MAX_BYTES
+from utils.derivatives import get_derivative_pipeline, with_image_derivatives
+from utils.action_stream import ActionStreamParser
+from utils.job_queue import JobQueue, IdempotencyKeys, make_idempotency_key, JOB_KEYS_PATH
+from utils.context_window import ContextWindowManager, message_text
+from utils.deck_index import get_relevant_decks, search_decks
+from utils.memory_store import LocalMemoryStore, format_memories
+from utils.embedding_service import get_embedding_service
+from utils.lazy import LazyResource, start_background_warm_up
+from utils.search_index import get_card_search_index, search_flash_cards
+from utils.history_index import get_history_index, search_history
+from utils.chat_records import current_chat_history, get_chat_history_store, in_session
+from utils.quiz_attempts import QuizAttemptLog
+from utils.quiz_index import get_quiz_index, SUMMARY_FIELDS
+from utils.deck_stats import with_deck_stats, parse_timestamp
+from utils.analytics import get_analytics_engine, BUCKET_SECONDS
+from utils.sse import format_sse, last_event_id, SSE_HEADERS
+from utils.chat_stream import ChatStreamRegistry
 
 load_dotenv()
 
 app = Flask(__name__)
 
 # --- CORRECT & ROBUST CORS SETUP ---
+CORS_ORIGINS = ["http://localhost:8080", "http://127.0.0.1:8080"]
 CORS(
     app,
-    origins=["http://localhost:8080", "http://127.0.0.1:8080"],
+    origins=CORS_ORIGINS,
     supports_credentials=True,
     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"]
+    allow_headers=["Content-Type", "Authorization", "If-Match"],
+    expose_headers=["ETag"]
 )
 # --- END CORS SETUP ---
 
@@ -57,37 +75,82 @@ config = {
         }
     }
 }
-memory = Memory.from_config(config)
+
+def create_mem0_memory():
+    from mem0 import Memory
+    return Memory.from_config(config)
+
+# Mem0 loads Chroma and the embedding model, so it is only built when first used.
+mem0_memory = LazyResource("mem0", create_mem0_memory)
 # --- END: Corrected Mem0 Initialization ---
 
+# Local long-term memory used by /api/chat. Turns are embedded with the same
+# sentence-transformers model as above; LLM-based fact extraction runs
+# offline in batches (see extract_memories.py).
+memory_store = LocalMemoryStore(model_name=config["embedder"]["config"]["model"])
+
+# --- START: Lazy Subsystems ---
+def create_openai_client():
+    from openai import OpenAI
+    return OpenAI(
+        api_key=os.environ.get("OPENROUTER_API_KEY"),
+        base_url="https://openrouter.ai/api/v1"
+    )
+
+openai_client = LazyResource("openai", create_openai_client)
+# Memory and hybrid search load the model through the embedding service
+# directly, so readiness asks the service rather than this wrapper.
+embedding_model = LazyResource(
+    "embeddings",
+    lambda: get_embedding_service(memory_store.model_name).load_model(),
+    is_loaded=lambda: get_embedding_service(memory_store.model_name).is_ready()
+)
+
+SUBSYSTEMS = {
+    "openai": openai_client,
+    "embeddings": embedding_model,
+    "mem0": mem0_memory,
+}
+# Subsystems initialized by the background warm-up thread at startup.
+WARM_UP_SUBSYSTEMS = [
+    name.strip() for name in os.getenv("WARM_UP_SUBSYSTEMS", "openai,embeddings").split(",") if name.strip()
+]
+
+def warm_up_subsystems():
+    """
+    Starts the background warm-up. Under gunicorn, backend/gunicorn.conf.py
+    calls this in each worker once it has loaded the app, so no worker
+    delays its first request.
+    """
+    return start_background_warm_up([SUBSYSTEMS[name] for name in WARM_UP_SUBSYSTEMS if name in SUBSYSTEMS])
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    subsystems = {name: resource.status() for name, resource in SUBSYSTEMS.items()}
+    ready = all(SUBSYSTEMS[name].ready for name in WARM_UP_SUBSYSTEMS if name in SUBSYSTEMS)
+    return jsonify({"ready": ready, "subsystems": subsystems}), 200 if ready else 503
+# --- END: Lazy Subsystems ---
+
 # --- START: Deck Cache ---
 DECK_CACHE = None
-DECKS_LAST_MODIFIED = 0
+DECKS_VERSION = None
 
 def get_decks_from_cache():
     """
-    Retrieves decks from a cache, updating it if the underlying file has changed.
+    Retrieves decks from a cache, updating it if any worker has written the table since.
     """
-    global DECK_CACHE, DECKS_LAST_MODIFIED
-    
-    decks_file_path = os.path.join(os.path.dirname(__file__), '..', 'database', 'decks.json')
+    global DECK_CACHE, DECKS_VERSION
     
     try:
-        # Check if the file exists
-        if not os.path.exists(decks_file_path):
-            if DECK_CACHE is None: # If cache is also empty, return empty list
-                return []
-            return DECK_CACHE # Return old cache if file is deleted during runtime
+        # The shared version counter changes after every write, in any process
+        version = Database.table_version("decks")
 
-        # Get the last modification time of the file
-        last_modified_time = os.path.getmtime(decks_file_path)
-
-        # If the file has been modified since the last read, or if the cache is empty
-        if last_modified_time > DECKS_LAST_MODIFIED or DECK_CACHE is None:
-            print("--- [CACHE] Decks file has changed or cache is empty. Reloading cache. ---")
+        # If the table has been written since the last read, or if the cache is empty
+        if version != DECKS_VERSION or DECK_CACHE is None:
+            print("--- [CACHE] Decks table has changed or cache is empty. Reloading cache. ---")
             decks_data = Database.load_table("decks")
             DECK_CACHE = decks_data
-            DECKS_LAST_MODIFIED = last_modified_time
+            DECKS_VERSION = version
         
         return DECK_CACHE
     except Exception as e:
@@ -99,48 +162,108 @@ def get_decks_from_cache():
 
 
 # --- Image Uploading ---
+UPLOAD_CACHE_MAX_AGE = 365 * 24 * 3600
+# Room for the multipart boundaries and headers around the file itself.
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
+    # Refuse a declared oversized body before it is parsed and spooled to disk;
+    # the local backend also stops streaming at the limit.
+    if request.content_length is not None and request.content_length > UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD:
+        return jsonify({"error": f"File exceeds the upload limit of {UPLOAD_MAX_BYTES} bytes."}), 413
     if 'file' not in request.files:
         return jsonify({"error": "No file part"}), 400
     file = request.files['file']
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    IMGBB_API_KEY = os.getenv("IMGBB_API_KEY")
-    if not IMGBB_API_KEY:
-        return jsonify({"error": "IMGBB_API_KEY environment variable is not set"}), 500
-
     try:
-        url = "https://api.imgbb.com/1/upload"
-        payload = {
-            "key": IMGBB_API_KEY,
-        }
-        files = {
-            "image": (file.filename, file.read(), file.mimetype)
-        }
-
-        response = requests.post(url, params=payload, files=files)
-        response.raise_for_status()
+        backend = get_upload_backend()
+        result = backend.save(file.stream, file.filename, file.mimetype)
+
+        image_url = result.get("url")
+        if not image_url:
+            # Thumbnails and web-sized copies are built in the background.
+            get_derivative_pipeline().submit(backend.path_for(result['name']))
+            public_base_url = os.getenv("UPLOAD_PUBLIC_BASE_URL")
+            if public_base_url:
+                image_url = f"{public_base_url.rstrip('/')}/api/uploads/{result['name']}"
+            else:
+                image_url = url_for('serve_upload', name=result['name'], _external=True)
 
-        result = response.json()
-        if result.get("success"):
-            image_url = result["data"]["url"]
-            print(f"--- [IMGBB UPLOAD] Generated file URL: {image_url} ---")
-            return jsonify({"filePath": image_url}), 201
-        else:
-            error_message = result.get("error", {}).get("message", "Unknown error from imgbb")
-            print(f"--- [IMGBB UPLOAD ERROR] {error_message} ---")
-            return jsonify({"error": f"Failed to upload to imgbb: {error_message}"}), 500
+        print(f"--- [UPLOAD] Generated file URL: {image_url} (deduplicated: {result['deduplicated']}) ---")
+        return jsonify({"filePath": image_url, "deduplicated": result['deduplicated']}), 201
 
+    except UploadTooLargeError as e:
+        print(f"--- [UPLOAD REJECTED] {e} ---")
+        return jsonify({"error": str(e)}), 413
+    except UnsupportedUploadError as e:
+        print(f"--- [UPLOAD REJECTED] {e} ---")
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        print(f"--- [UPLOAD ERROR] {e} ---")
+        return jsonify({"error": str(e)}), 500
     except requests.exceptions.RequestException as e:
         print(f"Error uploading to imgbb: {e}")
-        return jsonify({"error": "File upload failed due to a network issue."}, 500)
+        return jsonify({"error": "File upload failed due to a network issue."}), 500
     except Exception as e:
         print(f"An unexpected error occurred during upload: {e}")
         return jsonify({"error": "An unexpected server error occurred."}), 500
 
+@app.route('/api/uploads/<string:name>', methods=['GET'])
+def serve_upload(name):
+    path = LocalUploadBackend().path_for(name)
+    if not path or not os.path.exists(path):
+        return jsonify({"error": "File not found"}), 404
+
+    # Only known image types are served inline, with their MIME type fixed by
+    # the extension; anything else (e.g. stored before types were checked)
+    # is a download, so it can never run as a page on the API origin.
+    mimetype = IMAGE_TYPES.get(os.path.splitext(name)[1])
+
+    # Names are content hashes, so a given URL never changes content.
+    response = send_file(
+        path,
+        mimetype=mimetype or "application/octet-stream",
+        as_attachment=mimetype is None,
+        conditional=True,
+        etag=name,
+        max_age=UPLOAD_CACHE_MAX_AGE
+    )
+    response.headers['Cache-Control'] = f"public, max-age={UPLOAD_CACHE_MAX_AGE}, immutable"
+    response.headers['X-Content-Type-Options'] = "nosniff"
+    return response
+
+# --- List Projections ---
+def requested_fields():
+    """
+    Returns the field names from a `fields=a,b,c` query parameter, or None.
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+def project_fields(items: list, fields):
+    """
+    Keeps only the requested fields (and always the id) of each item.
+    """
+    if not fields:
+        return items
+    keep = set(fields) | {"id"}
+    return [{key: value for key, value in item.items() if key in keep} for item in items]
+
 # --- Deck Import/Export ---
+def summarize_duplicates(add_results: list) -> dict:
+    """
+    Combines the duplicate reports of several add_flash_cards calls.
+    """
+    return {
+        "flagged": [card for result in add_results for card in result["flagged"]],
+        "skipped": [card for result in add_results for card in result["skipped"]]
+    }
+
 @app.route('/api/import', methods=['POST'])
 def import_deck():
     if 'file' not in request.files:
@@ -153,6 +276,12 @@ def import_deck():
     deck_name_from_file, file_ext = os.path.splitext(filename)
     file_ext = file_ext.lower()
 
+    # Near-duplicates of existing cards are flagged by default; ?duplicates=skip leaves them out.
+    on_duplicate = request.args.get('duplicates', 'flag')
+    if on_duplicate not in FlashCardsTool.DUPLICATE_POLICIES:
+        return jsonify({"error": f"Invalid duplicates policy. Use one of: {', '.join(FlashCardsTool.DUPLICATE_POLICIES)}."}), 400
+    import_results = []
+
     try:
         decks_tool = DecksTool()
         flash_cards_tool = FlashCardsTool()
@@ -177,14 +306,14 @@ def import_deck():
                     if flashcards_to_add:
                         for card in flashcards_to_add:
                             card['deck_id'] = new_deck.id
-                        flash_cards_tool.add_flash_cards(json.dumps(flashcards_to_add))
+                        import_results.append(flash_cards_tool.add_flash_cards(json.dumps(flashcards_to_add), on_duplicate=on_duplicate))
                     
                     imported_decks_count += 1
                 
                 if imported_decks_count == 0:
                     return jsonify({"error": "No valid decks found in the JSON array."}, 400)
                 
-                return jsonify({"message": f"{imported_decks_count} decks imported successfully"}), 201
+                return jsonify({"message": f"{imported_decks_count} decks imported successfully", "duplicates": summarize_duplicates(import_results)}), 201
 
             # Case 2: Single deck import (dict)
             elif isinstance(data, dict):
@@ -200,9 +329,9 @@ def import_deck():
                 if flashcards_to_add:
                     for card in flashcards_to_add:
                         card['deck_id'] = new_deck.id
-                    flash_cards_tool.add_flash_cards(json.dumps(flashcards_to_add))
+                    import_results.append(flash_cards_tool.add_flash_cards(json.dumps(flashcards_to_add), on_duplicate=on_duplicate))
 
-                return jsonify({"message": "Deck imported successfully", "deck_id": new_deck.id}), 201
+                return jsonify({"message": "Deck imported successfully", "deck_id": new_deck.id, "duplicates": summarize_duplicates(import_results)}), 201
             
             else:
                 return jsonify({"error": "Invalid JSON structure. Must be an object or a list of objects."}, 400)
@@ -242,10 +371,10 @@ def import_deck():
                     if flashcards_to_add:
                         for card in flashcards_to_add:
                             card['deck_id'] = new_deck.id
-                        flash_cards_tool.add_flash_cards(json.dumps(flashcards_to_add))
+                        import_results.append(flash_cards_tool.add_flash_cards(json.dumps(flashcards_to_add), on_duplicate=on_duplicate))
                     imported_decks_count += 1
                 
-                return jsonify({"message": f"{imported_decks_count} decks imported successfully from CSV"}), 201
+                return jsonify({"message": f"{imported_decks_count} decks imported successfully from CSV", "duplicates": summarize_duplicates(import_results)}), 201
 
             # Case 2: Single deck import from CSV (no deck_name column)
             else:
@@ -264,9 +393,9 @@ def import_deck():
 
                 for card in flashcards_to_add:
                     card['deck_id'] = new_deck.id
-                flash_cards_tool.add_flash_cards(json.dumps(flashcards_to_add))
+                import_results.append(flash_cards_tool.add_flash_cards(json.dumps(flashcards_to_add), on_duplicate=on_duplicate))
                 
-                return jsonify({"message": "Deck imported successfully from CSV", "deck_id": new_deck.id}), 201
+                return jsonify({"message": "Deck imported successfully from CSV", "deck_id": new_deck.id, "duplicates": summarize_duplicates(import_results)}), 201
 
         else:
             return jsonify({"error": "Unsupported file format. Please upload a .json or .csv file."}, 400)
@@ -291,7 +420,6 @@ def export_decks_batch():
         flash_cards_tool = FlashCardsTool()
         
         all_decks_data = []
-        all_flashcards_data = []
 
         for deck_id in deck_ids:
             deck = decks_tool.get_deck_by_id(deck_id)
@@ -299,11 +427,6 @@ def export_decks_batch():
                 flashcards = flash_cards_tool.get_flash_cards_by_deck(deck_id)
                 deck['flashcards'] = flashcards
                 all_decks_data.append(deck)
-                # For CSV, add deck_name to each card
-                for card in flashcards:
-                    card_copy = card.copy()
-                    card_copy['deck_name'] = deck.get('name')
-                    all_flashcards_data.append(card_copy)
 
         if not all_decks_data:
             return jsonify({"error": "None of the provided deck IDs were found."}, 404)
@@ -328,7 +451,11 @@ def export_decks_batch():
             headers = ['deck_name', 'question', 'answer', 'difficulty', 'question_image_url', 'answer_image_url']
             writer = csv.DictWriter(csv_output, fieldnames=headers, extrasaction='ignore')
             writer.writeheader()
-            writer.writerows(all_flashcards_data)
+            # For CSV, add deck_name to each card as its row is written
+            writer.writerows(
+                {**card, 'deck_name': deck.get('name')}
+                for deck in all_decks_data for card in deck['flashcards']
+            )
             
             csv_buffer = io.BytesIO()
             csv_buffer.write(csv_output.getvalue().encode('utf-8'))
@@ -426,13 +553,39 @@ def export_deck(deck_id, file_format):
 @app.route('/api/decks', methods=['GET'])
 def get_decks():
     decks = Database.load_table("decks")
-    return jsonify(decks)
+    # Card counts, due count and last review come from the incrementally maintained deck stats.
+    return jsonify(project_fields(with_deck_stats(decks), requested_fields()))
+
+# --- Conditional Updates ---
+# Rows carry a version. A PUT with `If-Match: "<version>"` is only applied
+# while the row is still at that version and answers 409 otherwise; a PUT
+# without If-Match (or with `*`) updates unconditionally.
+
+def if_match_version():
+    """
+    Returns the row version named by the If-Match header, or None.
+    """
+    header = request.headers.get('If-Match', '').strip()
+    if not header or header == '*':
+        return None
+    try:
+        return int(header.removeprefix('W/').strip('"'))
+    except ValueError:
+        raise ValueError("If-Match must be a row version, e.g. \"3\".")
+
+def with_etag(response, row):
+    response.headers['ETag'] = f'"{row_version(row)}"'
+    return response
+
+def version_conflict(error):
+    response = jsonify({"error": str(error), "current": error.current})
+    return with_etag(response, error.current), 409
 
 @app.route('/api/decks/<int:deck_id>', methods=['GET'])
 def get_deck(deck_id):
     deck = DecksTool().get_deck_by_id(deck_id)
     if deck:
-        return jsonify(deck)
+        return with_etag(jsonify(with_deck_stats([deck])[0]), deck)
     return jsonify({"error": "Deck not found"}), 404
 
 @app.route('/api/decks/manual', methods=['POST'])
@@ -452,10 +605,16 @@ def update_deck(deck_id):
     deck_data = request.get_json()
     if not deck_data:
         return Response("No deck data provided for update", status=400)
+    try:
+        expected_version = if_match_version()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         decks_tool = DecksTool()
-        updated_deck = decks_tool.update_deck(deck_id, deck_data)
-        return jsonify(updated_deck), 200
+        updated_deck = decks_tool.update_deck(deck_id, deck_data, expected_version=expected_version)
+        return with_etag(jsonify(updated_deck), updated_deck), 200
+    except VersionConflictError as e:
+        return version_conflict(e)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
     except Exception as e:
@@ -476,7 +635,7 @@ def delete_deck(deck_id):
 @app.route('/api/flashcards', methods=['GET'])
 def get_flashcards():
     flashcards = Database.load_table("flash_cards")
-    return jsonify(flashcards)
+    return jsonify(project_fields(with_image_derivatives(flashcards), requested_fields()))
 
 @app.route('/api/decks/<int:deck_id>/flashcards', methods=['GET'])
 def get_flashcards_for_deck(deck_id):
@@ -484,7 +643,7 @@ def get_flashcards_for_deck(deck_id):
     if not deck:
         return jsonify({"error": "Deck not found"}), 404
     flashcards = FlashCardsTool().get_flash_cards_by_deck(deck_id)
-    return jsonify(flashcards)
+    return jsonify(project_fields(with_image_derivatives(flashcards), requested_fields()))
 
 @app.route('/api/flashcards/manual', methods=['POST'])
 def add_manual_flashcard():
@@ -493,8 +652,26 @@ def add_manual_flashcard():
         return Response("No flashcard data provided", status=400)
     try:
         flash_card_tool = FlashCardsTool()
-        flash_card_tool.add_flash_cards(json.dumps(flashcard_data))
-        return jsonify({"message": "Flashcard added successfully"}), 201
+        result = flash_card_tool.add_flash_cards(
+            json.dumps(flashcard_data), on_duplicate=request.args.get('duplicates', 'flag')
+        )
+        return jsonify({"message": "Flashcard added successfully", **result}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/flashcards/dedupe', methods=['POST'])
+def dedupe_flashcards():
+    options = request.get_json(silent=True) or {}
+    try:
+        flash_card_tool = FlashCardsTool()
+        report = flash_card_tool.dedupe_flash_cards(
+            deck_id=options.get('deck_id'),
+            across_decks=bool(options.get('across_decks', False)),
+            dry_run=bool(options.get('dry_run', False))
+        )
+        return jsonify(report), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -503,10 +680,16 @@ def update_flashcard(card_id):
     card_data = request.get_json()
     if not card_data:
         return Response("No flashcard data provided", status=400)
+    try:
+        expected_version = if_match_version()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         flash_card_tool = FlashCardsTool()
-        updated_card = flash_card_tool.update_flash_card(card_id, card_data)
-        return jsonify(updated_card), 200
+        updated_card = flash_card_tool.update_flash_card(card_id, card_data, expected_version=expected_version)
+        return with_etag(jsonify(updated_card), updated_card), 200
+    except VersionConflictError as e:
+        return version_conflict(e)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
     except Exception as e:
@@ -523,11 +706,117 @@ def delete_flashcard(card_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
         
+# --- Search API ---
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required."}), 400
+    try:
+        limit = min(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+        deck_id = request.args.get('deck_id', type=int)
+        started = time.monotonic()
+        cards, mode = search_flash_cards(
+            query, top_k=limit, deck_id=deck_id, mode=request.args.get('mode', 'hybrid')
+        )
+        all_decks = get_decks_from_cache()
+        decks = search_decks(all_decks, Database.table_version("decks"), query, top_k=limit)
+        deck_names = {deck['id']: deck['name'] for deck in all_decks}
+        for card in cards:
+            card['deck_name'] = deck_names.get(card['deck_id'])
+        return jsonify({
+            "query": query,
+            "mode": mode,
+            "flashcards": with_image_derivatives(cards),
+            "decks": decks if deck_id is None else [],
+            "took_ms": round((time.monotonic() - started) * 1000, 2)
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/search/stats', methods=['GET'])
+def get_search_stats():
+    return jsonify(get_card_search_index().stats())
+
 # --- Quizzes API ---
+# Attempts go to an append-only log; quiz definitions are never rewritten to record them.
+quiz_attempts = QuizAttemptLog()
+
 @app.route('/api/quizzes', methods=['GET'])
 def get_quizzes():
-    quizzes = Database.load_table("quizzes")
-    return jsonify(quizzes)
+    fields = requested_fields()
+    if request.args.get('view') == 'summary' or (fields and set(fields) <= set(SUMMARY_FIELDS)):
+        # Summaries come from the side index, without parsing the questions.
+        quizzes = get_quiz_index().summaries()
+    else:
+        quizzes = Database.load_table("quizzes")
+    return jsonify(project_fields(quiz_attempts.with_stats(quizzes), fields))
+
+def find_quiz(quiz_id):
+    return get_quiz_index().get_quiz(quiz_id)
+
+@app.route('/api/quizzes/<int:quiz_id>', methods=['GET'])
+def get_quiz(quiz_id):
+    quiz = find_quiz(quiz_id)
+    if not quiz:
+        return jsonify({"error": "Quiz not found"}), 404
+    return jsonify(quiz_attempts.with_stats([quiz])[0])
+
+@app.route('/api/quizzes/<int:quiz_id>/attempts', methods=['POST'])
+def submit_quiz_attempt(quiz_id):
+    quiz = find_quiz(quiz_id)
+    if not quiz:
+        return jsonify({"error": "Quiz not found"}), 404
+    data = request.get_json()
+    if not data or 'answers' not in data:
+        return jsonify({"error": "answers is required"}), 400
+    try:
+        attempt = quiz_attempts.record(
+            quiz, data['answers'], user_id=data.get('user_id'), duration_seconds=data.get('duration_seconds')
+        )
+        return jsonify(attempt), 201
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/quizzes/<int:quiz_id>/attempts', methods=['GET'])
+def get_quiz_attempts(quiz_id):
+    return jsonify(quiz_attempts.get_attempts(quiz_id, user_id=request.args.get('user_id')))
+
+@app.route('/api/quizzes/<int:quiz_id>/stats', methods=['GET'])
+def get_quiz_stats(quiz_id):
+    if not find_quiz(quiz_id):
+        return jsonify({"error": "Quiz not found"}), 404
+    return jsonify(quiz_attempts.get_stats(quiz_id))
+
+@app.route('/api/decks/<int:deck_id>/quiz', methods=['POST'])
+def generate_quiz_from_deck(deck_id):
+    if not DecksTool().get_deck_by_id(deck_id):
+        return jsonify({"error": "Deck not found"}), 404
+    options = request.get_json(silent=True) or {}
+    try:
+        # Embedding similarity when the model is loaded, TF-IDF otherwise.
+        embedding_service = get_embedding_service(memory_store.model_name)
+        use_embeddings = options.get('method', 'auto') != 'tfidf' and embedding_service.is_ready()
+        quiz = QuizzTool().build_quiz_from_deck(
+            deck_id,
+            num_questions=int(options.get('num_questions', 20)),
+            num_options=int(options.get('num_options', 4)),
+            title=options.get('title'),
+            embed_fn=embedding_service.embed if use_embeddings else None,
+            seed=options.get('seed')
+        )
+        return jsonify(quiz), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 @app.route('/api/quizzes/manual', methods=['POST'])
 def add_manual_quiz():
@@ -541,40 +830,123 @@ def add_manual_quiz():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# --- Analytics API ---
+CARD_GROUP_COLUMNS = ("deck_id", "difficulty")
+
+def analytics_time_range():
+    """
+    Reads the optional since/until ISO dates of an analytics query as timestamps.
+    """
+    bounds = []
+    for name in ('since', 'until'):
+        value = request.args.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"{name} must be an ISO date, got {value!r}.")
+        bounds.append(parse_timestamp(value))
+    return tuple(bounds)
+
+def analytics_bucket():
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKET_SECONDS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKET_SECONDS)}.")
+    return bucket
+
+@app.route('/api/analytics/cards', methods=['GET'])
+def get_card_analytics():
+    group_by = [column for column in request.args.get('group_by', 'deck_id').split(',') if column]
+    unknown = set(group_by) - set(CARD_GROUP_COLUMNS)
+    if unknown:
+        return jsonify({"error": f"Cannot group by {', '.join(sorted(unknown))}."}), 400
+    engine = get_analytics_engine()
+    return jsonify({
+        "group_by": group_by,
+        "groups": engine.card_groups(group_by, time.time()),
+        "never_reviewed": engine.never_reviewed_count()
+    })
+
+@app.route('/api/analytics/reviews', methods=['GET'])
+def get_review_analytics():
+    try:
+        since, until = analytics_time_range()
+        bucket = analytics_bucket()
+        volume = get_analytics_engine().review_volume(
+            bucket, deck_id=request.args.get('deck_id', type=int), since=since, until=until
+        )
+        return jsonify({"bucket": bucket, "buckets": volume})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/analytics/transitions', methods=['GET'])
+def get_transition_analytics():
+    try:
+        since, until = analytics_time_range()
+        return jsonify(get_analytics_engine().difficulty_transitions(
+            deck_id=request.args.get('deck_id', type=int), since=since, until=until
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/analytics/retention', methods=['GET'])
+def get_retention_analytics():
+    try:
+        since, until = analytics_time_range()
+        return jsonify(get_analytics_engine().retention_curve(
+            deck_id=request.args.get('deck_id', type=int), since=since, until=until
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/analytics/quizzes', methods=['GET'])
+def get_quiz_analytics():
+    try:
+        since, until = analytics_time_range()
+        bucket = analytics_bucket()
+        activity = get_analytics_engine().quiz_activity(
+            bucket, quiz_id=request.args.get('quiz_id', type=int), since=since, until=until
+        )
+        return jsonify({"bucket": bucket, "buckets": activity})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
 # --- History API ---
+def session_change(user_id, session_id, messages):
+    """
+    Returns the change feed event for a conversation rewrite. Chat history
+    rows have no ids, so the whole session is sent; no messages means the
+    session was deleted.
+    """
+    return {"op": "replace_session", "user_id": user_id, "session_id": session_id, "rows": messages}
+
 @app.route('/api/conversations', methods=['GET'])
 def get_conversations():
     user_id = request.args.get('user_id')
     session_id = request.args.get('session_id')
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
-    all_history = Database.load_table("chat_history")
-    user_history = [msg for msg in all_history if msg.get('user_id') == user_id]
-    if not user_history:
-        return jsonify([])
-    target_session_id = session_id
+    history = current_chat_history()
+    target_session_id = session_id or history.latest_session_id(user_id)
     if not target_session_id:
-        target_session_id = user_history[-1]['session_id']
-    session_history = [msg for msg in user_history if msg.get('session_id') == target_session_id]
-    return jsonify(session_history)
+        return jsonify([])
+    return jsonify([record.to_dict() for record in history.session_messages(user_id, target_session_id)])
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
     user_id = request.args.get('user_id')
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
-    all_history = Database.load_table("chat_history")
-    user_history = [msg for msg in all_history if msg.get('user_id') == user_id]
-    sessions = defaultdict(list)
-    for msg in user_history:
-        sessions[msg['session_id']].append(msg)
+    sessions = current_chat_history().user_sessions(user_id)
     history_items = []
     for session_id, messages in sessions.items():
         if not messages:
             continue
-        messages.sort(key=lambda x: x.get('timestamp', ''))
+        messages.sort(key=lambda x: x.timestamp or '')
         
-        first_user_message_content = messages[0]['content']
+        first_user_message_content = messages[0].content
         if isinstance(first_user_message_content, list):
             first_user_message = next((part['text'] for part in first_user_message_content if part['type'] == 'text'), 'Conversation')
         else:
@@ -582,7 +954,7 @@ def get_history():
 
         preview_parts = []
         for msg in messages:
-            content = msg['content']
+            content = msg.content
             if isinstance(content, list):
                 text_part = next((part['text'] for part in content if part['type'] == 'text'), '')
                 preview_parts.append(text_part)
@@ -594,7 +966,7 @@ def get_history():
             "id": session_id,
             "title": first_user_message[:50],
             "preview": preview_content[:200],
-            "timestamp": messages[-1]['timestamp'],
+            "timestamp": messages[-1].timestamp,
             "type": "conversation",
             "masteryMoments": 0,
             "topics": []
@@ -602,6 +974,26 @@ def get_history():
     history_items.sort(key=lambda x: x['timestamp'], reverse=True)
     return jsonify(history_items)
 
+@app.route('/api/history/search', methods=['GET'])
+def search_chat_history():
+    user_id = request.args.get('user_id')
+    query = request.args.get('q', '').strip()
+    if not user_id or not query:
+        return jsonify({"error": "user_id and q are required"}), 400
+    try:
+        limit = min(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+        started = time.monotonic()
+        results = search_history(user_id, query, limit=limit)
+        return jsonify({
+            "query": query,
+            "results": results,
+            "took_ms": round((time.monotonic() - started) * 1000, 2)
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/conversations/<string:session_id>', methods=['DELETE'])
 def delete_conversation(session_id):
     user_id = request.args.get('user_id')
@@ -609,16 +1001,290 @@ def delete_conversation(session_id):
         return jsonify({"error": "user_id is required"}), 400
 
     try:
-        all_history = Database.load_table("chat_history")
-        # Filter out messages belonging to the specified session and user
-        updated_history = [msg for msg in all_history if not (msg.get('user_id') == user_id and msg.get('session_id') == session_id)]
-        Database.save_table("chat_history", updated_history)
+        # Drops the session's messages from the table as it is now, so
+        # sessions saved by other workers in the meantime are kept.
+        Database.replace_rows("chat_history", in_session(user_id, session_id), [],
+                              changes=[session_change(user_id, session_id, [])])
+        version = Database.table_version("chat_history")
+        get_chat_history_store().remove_session(user_id, session_id, version=version)
+        get_history_index().remove_session(user_id, session_id, version=version)
         return jsonify({"message": f"Conversation {session_id} deleted successfully"}), 200
     except Exception as e:
         print(f"Error deleting conversation: {e}")
         return jsonify({"error": "Failed to delete conversation."}), 500
 
+# --- Change Feed ---
+# Row-level changes from Database's change log, so clients apply deltas
+# instead of re-fetching collections. Event ids are change log offsets;
+# a reconnecting EventSource resumes after the last event it received.
+# Events are insert/update/delete of one row, replace_session for a
+# chat_history session, or reset when the client must reload the table.
+# The log keeps its newest CHANGE_LOG_MAX_BYTES; a client whose position
+# was rotated away gets a hello event with resync set, like after a reset.
+CHANGES_POLL_SECONDS = 1.0
+CHANGES_HEARTBEAT_SECONDS = 15
+
+def parse_change_feed_args(args, resume_from):
+    """
+    Returns the tables and the log offset a change feed request asks for.
+    """
+    tables = {name.strip() for name in args.get('tables', '').split(',') if name.strip()} or set(Database.tables)
+    unknown = tables - set(Database.tables)
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+    try:
+        return tables, int(resume_from) if resume_from else None
+    except ValueError:
+        raise ValueError("Last-Event-ID must be an event id from this stream.")
+
+def change_feed_start(tables, offset, resume_from):
+    """
+    Returns the offset a change feed stream starts reading at and its opening events.
+    """
+    chunks = ["retry: 2000\n\n"]
+    end = Database.changes.end_offset()
+    if offset is None or offset > end or offset < Database.changes.start_offset():
+        # A new client, or the log was reset or rotated past the client's
+        # last event: it gets the current versions and must reload if it
+        # was resuming.
+        offset = end
+        chunks.append(format_sse({
+            "versions": {name: Database.table_version(name) for name in sorted(tables)},
+            "resync": resume_from is not None
+        }, event="hello", event_id=offset))
+    return offset, chunks
+
+def change_feed_events(tables, offset):
+    """
+    Returns the new offset and the events for changes logged after `offset`.
+    """
+    if offset < Database.changes.start_offset():
+        # The log was rotated past this stream's position while it was open.
+        return change_feed_start(tables, offset, offset)
+    chunks = []
+    for change in Database.changes.read_since(offset):
+        offset = change.pop('id')
+        if change['table'] in tables:
+            chunks.append(format_sse(change, event="change", event_id=offset))
+    return offset, chunks
+
+@app.route('/api/changes', methods=['GET'])
+def stream_changes():
+    resume_from = last_event_id(request.headers, request.args)
+    try:
+        tables, offset = parse_change_feed_args(request.args, resume_from)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate(offset):
+        offset, chunks = change_feed_start(tables, offset, resume_from)
+        yield from chunks
+        idle_seconds = 0
+        while True:
+            new_offset, chunks = change_feed_events(tables, offset)
+            yield from chunks
+            if new_offset != offset:
+                offset = new_offset
+                idle_seconds = 0
+            elif not Database.changes.wait(offset, CHANGES_POLL_SECONDS):
+                idle_seconds += CHANGES_POLL_SECONDS
+                if idle_seconds >= CHANGES_HEARTBEAT_SECONDS:
+                    idle_seconds = 0
+                    yield ": heartbeat\n\n"
+
+    return Response(generate(offset), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+# --- Background Jobs ---
+# Tool actions requested by the model run on worker threads so the chat
+# stream is not held open while whole tables are rewritten.
+# Idempotency keys are shared by all workers through database/job_keys.json.
+job_queue = JobQueue(workers=int(os.getenv("JOB_WORKERS", "2")), idempotency_keys=IdempotencyKeys(JOB_KEYS_PATH))
+# Model-generated batches often repeat cards the learner already has, so those are dropped.
+job_queue.register("FLASHCARDS", lambda payload: FlashCardsTool().add_flash_cards(payload, on_duplicate="skip"))
+job_queue.register("QUIZ", lambda payload: QuizzTool().add_quiz(payload))
+job_queue.register("MEMORY", lambda payload: memory_store.add_turn(**payload))
+
+def enqueue_action(action, session_id):
+    """
+    Queues the tool for an action block extracted from the model's response.
+    The idempotency key makes a replayed response reuse the original job.
+    Returns a summary of the action for chat stream events.
+    """
+    try:
+        canonical_payload = json.dumps(json.loads(action.payload), sort_keys=True)
+    except json.JSONDecodeError:
+        canonical_payload = action.payload
+    try:
+        print(f"---[ACTION] Detected {action.name or action.kind}---")
+        job = job_queue.submit(
+            action.kind,
+            action.payload,
+            idempotency_key=make_idempotency_key(session_id, action.kind, canonical_payload),
+            session_id=session_id
+        )
+        print(f"---[ACTION] {action.kind} queued as job {job['id']}---")
+        return {"kind": action.kind, "name": action.name, "job_id": job['id']}
+    except ValueError as e:
+        print(f"---[ACTION ERROR] Failed to queue AI action: {e}---")
+        return {"kind": action.kind, "name": action.name, "error": str(e)}
+
+@app.route('/api/embeddings/stats', methods=['GET'])
+def get_embedding_stats():
+    return jsonify(get_embedding_service(memory_store.model_name).stats())
+
+@app.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    session_id = request.args.get('session_id')
+    return jsonify(job_queue.get_jobs(session_id=session_id))
+
+@app.route('/api/jobs/<string:job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get_job(job_id)
+    if job:
+        return jsonify(job)
+    return jsonify({"error": "Job not found"}), 404
+
 # --- Chat API ---
+CHAT_MODEL = "google/gemma-3-27b-it:free" # Or another capable multimodal model
+context_manager = ContextWindowManager()
+DECK_CONTEXT_TOP_K = int(os.getenv("DECK_CONTEXT_TOP_K", "10"))
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "5"))
+MEMORY_LATENCY_BUDGET = float(os.getenv("MEMORY_LATENCY_BUDGET_MS", "150")) / 1000
+
+# Both the WSGI route below and the ASGI chat endpoint (asgi.py) use these.
+CHAT_COMPLETION_OPTIONS = {
+    "model": CHAT_MODEL,
+    "stream": True,
+    "max_tokens": 4096,
+    "temperature": 0.7,
+    "top_p": 0.8
+}
+
+def build_chat_messages(user_id, session_id, conversation_history):
+    """
+    Builds the model messages for a chat turn: the tutor prompt with the
+    relevant decks and recalled memories, then the (trimmed) conversation.
+    """
+    latest_user_message = conversation_history[-1]['content']
+
+    decks_version = Database.table_version("decks")
+    all_decks = get_decks_from_cache()
+    # Only the decks related to the latest message go into the prompt.
+    relevant_decks = get_relevant_decks(
+        all_decks, decks_version, message_text(latest_user_message), top_k=DECK_CONTEXT_TOP_K
+    )
+    # Local vector search over past turns; skipped if it exceeds its latency budget.
+    memories = memory_store.search_within(
+        user_id, message_text(latest_user_message), top_k=MEMORY_TOP_K, timeout=MEMORY_LATENCY_BUDGET
+    )
+    system_prompt_content = get_cached_socratic_tutor_prompt(
+        decks=relevant_decks,
+        decks_version=decks_version,
+        user_memory=format_memories(memories),
+        total_decks=len(all_decks)
+    )
+    system_prompt = {"role": "system", "content": system_prompt_content}
+
+    # Multimodal messages are passed through as-is; the model handles images directly.
+    # Long sessions are trimmed and summarized to stay within the model's token budget.
+    return context_manager.build_messages(
+        session_id, system_prompt, conversation_history, model=CHAT_MODEL
+    )
+
+def remember_chat_turn(user_id, session_id, latest_user_message, visible_response):
+    # Remember the turn locally; embedding happens on a worker thread, with no LLM call.
+    if visible_response.strip():
+        job_queue.submit("MEMORY", {
+            "user_id": user_id,
+            "session_id": session_id,
+            "user_message": message_text(latest_user_message),
+            "assistant_message": visible_response
+        }, session_id=session_id)
+
+CHAT_ERROR_MESSAGE = "Sorry, I'm having trouble connecting to the AI model."
+
+def chat_turn_events(user_id, session_id, conversation_history):
+    """
+    Runs one chat turn and yields its events as (type, data) pairs:
+    ("token", {"text"}) for visible text, ("action", summary) for each
+    queued action and ("error", {"message"}) if the model call fails.
+    """
+    latest_user_message = conversation_history[-1]['content']
+    visible_response = ""
+
+    api_messages = build_chat_messages(user_id, session_id, conversation_history)
+
+    action_parser = ActionStreamParser()
+    try:
+        client = openai_client.get()
+
+        # Use a model that supports multimodal inputs directly
+        stream = client.chat.completions.create(messages=api_messages, **CHAT_COMPLETION_OPTIONS)
+
+        for chunk in stream:
+            content = chunk.choices[0].delta.content
+            if content:
+                visible_text, actions = action_parser.feed(content)
+                visible_response += visible_text
+                # Actions are queued as soon as their payload is complete.
+                for action in actions:
+                    yield "action", enqueue_action(action, session_id)
+                if visible_text:
+                    yield "token", {"text": visible_text}
+
+    except Exception as e:
+        print(f"Error with OpenRouter API: {e}")
+        yield "error", {"message": CHAT_ERROR_MESSAGE}
+
+    visible_text, actions = action_parser.flush()
+    visible_response += visible_text
+    for action in actions:
+        yield "action", enqueue_action(action, session_id)
+    if visible_text:
+        yield "token", {"text": visible_text}
+
+    remember_chat_turn(user_id, session_id, latest_user_message, visible_response)
+
+# --- Chat Streams (SSE) ---
+# With `Accept: text/event-stream` (or ?stream=sse), /api/chat runs the
+# generation on its own thread and streams typed events from a per-session
+# ring buffer. A client that loses the connection resumes with
+# GET /api/chat/stream and its Last-Event-ID, without a new model call.
+# The buffers are kept in this process only: with several workers, resuming
+# needs sticky sessions (or a single ASGI process); elsewhere it is a 404.
+chat_streams = ChatStreamRegistry()
+CHAT_STREAM_HEARTBEAT_SECONDS = 15
+
+def wants_chat_events():
+    return request.args.get('stream') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+
+def run_chat_stream(stream, events):
+    """
+    Feeds a chat turn's events into its stream; the turn runs to the end
+    whether or not a client is connected.
+    """
+    try:
+        for event, data in events:
+            stream.append(event, data)
+    except Exception as e:
+        print(f"--- [CHAT STREAM ERROR] {e} ---")
+        stream.append("error", {"message": CHAT_ERROR_MESSAGE})
+    finally:
+        stream.finish()
+
+def follow_chat_stream(stream, seq, chars):
+    """
+    Yields a stream's events after (seq, chars) as SSE until its done event.
+    """
+    while True:
+        for event_seq, event_chars, event, data in stream.events_after(seq, chars):
+            seq, chars = event_seq, event_chars
+            yield format_sse(data, event=event, event_id=stream.event_id(seq, chars))
+            if event == "done":
+                return
+        if not stream.wait(seq, CHAT_STREAM_HEARTBEAT_SECONDS):
+            yield ": heartbeat\n\n"
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     data = request.get_json()
@@ -627,108 +1293,23 @@ def chat():
     conversation_history = data.get('messages', [])
     if not conversation_history:
         return Response("No messages provided", status=400)
-    
-    latest_user_message = conversation_history[-1]['content']
 
-    def generate():
-        full_response_content = ""
-        
-        decks = get_decks_from_cache()
-        decks_json_string = json.dumps(decks, indent=2)
-        system_prompt_content = get_socratic_tutor_prompt(
-            user_memory="", # Memory disabled for now
-            flashcard_decks=decks_json_string
-        )
-        system_prompt = {"role": "system", "content": system_prompt_content}
-        
-        # Determine if we have an image to process
-        image_url = None
-        question = ""
-        is_multimodal = isinstance(latest_user_message, list)
-        if is_multimodal:
-            text_parts = []
-            for part in latest_user_message:
-                if part.get('type') == 'image_url' and part.get('image_url', {}).get('url'):
-                    image_url = part['image_url']['url']
-                elif part.get('type') == 'text':
-                    text_parts.append(part['text'])
-            question = " ".join(text_parts)
-        
-        if image_url:
-            # Directly use the multimodal capabilities of the model
-            api_messages = [system_prompt] + conversation_history
-        else:
-            api_messages = [system_prompt] + conversation_history
-
-        try:
-            client = OpenAI(
-                api_key=os.environ.get("OPENROUTER_API_KEY"),
-                base_url="https://openrouter.ai/api/v1"
-            )
-            
-            # Use a model that supports multimodal inputs directly
-            stream = client.chat.completions.create(
-                messages=api_messages,
-                model="google/gemma-3-27b-it:free", # Or another capable multimodal model
-                stream=True,
-                max_tokens=4096,
-                temperature=0.7,
-                top_p=0.8
-            )
-
-            for chunk in stream:
-                content = chunk.choices[0].delta.content
-                if content:
-                    full_response_content += content
-                    yield content
+    if wants_chat_events():
+        stream = chat_streams.create(session_id)
+        threading.Thread(
+            target=run_chat_stream,
+            args=(stream, chat_turn_events(user_id, session_id, conversation_history)),
+            daemon=True
+        ).start()
+        return Response(follow_chat_stream(stream, 0, 0), mimetype='text/event-stream', headers=SSE_HEADERS)
 
-        except Exception as e:
-            print(f"Error with OpenRouter API: {e}")
-            yield "Sorry, I'm having trouble connecting to the AI model."
+    def generate():
+        for event, data in chat_turn_events(user_id, session_id, conversation_history):
+            if event == "token":
+                yield data["text"]
+            elif event == "error":
+                yield data["message"]
 
-        # --- START: Action Processing ---
-        # After the full response is generated, check for and execute actions.
-        try:
-            # Handler for CREATE_FLASHCARDS
-            if "//ACTION: CREATE_FLASHCARDS//" in full_response_content:
-                print("---" + "[ACTION] Detected CREATE_FLASHCARDS" + "---")
-                flashcards_json_match = re.search(r'//FLASHCARDS_JSON:\s*(\[.*?\]|\{.*?\})//', full_response_content, re.DOTALL)
-                if flashcards_json_match:
-                    flashcards_json_str = flashcards_json_match.group(1)
-                    FlashCardsTool().add_flash_cards(flashcards_json_str)
-                    print(f"---" + "[ACTION] Flashcards processed successfully" + "---")
-                else:
-                    print("---" + "[ACTION ERROR] CREATE_FLASHCARDS detected, but no valid FLASHCARDS_JSON found" + "---")
-
-            if "//ACTION: CREATE_QUIZ//" in full_response_content:
-                print("---" + "[ACTION] Detected CREATE_QUIZ" + "---")
-                # Extract the JSON part of the quiz
-                quiz_json_match = re.search(r'//QUIZ_JSON:\s*(\{.*?\})//', full_response_content, re.DOTALL)
-                if quiz_json_match:
-                    quiz_json_str = quiz_json_match.group(1)
-                    quizz_tool = QuizzTool()
-                    quizz_tool.add_quiz(quiz_json_str)
-                    print("---" + "[ACTION] Quiz created successfully" + "---")
-                else:
-                    print("---" + "[ACTION ERROR] CREATE_QUIZ detected, but no valid QUIZ_JSON found" + "---")
-            
-        except Exception as e:
-            print(f"---" + "[ACTION ERROR] Failed to process AI action: {e}" + "---")
-        # --- END: Action Processing ---
-
-        # --- Temporarily disable memory.add to avoid credit errors ---
-        # try:
-        #     memory.add(
-        #         messages=[
-        #             {"role": "user", "content": str(latest_user_message)},
-        #             {"role": "assistant", "content": full_response_content}
-        #         ],
-        #         user_id=user_id,
-        #         run_id=session_id
-        #     )
-        # except Exception as e:
-        #     print(f"Adding memory failed: {e}")
-        
         try:
             timestamp = datetime.utcnow().isoformat()
             # The frontend now handles saving the entire conversation history, including edits.
@@ -742,6 +1323,14 @@ def chat():
 
     return Response(generate(), mimetype='text/plain')
 
+@app.route('/api/chat/stream', methods=['GET'])
+def resume_chat_stream():
+    session_id = request.args.get('session_id', 'default_session')
+    stream, position = chat_streams.resolve(session_id, last_event_id(request.headers, request.args))
+    if stream is None:
+        return jsonify({"error": "No chat stream to resume for this session."}), 404
+    return Response(follow_chat_stream(stream, *position), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @app.route('/api/save_conversation', methods=['POST'])
 def save_conversation():
     data = request.get_json()
@@ -753,13 +1342,6 @@ def save_conversation():
         return jsonify({"error": "user_id, session_id, and messages are required"}), 400
 
     try:
-        # Load all chat history
-        all_history = Database.load_table("chat_history")
-        
-        # Filter out existing messages for this session
-        # This ensures we only keep other sessions' history and then add the updated session's history.
-        filtered_history = [msg for msg in all_history if not (msg.get('user_id') == user_id and msg.get('session_id') == session_id)]
-
         # Append the updated messages for the current session
         # The messages received from the frontend are already in the correct order and state
         for msg in messages:
@@ -769,13 +1351,19 @@ def save_conversation():
             if 'timestamp' not in msg: # Add timestamp if missing
               msg['timestamp'] = datetime.utcnow().isoformat()
 
-        updated_history = filtered_history + messages
-        
-        Database.save_table("chat_history", updated_history)
+        # Keep other sessions' history and add the updated session's history.
+        Database.replace_rows("chat_history", in_session(user_id, session_id), messages,
+                              changes=[session_change(user_id, session_id, messages)])
+        version = Database.table_version("chat_history")
+        get_chat_history_store().replace_session(user_id, session_id, messages, version=version)
+        get_history_index().replace_session(user_id, session_id, messages, version=version)
         return jsonify({"message": "Conversation saved successfully"}), 200
     except Exception as e:
         print(f"Error saving conversation: {e}")
         return jsonify({"error": "Failed to save conversation."}), 500
 
 if __name__ == '__main__':
+    # With the debug reloader, only the serving child process warms up.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warm_up_subsystems()
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -6,5 +6,6 @@ class Deck(BaseModel):
     id: int
     name: str
     description: str = ""
+    version: int = 1
     
     
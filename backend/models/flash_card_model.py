@@ -10,4 +10,6 @@ class FlashCard(BaseModel):
     difficulty: Literal["EASY", "MEDIUM", "HARD"]
     last_reviewed: datetime = datetime.now()
     question_image_url: Optional[str] = None
-    answer_image_url: Optional[str] = None
\ No newline at end of file
+    answer_image_url: Optional[str] = None
+    duplicate_of: Optional[int] = None
+    version: int = 1
\ No newline at end of file
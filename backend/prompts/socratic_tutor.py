@@ -1,21 +1,8 @@
-def get_socratic_tutor_prompt(
-    user_memory: str = "", flashcard_decks: str = ""
-) -> str:
-    """
-    Generate the system prompt for the Socratic tutor.
-
-    This function formats a detailed prompt with contextual data, including
-    the user's memory and available flashcard decks, to guide the LLM's
-    behavior as a personalized learning assistant.
-
-    Args:
-        user_memory: A string representing the user's mastered concepts.
-        flashcard_decks: A string representing the available flashcard decks.
+import hashlib
+import threading
+from collections import OrderedDict
 
-    Returns:
-        A formatted string to be used as the system prompt.
-    """
-    template = """You are SenpAI, an expert, patient, and adaptive Socratic TEACHER & LEARNING FACILITATOR.
+_TEMPLATE = """You are SenpAI, an expert, patient, and adaptive Socratic TEACHER & LEARNING FACILITATOR.
 Your primary role is to help the user learn to think, not only to get answers.
 You must adapt your approach based on the user's request, their memory,
 and the existing learning materials.
@@ -132,8 +119,84 @@ Question: What did you try so far and where did you get stuck?`
 **Input:** `Student: "I think closures are functions that remember their scope."`  
 **Output:** `Perfect — that's a clear summary. //ACTION: CREATE_FLASHCARDS// //FLASHCARDS_JSON: [{{"deck_name": "JavaScript", "question": "What is a JavaScript Closure?", "answer": "A function that remembers the variables from the environment in which it was created."}}]// I've saved that as a flashcard for you.`
 """
+
+_PROMPT_CACHE_SIZE = 32
+_prompt_cache = OrderedDict()
+_prompt_cache_lock = threading.Lock()
+
+
+def get_socratic_tutor_prompt(
+    user_memory: str = "", flashcard_decks: str = ""
+) -> str:
+    """
+    Generate the system prompt for the Socratic tutor.
+
+    This function formats a detailed prompt with contextual data, including
+    the user's memory and available flashcard decks, to guide the LLM's
+    behavior as a personalized learning assistant.
+
+    Args:
+        user_memory: A string representing the user's mastered concepts.
+        flashcard_decks: A string representing the available flashcard decks.
+
+    Returns:
+        A formatted string to be used as the system prompt.
+    """
     if not user_memory.strip():
         user_memory = "No relevant memories found for this topic."
-    return template.format(
+    return _TEMPLATE.format(
         user_memory=user_memory, flashcard_decks=flashcard_decks
-    ) 
\ No newline at end of file
+    )
+
+
+def render_decks_compact(decks: list, total_decks: int = None) -> str:
+    """
+    Renders decks as one "id: name" line each, which carries what the model
+    needs to pick a deck in far fewer tokens than pretty-printed JSON.
+    If only the decks relevant to the conversation are passed, total_decks
+    notes how many others exist.
+    """
+    lines = [f"- {deck['id']}: {deck['name']}" for deck in decks]
+    hidden_decks = (total_decks or 0) - len(decks)
+    if hidden_decks > 0:
+        lines.append(f"- ({hidden_decks} other decks unrelated to this message are not listed)")
+    if not lines:
+        return "No flashcard decks yet."
+    return "\n".join(lines)
+
+
+def get_cached_socratic_tutor_prompt(
+    decks: list, decks_version, user_memory: str = "", total_decks: int = None
+) -> str:
+    """
+    Returns the system prompt for the given decks and memory, reusing the
+    rendered prompt while the deck table version, the selected decks and
+    the memory are unchanged.
+
+    Args:
+        decks: The deck dicts to list in the prompt.
+        decks_version: The deck table version the decks were read at.
+        user_memory: A string representing the user's mastered concepts.
+        total_decks: The size of the whole library, if decks is a subset.
+
+    Returns:
+        A formatted string to be used as the system prompt.
+    """
+    memory_digest = hashlib.sha256(user_memory.encode("utf-8")).hexdigest()
+    cache_key = (decks_version, tuple(deck["id"] for deck in decks), total_decks, memory_digest)
+
+    with _prompt_cache_lock:
+        cached_prompt = _prompt_cache.get(cache_key)
+        if cached_prompt is not None:
+            _prompt_cache.move_to_end(cache_key)
+            return cached_prompt
+
+    prompt = get_socratic_tutor_prompt(
+        user_memory=user_memory,
+        flashcard_decks=render_decks_compact(decks, total_decks=total_decks)
+    )
+    with _prompt_cache_lock:
+        _prompt_cache[cache_key] = prompt
+        while len(_prompt_cache) > _PROMPT_CACHE_SIZE:
+            _prompt_cache.popitem(last=False)
+    return prompt
@@ -76,6 +76,7 @@ def seed_database():
     try:
         with open(history_file_path, 'w') as f:
             json.dump([], f)
+        Database.notify_changed("chat_history")
         print(f"  - Successfully cleared chat history file: {history_file_path}")
     except Exception as e:
         print(f"  - Error clearing chat history file: {e}")
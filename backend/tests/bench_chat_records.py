@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import gc
+import time
+import tracemalloc
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chat_records import ChatHistoryStore
+
+MESSAGE_COUNT = int(os.environ.get("BENCH_MESSAGES", 1_000_000))
+USERS = 200
+MESSAGES_PER_SESSION = 40
+
+def synthetic_history(count):
+    """Yield chat_history rows shaped like json.load output, where every value is its own string object"""
+    for i in range(count):
+        session = i // MESSAGES_PER_SESSION
+        yield {
+            "user_id": f"user_{session % USERS}",
+            "session_id": f"{session:08x}-41ad-492f-bbdf-ab2538f22c14",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i} about photosynthesis and the Calvin cycle.",
+            "timestamp": f"2025-08-31T16:{(i // 60) % 60:02d}:{i % 60:02d}.765070",
+        }
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+def report(name, size, elapsed):
+    print(f"{name:<22} {size / 2**20:8.1f} MiB  {size / MESSAGE_COUNT:6.0f} B/message  {elapsed:6.2f} s")
+
+if __name__ == "__main__":
+    print(f"=== Chat history memory, {MESSAGE_COUNT:,} messages ===")
+    rows, dict_size, dict_time = measure(lambda: list(synthetic_history(MESSAGE_COUNT)))
+    report("list of dicts", dict_size, dict_time)
+    del rows
+
+    def build_store():
+        store = ChatHistoryStore()
+        store.rebuild(synthetic_history(MESSAGE_COUNT), version=1)
+        return store
+    store, record_size, record_time = measure(build_store)
+    report("ChatHistoryStore", record_size, record_time)
+    assert store.message_count() == MESSAGE_COUNT
+    print(f"✅ Records use {record_size / dict_size:.0%} of the dict representation")
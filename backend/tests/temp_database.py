@@ -0,0 +1,56 @@
+import sys
+import os
+import atexit
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database
+from utils.change_log import ChangeLog
+from utils.table_versions import VersionCounters
+
+_session_dir = None
+_session_versions = None
+
+
+def _temporary_versions():
+    """
+    Returns version counters shared by every temporary database in this
+    test run. They start from the real counters and are bumped on each use,
+    so an in-memory index built against one temporary database never looks
+    current for the real tables or for a later temporary database.
+    """
+    global _session_dir, _session_versions
+    if _session_versions is None:
+        _session_dir = tempfile.mkdtemp(prefix="test-versions-")
+        atexit.register(shutil.rmtree, _session_dir, True)
+        path = os.path.join(_session_dir, "table_versions")
+        if os.path.exists(Database.versions.path):
+            shutil.copyfile(Database.versions.path, path)
+        _session_versions = VersionCounters(path, list(Database.tables))
+    for table_name in Database.tables:
+        _session_versions.bump(table_name)
+    return _session_versions
+
+
+@contextmanager
+def temporary_database(storage_format: str = None):
+    """
+    Points every Database table, the version counters and the change log at
+    a temporary directory, so tests that write through Database never touch
+    the real database/ files. Yields the directory.
+    """
+    original = (dict(Database.tables), Database.versions, Database.changes, Database.storage_format)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            Database.tables = {name: os.path.join(tmp_dir, os.path.basename(path)) for name, path in original[0].items()}
+            Database.versions = _temporary_versions()
+            Database.changes = ChangeLog(os.path.join(tmp_dir, "changes.jsonl"))
+            if storage_format:
+                Database.storage_format = storage_format
+            yield tmp_dir
+        finally:
+            Database.tables, Database.versions, Database.changes, Database.storage_format = original
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.action_stream import ActionStreamParser
+
+RESPONSE = (
+    'Perfect, that is a clear summary. //ACTION: CREATE_FLASHCARDS// '
+    '//FLASHCARDS_JSON: [{"deck_name": "JS", "question": "What is {x}?", '
+    '"answer": "A \\"quoted\\" ] // value", "tags": {"nested": [1, {"deep": true}]}}]// '
+    "I've saved that as a flashcard. See https://example.com for more.\n"
+    '//ACTION: CREATE_QUIZ// //QUIZ_JSON: {"title": "Quiz", "questions": '
+    '[{"question_text": "2+2?", "options": ["3", "4"], "correct_answer": "4"}]}//\n'
+    "Good luck!"
+)
+
+def run_parser(chunk_size):
+    parser = ActionStreamParser()
+    visible_text = ""
+    actions = []
+    for i in range(0, len(RESPONSE), chunk_size):
+        text, new_actions = parser.feed(RESPONSE[i:i + chunk_size])
+        visible_text += text
+        actions.extend(new_actions)
+    text, new_actions = parser.flush()
+    return visible_text + text, actions + new_actions
+
+def test_action_stream_parser():
+    """Test that actions are extracted whole and hidden for any chunking"""
+
+    expected_text = (
+        "Perfect, that is a clear summary. I've saved that as a flashcard. "
+        "See https://example.com for more.\n\nGood luck!"
+    )
+    for chunk_size in (1, 2, 5, 13, len(RESPONSE)):
+        visible_text, actions = run_parser(chunk_size)
+        assert visible_text == expected_text, (chunk_size, visible_text)
+        assert [action.kind for action in actions] == ["FLASHCARDS", "QUIZ"]
+        assert [action.name for action in actions] == ["CREATE_FLASHCARDS", "CREATE_QUIZ"]
+
+        flashcards = json.loads(actions[0].payload)
+        assert flashcards[0]["tags"]["nested"][1]["deep"] is True
+        assert json.loads(actions[1].payload)["questions"][0]["correct_answer"] == "4"
+    print("✅ Actions extracted and hidden for every chunk size")
+
+def test_unterminated_payload_is_hidden():
+    """Test that a payload cut off by the end of the stream is not shown"""
+
+    parser = ActionStreamParser()
+    text, actions = parser.feed('Here you go //QUIZ_JSON: {"title": "Cut')
+    final_text, final_actions = parser.flush()
+    assert text + final_text == "Here you go "
+    assert actions == [] and final_actions == []
+    print("✅ Unterminated payload dropped")
+
+if __name__ == "__main__":
+    print("=== Action Stream Parser Test ===")
+    test_action_stream_parser()
+    test_unterminated_payload_is_hidden()
+    print("=== Test Complete ===")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+import tempfile
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analytics import AnalyticsEngine, CardColumns
+from utils.database import Database
+from utils.deck_stats import parse_timestamp
+
+NOW = parse_timestamp("2024-05-10T12:00:00Z")
+
+def make_card(card_id, deck_id, difficulty, last_reviewed):
+    return {"id": card_id, "deck_id": deck_id, "difficulty": difficulty, "last_reviewed": last_reviewed}
+
+def make_engine(directory):
+    return AnalyticsEngine(
+        review_events_path=os.path.join(directory, "review_events.jsonl"),
+        quiz_attempts_path=os.path.join(directory, "quiz_attempts.jsonl")
+    )
+
+def test_card_columns_follow_card_changes():
+    """Test that card columns stay aligned when cards are updated and removed"""
+
+    columns = CardColumns()
+    columns.rebuild([make_card(i, i % 2, "EASY", None) for i in range(1, 6)], version=1)
+    columns.update_card(make_card(2, 7, "HARD", "2024-05-09T00:00:00Z"), version=2)
+    columns.remove_cards([1], version=3)
+    snapshot = columns.snapshot()
+    rows = {int(card_id): (int(deck_id), int(code)) for card_id, deck_id, code in zip(snapshot["id"], snapshot["deck_id"], snapshot["difficulty"])}
+    print(f"✅ Rows after update and delete: {rows}")
+    assert rows == {2: (7, 2), 3: (1, 0), 4: (0, 0), 5: (1, 0)}
+
+    # A missed write leaves the columns stale instead of half updated.
+    columns.remove_cards([3], version=5)
+    assert columns.version is None
+
+def test_card_groups():
+    """Test card counts and due counts grouped by deck and difficulty"""
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(directory)
+        engine.cards.rebuild([
+            make_card(1, 1, "HARD", "2024-05-09T08:00:00Z"),  # due
+            make_card(2, 1, "EASY", "2024-05-08T08:00:00Z"),
+            make_card(3, 1, "HARD", None),                    # never reviewed, due
+            make_card(4, 2, "MEDIUM", "2024-05-09T08:00:00Z"),
+        ], version=Database.table_version("flash_cards"))
+
+        by_deck = sorted(engine.card_groups(["deck_id"], NOW), key=lambda group: group["deck_id"])
+        print(f"✅ Cards by deck: {by_deck}")
+        assert by_deck == [
+            {"deck_id": 1, "count": 3, "due_count": 2},
+            {"deck_id": 2, "count": 1, "due_count": 0},
+        ]
+        by_difficulty = {group["difficulty"]: group["count"] for group in engine.card_groups(["difficulty"], NOW)}
+        assert by_difficulty == {"EASY": 1, "MEDIUM": 1, "HARD": 2}
+        assert engine.card_groups([], NOW) == [{"count": 4, "due_count": 2}]
+
+def test_review_queries():
+    """Test review volume, difficulty transitions and the retention curve"""
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(directory)
+        reviews = [
+            # (previous review, review, from, to)
+            (None, "2024-05-01T09:00:00Z", "EASY", "HARD"),
+            ("2024-05-01T09:00:00Z", "2024-05-01T20:00:00Z", "HARD", "MEDIUM"),
+            ("2024-05-01T20:00:00Z", "2024-05-04T10:00:00Z", "MEDIUM", "EASY"),
+            ("2024-04-01T00:00:00Z", "2024-05-04T11:00:00Z", "EASY", "HARD"),
+        ]
+        for previous, reviewed, source, target in reviews:
+            engine.record_review(make_card(1, 1, source, previous), make_card(1, 1, target, reviewed))
+
+        volume = engine.review_volume("day")
+        print(f"✅ Reviews per day: {volume}")
+        assert [(bucket["start"][:10], bucket["count"]) for bucket in volume] == [("2024-05-01", 2), ("2024-05-04", 2)]
+        assert engine.review_volume("day", deck_id=2) == []
+        assert len(engine.review_volume("day", since=parse_timestamp("2024-05-02"))) == 1
+
+        transitions = engine.difficulty_transitions()
+        assert transitions["EASY"]["HARD"] == 2
+        assert transitions["HARD"]["MEDIUM"] == 1
+        assert sum(sum(row.values()) for row in transitions.values()) == 4
+
+        curve = engine.retention_curve()
+        print(f"✅ Retention curve: {curve}")
+        assert [(point["min_days"], point["reviews"], point["retention"]) for point in curve] == [
+            (0, 1, 1.0), (2, 1, 1.0), (30, 1, 0.0),
+        ]
+
+        # Events written by another process are read from the file.
+        other = make_engine(directory)
+        assert len(other.reviews.snapshot()["card_id"]) == 4
+
+def test_review_log_with_concurrent_writer():
+    """Test that a review event appended by another worker mid-append is neither lost nor split"""
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(directory)
+        engine.record_review(make_card(1, 1, "EASY", None), make_card(1, 1, "HARD", "2024-05-01T09:00:00Z"))
+        with open(engine.reviews.path, "rb") as f:
+            other_event = f.readline()
+
+        # Another worker appends its own event while this one is appending.
+        reviews = engine.reviews
+        catch_up = reviews._catch_up
+        def catch_up_while_other_worker_appends():
+            catch_up()
+            reviews._catch_up = catch_up
+            with open(reviews.path, "ab") as f:
+                f.write(other_event)
+        reviews._catch_up = catch_up_while_other_worker_appends
+        engine.record_review(make_card(2, 1, "EASY", None), make_card(2, 1, "MEDIUM", "2024-05-02T09:00:00Z"))
+
+        assert len(reviews.snapshot()["card_id"]) == 3
+        assert len(make_engine(directory).reviews.snapshot()["card_id"]) == 3
+        print("✅ Review events from another worker are kept whole")
+
+def test_quiz_activity():
+    """Test quiz attempts per day with the mean score"""
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "quiz_attempts.jsonl"), "w") as f:
+            for quiz_id, created_at, score in [(1, "2024-05-01T10:00:00", 50), (1, "2024-05-01T18:00:00", 100), (2, "2024-05-03T10:00:00", 80)]:
+                f.write(json.dumps({"quiz_id": quiz_id, "created_at": created_at, "score": score}) + "\n")
+        engine = make_engine(directory)
+        activity = engine.quiz_activity("day")
+        print(f"✅ Quiz activity: {activity}")
+        assert [(bucket["count"], bucket["mean"]) for bucket in activity] == [(2, 75.0), (1, 80.0)]
+        assert engine.quiz_activity("week", quiz_id=2)[0]["count"] == 1
+
+if __name__ == "__main__":
+    print("=== Analytics Test ===")
+    test_card_columns_follow_card_changes()
+    test_card_groups()
+    test_review_queries()
+    test_review_log_with_concurrent_writer()
+    test_quiz_activity()
+    print("=== Test Complete ===")
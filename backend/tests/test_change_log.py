@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import threading
+import tempfile
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.change_log import ChangeLog, diff_rows
+from utils.database import Database
+from temp_database import temporary_database
+
+def test_diff_rows():
+    """Test row-level changes between two versions of a table"""
+
+    old = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 3, "name": "c"}]
+    new = [{"id": 1, "name": "a"}, {"id": 3, "name": "C"}, {"id": 4, "name": "d"}]
+    changes = diff_rows(old, new)
+    assert [(change["op"], change["row_id"]) for change in changes] == [("update", 3), ("insert", 4), ("delete", 2)]
+    assert diff_rows([], [{"role": "user", "content": "hi"}]) == [{"op": "reset"}]
+    print("✅ Row changes are matched by id")
+
+def test_database_writes_feed_the_change_log():
+    """Test that table writes append resumable change events"""
+
+    with temporary_database():
+        Database.save_table("decks", [{"id": 1, "name": "Deck 1"}])
+        Database.add_to_table("decks", {"id": 2, "name": "Deck 2"})
+        Database.update_row("decks", 1, lambda deck: {**deck, "name": "Renamed"})
+        Database.delete_rows("decks", lambda deck: deck["id"] == 2)
+
+        events = Database.changes.read_since(0)
+        assert [(event["op"], event.get("row_id")) for event in events] == [("reset", None), ("insert", 2), ("update", 1), ("delete", 2)]
+        assert events[2]["row"]["version"] == 2
+        assert events[3]["version"] == Database.table_version("decks")
+        print(f"✅ Change events: {[event['op'] for event in events]}")
+
+        # Resuming after an event returns only the later ones.
+        assert [event["op"] for event in Database.changes.read_since(events[1]["id"])] == ["update", "delete"]
+        assert Database.changes.read_since(events[-1]["id"]) == []
+
+        # Readers waiting in this process are woken by the next write.
+        woken = []
+        waiter = threading.Thread(target=lambda: woken.append(Database.changes.wait(events[-1]["id"], timeout=5)))
+        waiter.start()
+        Database.add_to_table("decks", {"id": 3, "name": "Deck 3"})
+        waiter.join()
+        assert woken == [True]
+
+def test_change_log_rotation():
+    """Test that a full log drops its older events and keeps the ids of the rest"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log = ChangeLog(os.path.join(tmp_dir, "changes.jsonl"), max_bytes=1000)
+        for i in range(30):
+            log.append("decks", i, [{"op": "delete", "row_id": i}])
+        assert os.path.getsize(log.path) <= 1000
+        start, end = log.start_offset(), log.end_offset()
+        assert 0 < start < end
+
+        events = log.read_since(start)
+        assert events[-1]["id"] == end and events[-1]["row_id"] == 29
+        assert [event["row_id"] for event in log.read_since(events[0]["id"])] == list(range(events[1]["row_id"], 30))
+        # Positions before the rotation are gone; readers there must resync.
+        assert log.read_since(0) == []
+
+        # Another process sees the same ids.
+        assert ChangeLog(log.path).read_since(events[-2]["id"])[0]["row_id"] == 29
+        print(f"✅ Rotated log keeps events {events[0]['row_id']}..29 from id {start}")
+
+if __name__ == "__main__":
+    print("=== Change Log Test ===")
+    test_diff_rows()
+    test_database_writes_feed_the_change_log()
+    test_change_log_rotation()
+    print("=== Test Complete ===")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chat_records import ChatMessage, ChatHistoryStore, in_session
+from utils.database import Database
+from temp_database import temporary_database
+
+def make_message(user_id, session_id, role, content, **extra):
+    # Build the ids at runtime so each row has its own string objects, like json.load output.
+    return {"user_id": "".join(user_id), "session_id": "".join(session_id), "role": role, "content": content,
+            "timestamp": "2025-08-31T16:20:40", **extra}
+
+def test_records_round_trip_and_intern():
+    """Test that records keep every field and share interned id strings"""
+
+    first = ChatMessage.from_dict(make_message("alice", "s1", "user", "hi"))
+    second = ChatMessage.from_dict(make_message("alice", "s1", "assistant", [{"type": "text", "text": "hello"}], model="x"))
+    assert first.user_id is second.user_id and first.session_id is second.session_id
+    assert not hasattr(first, "__dict__")
+    assert first.extra is None
+    assert second.to_dict() == make_message("alice", "s1", "assistant", [{"type": "text", "text": "hello"}], model="x")
+    print("✅ Records round-trip with interned ids")
+
+def test_store_sessions():
+    """Test latest session, session replacement and table rows"""
+
+    store = ChatHistoryStore()
+    store.rebuild([
+        make_message("alice", "s1", "user", "one"),
+        make_message("bob", "s2", "user", "two"),
+        make_message("alice", "s3", "user", "three"),
+        make_message("alice", "s1", "assistant", "four"),
+    ], version=1)
+    assert store.latest_session_id("alice") == "s1"
+    assert [record.content for record in store.session_messages("alice", "s1")] == ["one", "four"]
+    assert list(store.user_sessions("alice")) == ["s3", "s1"]
+
+    store.replace_session("alice", "s3", [make_message("alice", "s3", "user", "edited")], version=2)
+    assert store.latest_session_id("alice") == "s3"
+
+    store.remove_session("bob", "s2", version=3)
+    assert store.latest_session_id("bob") is None
+    assert store.message_count() == 3
+
+    # A missed write leaves the store stale instead of half updated.
+    store.remove_session("alice", "s1", version=5)
+    assert store.version is None
+    print("✅ Store follows session writes")
+
+def test_session_saves_keep_other_workers_sessions():
+    """Test that saving a session keeps sessions another worker saved after this one last read"""
+
+    with temporary_database():
+        Database.save_table("chat_history", [make_message("alice", "s1", "user", "one")])
+        store = ChatHistoryStore()
+        store.rebuild(Database.load_table("chat_history"), Database.table_version("chat_history"))
+
+        # Another worker saves bob's session; this worker's store has not seen it.
+        Database.replace_rows("chat_history", in_session("bob", "s2"), [make_message("bob", "s2", "user", "two")])
+        Database.replace_rows("chat_history", in_session("alice", "s1"), [make_message("alice", "s1", "user", "edited")])
+        assert [row["content"] for row in Database.load_table("chat_history")] == ["two", "edited"]
+
+        store.replace_session("alice", "s1", [make_message("alice", "s1", "user", "edited")],
+                              version=Database.table_version("chat_history"))
+        assert store.version is None
+        print("✅ Session saves keep other workers' sessions")
+
+if __name__ == "__main__":
+    print("=== Chat Records Test ===")
+    test_records_round_trip_and_intern()
+    test_store_sessions()
+    test_session_saves_keep_other_workers_sessions()
+    print("=== Test Complete ===")
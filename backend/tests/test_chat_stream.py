@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import threading
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chat_stream import ChatStream, ChatStreamRegistry, parse_event_id
+
+def fill(stream, words):
+    for word in words:
+        stream.append("token", {"text": word})
+
+def test_resume_from_ring_buffer():
+    """Test that a reconnecting client gets exactly the events after its last one"""
+
+    stream = ChatStream("s1", capacity=8)
+    fill(stream, ["The ", "mito", "chondria "])
+    stream.append("action", {"kind": "FLASHCARDS", "job_id": "j1"})
+    fill(stream, ["is ", "the powerhouse."])
+    stream.finish()
+
+    entries = stream.events_after(0, 0)
+    assert [entry[2] for entry in entries] == ["token", "token", "token", "action", "token", "token", "done"]
+    event_id = stream.event_id(*entries[1][:2])
+    _, seq, chars = parse_event_id(event_id)
+    resumed = stream.events_after(seq, chars)
+    assert "".join(data["text"] for _, _, event, data in resumed if event == "token") == "chondria is the powerhouse."
+    assert resumed[-1][3] == {"chars": len("The mitochondria is the powerhouse.")}
+    print("✅ Resumed stream replays only the missed events")
+
+def test_catch_up_after_eviction():
+    """Test that evicted tokens come back as catch-up tokens around the missed actions"""
+
+    stream = ChatStream("s1", capacity=4)
+    fill(stream, ["a", "b"])
+    stream.append("action", {"kind": "QUIZ"})
+    fill(stream, ["c", "d", "e", "f"])
+    stream.finish()
+
+    # The client had seen "a" (seq 1, 1 char); events 2-4 are no longer buffered.
+    resumed = stream.events_after(1, 1)
+    assert resumed[:3] == [(2, 2, "token", {"text": "b"}), (3, 2, "action", {"kind": "QUIZ"}), (4, 3, "token", {"text": "c"})]
+    assert "".join(data["text"] for _, _, event, data in resumed if event == "token") == "bcdef"
+    print("✅ Evicted text is caught up from the full response")
+
+    # A client that drops right after the replayed action resumes with no repeated text.
+    resumed = stream.events_after(*resumed[1][:2])
+    assert "".join(data["text"] for _, _, event, data in resumed if event == "token") == "cdef"
+    assert [entry[2] for entry in resumed] == ["token", "token", "token", "token", "done"]
+    print("✅ Resuming from a replayed action continues after it")
+
+def test_registry_and_waiting():
+    """Test stream lookup by Last-Event-ID and waking readers"""
+
+    registry = ChatStreamRegistry()
+    stream = registry.create("s1")
+    assert registry.resolve("s1", None) == (stream, (0, 0))
+    assert registry.resolve("s1", stream.event_id(3, 10)) == (stream, (3, 10))
+    assert registry.resolve("other", stream.event_id(3, 10)) == (None, None)
+    assert registry.resolve("s1", "unknown:1:1") == (None, None)
+
+    woken = []
+    reader = threading.Thread(target=lambda: woken.append(stream.wait(0, timeout=5)))
+    reader.start()
+    stream.append("token", {"text": "hi"})
+    reader.join()
+    assert woken == [True]
+
+    stream.finish()
+    registry.ttl_seconds = -1
+    assert registry.latest("s1") is None
+    print("✅ Registry resolves and expires streams")
+
+if __name__ == "__main__":
+    print("=== Chat Stream Test ===")
+    test_resume_from_ring_buffer()
+    test_catch_up_after_eviction()
+    test_registry_and_waiting()
+    print("=== Test Complete ===")
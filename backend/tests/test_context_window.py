@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.context_window import ContextWindowManager, count_message_tokens
+
+def test_context_window_stays_within_budget():
+    """Test that prompt size stays bounded however long the session grows"""
+
+    manager = ContextWindowManager(budgets={"test-model": 2000}, summary_tokens=300)
+    system_prompt = {"role": "system", "content": "You are a tutor. " * 50}
+    messages = []
+    sizes = []
+    for i in range(300):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": f"Point number {i}. " + "details " * 120})
+        api_messages = manager.build_messages("session_1", system_prompt, messages, model="test-model")
+        sizes.append(sum(count_message_tokens(message) for message in api_messages))
+
+    print(f"✅ Largest prompt: {max(sizes)} tokens")
+    assert max(sizes) <= 2000
+    assert api_messages[0] is system_prompt
+    assert api_messages[-1] is messages[-1]
+    assert api_messages[1]["content"].startswith("Summary of the earlier part")
+    assert "Point number" in api_messages[1]["content"]
+
+def test_short_sessions_are_untouched():
+    """Test that conversations within budget are sent unchanged"""
+
+    manager = ContextWindowManager(budgets={"test-model": 2000})
+    system_prompt = {"role": "system", "content": "You are a tutor."}
+    messages = [
+        {"role": "user", "content": "What is a closure?"},
+        {"role": "assistant", "content": "What do you think happens to variables after a function returns?"},
+    ]
+    assert manager.build_messages("session_2", system_prompt, messages, model="test-model") == [system_prompt] + messages
+    print("✅ Short session sent unchanged")
+
+if __name__ == "__main__":
+    print("=== Context Window Test ===")
+    test_context_window_stays_within_budget()
+    test_short_sessions_are_untouched()
+    print("=== Test Complete ===")
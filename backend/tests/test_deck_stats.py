@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.deck_stats import DeckStatsIndex, parse_timestamp
+
+NOW = parse_timestamp("2024-05-10T12:00:00Z")
+
+def make_card(card_id, deck_id, difficulty, last_reviewed):
+    return {"id": card_id, "deck_id": deck_id, "difficulty": difficulty, "last_reviewed": last_reviewed}
+
+def test_deck_stats_follow_card_changes():
+    """Test counts, due cards and last review as cards are added, updated and removed"""
+
+    index = DeckStatsIndex()
+    index.rebuild([
+        make_card(1, 1, "HARD", "2024-05-09T08:00:00Z"),   # due after one day
+        make_card(2, 1, "EASY", "2024-05-08T08:00:00"),    # not due for a week
+        make_card(3, 1, "MEDIUM", "1970-01-01T00:00:00Z"), # never reviewed
+        make_card(4, 2, "EASY", "2024-04-01T00:00:00Z"),
+    ], version=1)
+
+    stats = index.deck_stats(1, now=NOW)
+    print(f"✅ Deck 1 stats: {stats}")
+    assert (stats["card_count"], stats["easy_count"], stats["medium_count"], stats["hard_count"]) == (3, 1, 1, 1)
+    assert stats["due_count"] == 2
+    assert stats["last_reviewed"].startswith("2024-05-09T08:00:00")
+
+    index.update_card(make_card(1, 1, "EASY", "2024-05-10T11:00:00Z"), version=2)
+    index.add_cards([make_card(5, 1, "HARD", "2024-05-01T00:00:00Z")], version=3)
+    stats = index.deck_stats(1, now=NOW)
+    assert (stats["card_count"], stats["easy_count"], stats["hard_count"], stats["due_count"]) == (4, 2, 1, 2)
+    assert stats["last_reviewed"].startswith("2024-05-10T11:00:00")
+
+    index.remove_cards([1, 2, 3, 5], version=4)
+    assert index.deck_stats(1, now=NOW) == {
+        "card_count": 0, "easy_count": 0, "medium_count": 0, "hard_count": 0, "due_count": 0, "last_reviewed": None
+    }
+    decks = index.with_stats([{"id": 2, "name": "Deck 2"}], now=NOW)
+    assert decks[0]["name"] == "Deck 2" and decks[0]["due_count"] == 1
+
+if __name__ == "__main__":
+    print("=== Deck Stats Test ===")
+    test_deck_stats_follow_card_changes()
+    print("=== Test Complete ===")
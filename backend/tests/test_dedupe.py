@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.dedupe import DuplicateIndex, minhash_signature, card_fingerprint_text
+from utils.database import Database
+from tools.flash_cards_tool import FlashCardsTool
+from temp_database import temporary_database
+
+def make_card(card_id, question, answer, deck_id=1):
+    return {"id": card_id, "question": question, "answer": answer, "deck_id": deck_id}
+
+def signature_of(question, answer):
+    return minhash_signature(card_fingerprint_text({"question": question, "answer": answer}))
+
+def test_near_duplicates_are_found():
+    """Test that reworded copies match while unrelated cards do not"""
+
+    index = DuplicateIndex()
+    index.rebuild([
+        make_card(1, "What is the powerhouse of the cell?", "The mitochondria, which produce ATP."),
+        make_card(2, "What is the capital of France?", "Paris"),
+        make_card(3, "Who wrote Hamlet?", "William Shakespeare"),
+    ], version=1)
+
+    matches = index.find_duplicates(signature_of("What is the powerhouse of a cell?", "The mitochondria which produce ATP"))
+    print(f"✅ Matches for reworded card: {matches}")
+    assert [card_id for card_id, _ in matches] == [1]
+    assert index.find_duplicates(signature_of("What is the capital of Germany?", "Berlin")) == []
+    assert index.find_duplicates(signature_of("", "")) == []
+
+    index.remove_cards([1])
+    assert index.find_duplicates(signature_of("What is the powerhouse of the cell?", "The mitochondria, which produce ATP.")) == []
+
+def test_duplicate_groups_respect_decks():
+    """Test that bulk grouping stays within a deck unless asked otherwise"""
+
+    index = DuplicateIndex()
+    index.rebuild([
+        make_card(1, "Define osmosis", "Diffusion of water across a membrane", deck_id=1),
+        make_card(2, "Define osmosis.", "Diffusion of water across a membrane.", deck_id=1),
+        make_card(3, "define OSMOSIS", "diffusion of water across a membrane", deck_id=2),
+        make_card(4, "Define entropy", "A measure of disorder", deck_id=1),
+    ], version=1)
+
+    groups = index.duplicate_groups()
+    print(f"✅ Groups within decks: {groups}")
+    assert groups == [[1, 2]]
+    assert index.duplicate_groups(across_decks=True) == [[1, 2, 3]]
+    assert index.duplicate_groups(deck_id=2) == []
+
+def test_version_tracking():
+    """Test that a missed write marks the index stale"""
+
+    index = DuplicateIndex()
+    index.rebuild([], version=3)
+    index.set_version(4)
+    assert index.version == 4
+    index.set_version(6)
+    assert index.version is None
+
+def test_failed_batch_leaves_no_phantom_cards():
+    """Test that cards from a batch that failed to store are not treated as duplicates"""
+
+    card = {"deck_name": "Biology", "question": "What is the powerhouse of the cell?", "answer": "The mitochondria"}
+    with temporary_database():
+        tool = FlashCardsTool()
+        try:
+            tool.add_flash_cards(json.dumps([card, "not a card"]), on_duplicate="skip")
+            assert False, "a malformed card should fail the batch"
+        except AttributeError:
+            pass
+        assert Database.load_table("flash_cards") == []
+
+        result = tool.add_flash_cards(json.dumps([card, card]), on_duplicate="skip")
+        print(f"✅ Retried batch: {result}")
+        assert result["added"] == [1]
+        assert result["skipped"] == [{"question": card["question"], "duplicate_of": 1}]
+        assert [stored["id"] for stored in Database.load_table("flash_cards")] == [1]
+
+if __name__ == "__main__":
+    print("=== Dedupe Test ===")
+    test_near_duplicates_are_found()
+    test_duplicate_groups_respect_decks()
+    test_version_tracking()
+    test_failed_batch_leaves_no_phantom_cards()
+    print("=== Test Complete ===")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import threading
+import time
+
+import numpy as np
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.embedding_service import EmbeddingService
+
+def test_concurrent_requests_are_batched_and_cached():
+    """Test that concurrent embed calls share model calls and repeat texts hit the cache"""
+
+    batch_sizes = []
+
+    def encode(texts):
+        batch_sizes.append(len(texts))
+        time.sleep(0.005)
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    service = EmbeddingService(encode_fn=encode, max_wait=0.01, max_batch_size=64)
+    results = {}
+
+    def worker(i):
+        results[i] = service.embed([f"text number {i}"])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"✅ 40 requests encoded in {len(batch_sizes)} model calls: {batch_sizes}")
+    assert sum(batch_sizes) == 40
+    assert len(batch_sizes) < 40
+    assert results[7][0][0] == len("text number 7")
+
+    cached = service.embed(["text number 7", "text number 8"])
+    assert cached.shape == (2, 2)
+    assert sum(batch_sizes) == 40
+
+    stats = service.stats()
+    assert stats["cache_hits"] == 2
+    assert stats["batches"] == len(batch_sizes)
+    assert stats["requests"] == 41
+
+if __name__ == "__main__":
+    print("=== Embedding Service Test ===")
+    test_concurrent_requests_are_batched_and_cached()
+    print("=== Test Complete ===")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.history_index import HistoryIndex
+
+def make_message(user_id, session_id, role, content, timestamp):
+    return {"user_id": user_id, "session_id": session_id, "role": role, "content": content, "timestamp": timestamp}
+
+def test_history_index_search_and_maintenance():
+    """Test that sessions are found by message text and follow saves and deletes"""
+
+    index = HistoryIndex()
+    index.rebuild([
+        make_message("alice", "s1", "user", "Can you explain mitochondria?", "2024-01-01T10:00:00"),
+        make_message("alice", "s1", "assistant", "Mitochondria produce most of the cell's energy.", "2024-01-01T10:00:05"),
+        make_message("alice", "s2", "user", [
+            {"type": "text", "text": "What is in this picture of a cell?"},
+            {"type": "image_url", "image_url": {"url": "http://example.com/cell.png"}}
+        ], "2024-01-02T09:00:00"),
+        make_message("bob", "s3", "user", "Mitochondria again please", "2024-01-03T09:00:00"),
+    ], version=1)
+
+    results = index.search("alice", "mitochondria")
+    print(f"✅ Search results: {results}")
+    assert [result["session_id"] for result in results] == ["s1"]
+    assert results[0]["match_count"] == 2
+    assert all("itochondria" in snippet["snippet"] for snippet in results[0]["snippets"])
+
+    assert [result["session_id"] for result in index.search("alice", "pictures")] == ["s2"]
+
+    index.replace_session("alice", "s2", [
+        make_message("alice", "s2", "user", "Tell me about ribosomes", "2024-01-02T09:00:00")
+    ], version=2)
+    assert index.search("alice", "picture") == []
+    assert [result["session_id"] for result in index.search("alice", "ribosomes")] == ["s2"]
+
+    index.remove_session("alice", "s1", version=3)
+    assert index.search("alice", "mitochondria") == []
+    assert [result["session_id"] for result in index.search("bob", "mitochondria")] == ["s3"]
+    assert index.stats() == {"messages": 2, "sessions": 2, "users": 2, "version": 3}
+
+if __name__ == "__main__":
+    print("=== History Index Test ===")
+    test_history_index_search_and_maintenance()
+    print("=== Test Complete ===")
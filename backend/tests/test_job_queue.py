@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+import tempfile
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.job_queue import JobQueue, IdempotencyKeys, make_idempotency_key
+
+def wait_for(job_queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = job_queue.get_job(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_job_queue_retries_and_idempotency():
+    """Test retries of transient errors and deduplication by idempotency key"""
+
+    calls = []
+    failures = [RuntimeError("temporary outage")]
+
+    def handler(payload):
+        if failures:
+            raise failures.pop()
+        calls.append(payload)
+
+    job_queue = JobQueue(workers=2, retry_delay=0.01)
+    job_queue.register("FLASHCARDS", handler)
+
+    key = make_idempotency_key("session_1", "FLASHCARDS", "[]")
+    job = job_queue.submit("FLASHCARDS", "[]", idempotency_key=key, session_id="session_1")
+    replayed_job = job_queue.submit("FLASHCARDS", "[]", idempotency_key=key, session_id="session_1")
+    assert replayed_job["id"] == job["id"]
+
+    finished_job = wait_for(job_queue, job["id"])
+    print(f"✅ Finished job: {finished_job}")
+    assert finished_job["status"] == "succeeded"
+    assert finished_job["attempts"] == 2
+    assert calls == ["[]"]
+    assert [j["id"] for j in job_queue.get_jobs(session_id="session_1")] == [job["id"]]
+
+def test_job_queue_does_not_retry_invalid_payloads():
+    """Test that a ValueError fails the job without retrying"""
+
+    def handler(payload):
+        raise ValueError("Invalid JSON format")
+
+    job_queue = JobQueue(workers=1, retry_delay=0.01)
+    job_queue.register("QUIZ", handler)
+    job = job_queue.submit("QUIZ", "{")
+
+    finished_job = wait_for(job_queue, job["id"])
+    assert finished_job["status"] == "failed"
+    assert finished_job["attempts"] == 1
+    assert "Invalid JSON" in finished_job["error"]
+    print("✅ Invalid payload failed without retry")
+
+def test_idempotency_keys_are_shared_and_outlive_jobs():
+    """Test that a retried action is recognized by another worker and after its job is evicted"""
+
+    calls = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "job_keys.json")
+        first = JobQueue(workers=1, max_jobs=1, idempotency_keys=IdempotencyKeys(path))
+        second = JobQueue(workers=1, idempotency_keys=IdempotencyKeys(path))
+        for job_queue in (first, second):
+            job_queue.register("FLASHCARDS", calls.append)
+
+        key = make_idempotency_key("session_1", "FLASHCARDS", "[]")
+        job = first.submit("FLASHCARDS", "[]", idempotency_key=key, session_id="session_1")
+        wait_for(first, job["id"])
+        first.submit("FLASHCARDS", "[1]")  # evicts the finished job
+        assert first.get_job(job["id"]) is None
+
+        assert first.submit("FLASHCARDS", "[]", idempotency_key=key)["id"] == job["id"]
+        replayed = second.submit("FLASHCARDS", "[]", idempotency_key=key, session_id="session_1")
+        assert (replayed["id"], replayed["status"]) == (job["id"], "succeeded")
+        time.sleep(0.1)
+        assert calls.count("[]") == 1
+        print("✅ Retries on another worker reuse the finished job")
+
+        # Keys expire after their TTL, and then the action can run again.
+        expired = JobQueue(workers=1, idempotency_keys=IdempotencyKeys(path, ttl_seconds=-1))
+        expired.register("FLASHCARDS", calls.append)
+        rerun = expired.submit("FLASHCARDS", "[]", idempotency_key=key)
+        assert rerun["id"] != job["id"]
+        wait_for(expired, rerun["id"])
+        wait_for(first, first.get_jobs()[-1]["id"])
+
+if __name__ == "__main__":
+    print("=== Job Queue Test ===")
+    test_job_queue_retries_and_idempotency()
+    test_job_queue_does_not_retry_invalid_payloads()
+    test_idempotency_keys_are_shared_and_outlive_jobs()
+    print("=== Test Complete ===")
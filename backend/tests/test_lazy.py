@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import threading
+import time
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.lazy import LazyResource, start_background_warm_up
+
+def test_lazy_resource_initializes_once():
+    """Test that concurrent first calls share a single initialization"""
+
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    resource = LazyResource("slow", factory)
+    assert resource.status()["state"] == "cold"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resource.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"✅ Factory called {len(calls)} time(s) for 8 concurrent callers")
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert resource.ready and resource.status()["load_seconds"] is not None
+
+def test_background_warm_up_records_failures():
+    """Test that warm-up failures are reported in the status instead of raised"""
+
+    def broken():
+        raise RuntimeError("model not found")
+
+    good = LazyResource("good", lambda: "client")
+    bad = LazyResource("bad", broken)
+    start_background_warm_up([bad, good]).join(timeout=5)
+
+    print(f"✅ Status after warm-up: {bad.status()} / {good.status()}")
+    assert good.ready
+    assert bad.status() == {"state": "failed", "load_seconds": None, "error": "model not found"}
+
+def test_resource_loaded_elsewhere_is_ready():
+    """Test that a subsystem loaded by another component reports ready"""
+
+    loaded = []
+    resource = LazyResource("embeddings", lambda: "model", is_loaded=lambda: bool(loaded))
+    assert not resource.ready and resource.status()["state"] == "cold"
+    loaded.append(True)
+    assert resource.ready and resource.status()["state"] == "ready"
+    print("✅ Loads outside the resource count as ready")
+
+if __name__ == "__main__":
+    print("=== Lazy Resource Test ===")
+    test_lazy_resource_initializes_once()
+    test_background_warm_up_records_failures()
+    test_resource_loaded_elsewhere_is_ready()
+    print("=== Test Complete ===")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import re
+import tempfile
+import zlib
+
+import numpy as np
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.memory_store import LocalMemoryStore, format_memories
+
+def bag_of_words_embedding(texts, dim=64):
+    """Deterministic stand-in for the sentence-transformers model"""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"\w+", text.lower()):
+            vectors[row, zlib.crc32(word.encode()) % dim] += 1.0
+    return vectors
+
+def test_memory_store_search_and_reload():
+    """Test that memories are searched per user and survive a reload"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = LocalMemoryStore(path=tmp_dir, embed_fn=bag_of_words_embedding)
+        store.add_turn("alice", "s1", "I learn best with analogies", "Think of a closure like a backpack.")
+        store.add_turn("alice", "s2", "What is photosynthesis?", "Plants turn light into chemical energy.")
+        store.add_turn("bob", "s3", "Explain closures with analogies", "A closure is like a backpack.")
+
+        results = store.search_within("alice", "closure analogies", top_k=1, timeout=1.0)
+        print(f"✅ Search results: {results}")
+        assert len(results) == 1
+        assert results[0]["session_id"] == "s1"
+
+        reloaded = LocalMemoryStore(path=tmp_dir, embed_fn=bag_of_words_embedding)
+        reloaded_results = reloaded.search("alice", "photosynthesis plants", top_k=2)
+        assert reloaded_results[0]["session_id"] == "s2"
+        assert all(result["user_id"] == "alice" for result in reloaded_results)
+        assert reloaded.search("carol", "anything") == []
+
+        formatted = format_memories(results)
+        assert formatted.startswith("- (") and "backpack" in formatted
+
+def test_memory_store_shared_between_workers():
+    """Test that stores over one directory see each other's memories and stay aligned"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        first = LocalMemoryStore(path=tmp_dir, embed_fn=bag_of_words_embedding)
+        second = LocalMemoryStore(path=tmp_dir, embed_fn=bag_of_words_embedding)
+        first.add_turn("alice", "s1", "What is a closure?", "A function that keeps its scope.")
+        assert second.search("alice", "closure scope")[0]["session_id"] == "s1"
+
+        # A crash between the two appends leaves an extra vector row; the next
+        # append cuts it off instead of shifting every later record.
+        with open(os.path.join(tmp_dir, "vectors.f32"), "ab") as f:
+            f.write(np.ones(64, dtype=np.float32).tobytes())
+        second.add_turn("alice", "s2", "What is photosynthesis?", "Plants turn light into chemical energy.")
+        first.add_turn("alice", "s3", "What is entropy?", "A measure of disorder.")
+
+        for store in (first, second, LocalMemoryStore(path=tmp_dir, embed_fn=bag_of_words_embedding)):
+            assert store.search("alice", "photosynthesis plants light", top_k=1)[0]["session_id"] == "s2"
+            assert store.search("alice", "entropy disorder", top_k=1)[0]["session_id"] == "s3"
+            assert len(store.get_records()) == 3
+        print("✅ Memories from other workers are searched and rows stay aligned")
+
+if __name__ == "__main__":
+    print("=== Memory Store Test ===")
+    test_memory_store_search_and_reload()
+    test_memory_store_shared_between_workers()
+    print("=== Test Complete ===")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+import tempfile
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.quiz_attempts import QuizAttemptLog
+
+QUIZ = {
+    "id": 7,
+    "title": "Capitals",
+    "completed_times": 2,
+    "best_score": 40,
+    "questions": [
+        {"question_text": "Capital of France?", "options": ["Paris", "Rome"], "correct_answer": "Paris"},
+        {"question_text": "Capital of Italy?", "options": ["Paris", "Rome"], "correct_answer": "Rome"},
+    ],
+}
+
+def test_attempts_are_graded_and_aggregated():
+    """Test grading, running aggregates and replay of the append-only log"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "quiz_attempts.jsonl")
+        log = QuizAttemptLog(path)
+
+        first = log.record(QUIZ, ["paris ", "Paris"], user_id="alice")
+        second = log.record(QUIZ, {"1": "Rome", "0": "Paris"}, user_id="bob")
+        print(f"✅ Scores: {first['score']} and {second['score']}")
+        assert (first["score"], first["correct_count"]) == (50, 1)
+        assert second["score"] == 100
+        assert first["results"][1] == {"question_index": 1, "answer": "Paris", "correct_answer": "Rome", "correct": False}
+
+        stats = log.get_stats(7)
+        assert stats["completed_times"] == 2 and stats["best_score"] == 100
+        assert stats["average_score"] == 75
+        assert [question["accuracy"] for question in stats["questions"]] == [1.0, 0.5]
+
+        # A second log over the same file (e.g. another worker) sees both
+        # attempts, and then picks up new ones appended by the first log.
+        other = QuizAttemptLog(path)
+        assert other.get_stats(7)["completed_times"] == 2
+        log.record(QUIZ, [], user_id="alice")
+        assert other.get_stats(7)["completed_times"] == 3
+        assert len(other.get_attempts(7, user_id="alice")) == 2
+
+        enriched = other.with_stats([QUIZ, {"id": 8, "completed_times": 0, "best_score": 0}])
+        assert (enriched[0]["completed_times"], enriched[0]["best_score"]) == (5, 100)
+        assert enriched[1] == {"id": 8, "completed_times": 0, "best_score": 0}
+        assert QUIZ["completed_times"] == 2
+
+def test_concurrent_writers_share_the_log():
+    """Test that an attempt appended by another worker mid-record is neither lost nor split"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "quiz_attempts.jsonl")
+        log = QuizAttemptLog(path)
+        other_attempt = log.record(QUIZ, ["Paris", "Rome"], user_id="bob")
+
+        # Another worker appends its own line while this log is recording.
+        catch_up = log._catch_up
+        def catch_up_while_other_worker_appends():
+            catch_up()
+            log._catch_up = catch_up
+            with open(path, "ab") as f:
+                f.write((json.dumps({**other_attempt, "id": "other"}) + "\n").encode("utf-8"))
+        log._catch_up = catch_up_while_other_worker_appends
+        log.record(QUIZ, ["Paris", "Paris"], user_id="alice")
+
+        assert log.get_stats(7)["completed_times"] == 3
+        assert QuizAttemptLog(path).get_stats(7)["completed_times"] == 3
+        print("✅ Attempts from another worker are kept whole")
+
+if __name__ == "__main__":
+    print("=== Quiz Attempts Test ===")
+    test_attempts_are_graded_and_aggregated()
+    test_concurrent_writers_share_the_log()
+    print("=== Test Complete ===")
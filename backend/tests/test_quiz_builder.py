@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.quiz_builder import build_questions
+from models import Question
+
+def make_card(card_id, question, answer, deck_id=1):
+    return {"id": card_id, "question": question, "answer": answer, "deck_id": deck_id}
+
+def test_distractors_come_from_similar_cards():
+    """Test that distractors are answers of related cards and never the correct answer"""
+
+    cards = [
+        make_card(1, "What is the capital of France?", "Paris"),
+        make_card(2, "What is the capital of Germany?", "Berlin"),
+        make_card(3, "What is the capital of Italy?", "Rome"),
+        make_card(4, "What is the capital of Spain?", "Madrid"),
+        make_card(5, "Who painted the Mona Lisa?", "Leonardo da Vinci"),
+        make_card(6, "Who painted The Starry Night?", "Vincent van Gogh"),
+        make_card(7, "What is the chemical symbol of gold?", "Au", deck_id=2),
+    ]
+
+    questions = build_questions(cards[:1], cards, num_options=4, seed=1)
+    print(f"✅ Generated question: {questions[0]}")
+    question = Question.model_validate(questions[0])
+    assert question.correct_answer == "Paris"
+    assert sorted(question.options) == ["Berlin", "Madrid", "Paris", "Rome"]
+
+    painter = build_questions(cards[4:5], cards, num_options=2, seed=1)[0]
+    assert sorted(painter["options"]) == ["Leonardo da Vinci", "Vincent van Gogh"]
+
+def test_twenty_question_quiz_is_fast():
+    """Test that a 20-question quiz over a few hundred cards builds in milliseconds"""
+
+    cards = [make_card(i, f"Term {i} in topic {i % 17}", f"Definition {i} about subject {i % 23}") for i in range(500)]
+    started = time.monotonic()
+    questions = build_questions(cards[:20], cards, num_options=4, seed=3)
+    elapsed_ms = (time.monotonic() - started) * 1000
+    print(f"✅ Built {len(questions)} questions in {elapsed_ms:.1f}ms")
+    assert len(questions) == 20
+    assert all(len(set(question["options"])) == 4 for question in questions)
+    assert all(question["correct_answer"] in question["options"] for question in questions)
+
+if __name__ == "__main__":
+    print("=== Quiz Builder Test ===")
+    test_distractors_come_from_similar_cards()
+    test_twenty_question_quiz_is_fast()
+    print("=== Test Complete ===")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.quiz_index import QuizIndex, QUIZ_INDEX_FILE, get_quiz_index
+from utils.database import Database
+from tools.quizz_tool import QuizzTool
+from temp_database import temporary_database
+
+def make_quiz(quiz_id, title):
+    return {
+        "id": quiz_id,
+        "title": title,
+        "questions": [{"question_text": "Café?", "options": ["Oui", "Non"], "correct_answer": "Oui"}],
+        "difficulty": "EASY",
+        "description": "Test quiz",
+        "time": 5,
+        "completed_times": 0,
+        "best_score": 0
+    }
+
+def test_quiz_index_summaries_and_lazy_reads():
+    """Test summaries, span reads, incremental appends and rebuilds after other writes"""
+
+    with temporary_database() as tmp_dir:
+        quizzes = [make_quiz(1, "First"), make_quiz(2, "Second")]
+        Database.save_table("quizzes", quizzes)
+
+        index = QuizIndex()
+        summaries = index.summaries()
+        print(f"✅ Summaries: {summaries}")
+        assert [summary["title"] for summary in summaries] == ["First", "Second"]
+        assert summaries[0]["question_count"] == 1 and "questions" not in summaries[0]
+        assert index.get_quiz(2) == quizzes[1]
+        assert index.get_quiz(3) is None
+        assert os.path.exists(os.path.join(tmp_dir, QUIZ_INDEX_FILE))
+
+        quizzes.append(make_quiz(3, "Third"))
+        Database.add_to_table("quizzes", quizzes[-1])
+        index._rebuild = None
+        index.append(quizzes[-1], Database.table_version("quizzes"))
+        assert index.get_quiz(3) == quizzes[2]
+
+        # A fresh process reuses the saved index instead of scanning the table.
+        reloaded = QuizIndex()
+        reloaded._rebuild = None
+        assert [summary["id"] for summary in reloaded.summaries()] == [1, 2, 3]
+        del index._rebuild
+
+        # Writes made outside QuizzTool are picked up through the table version.
+        quizzes[0]["title"] = "First (edited)"
+        Database.save_table("quizzes", quizzes)
+        assert index.summaries()[0]["title"] == "First (edited)"
+        assert index.get_quiz(3) == quizzes[2]
+
+        # An append that another write raced with leaves the index stale.
+        Database.add_to_table("quizzes", make_quiz(4, "Fourth"))
+        Database.add_to_table("quizzes", make_quiz(5, "Fifth"))
+        index.append(make_quiz(4, "Fourth"), Database.table_version("quizzes") - 1)
+        assert [summary["id"] for summary in index.summaries()] == [1, 2, 3, 4, 5]
+        print("✅ Index follows the table version")
+
+def test_quiz_tool_uses_the_current_table():
+    """Test that the shared index follows Database to a temporary table"""
+
+    with temporary_database() as tmp_dir:
+        Database.save_table("quizzes", [make_quiz(1, "First")])
+        assert [summary["title"] for summary in get_quiz_index().summaries()] == ["First"]
+        QuizzTool().add_quiz(json.dumps({key: value for key, value in make_quiz(0, "Added").items() if key != "id"}))
+        assert [summary["title"] for summary in get_quiz_index().summaries()] == ["First", "Added"]
+        with open(os.path.join(tmp_dir, QUIZ_INDEX_FILE)) as f:
+            assert [quiz["title"] for quiz in json.load(f)["quizzes"]] == ["First", "Added"]
+        print("✅ QuizzTool indexes the temporary table")
+
+if __name__ == "__main__":
+    print("=== Quiz Index Test ===")
+    test_quiz_index_summaries_and_lazy_reads()
+    test_quiz_tool_uses_the_current_table()
+    print("=== Test Complete ===")
@@ -9,6 +9,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from tools import QuizzTool
 from models import Quizz, Question
+from temp_database import temporary_database
 
 def test_quizz_tool():
     """Test the QuizzTool functionality"""
@@ -44,19 +45,20 @@ def test_quizz_tool():
     print("Testing Quizz validation and saving...")
     print(f"JSON input: {quiz_json}")
     
-    try:
-        # Test the add_quiz function
-        tool.add_quiz(quiz_json)
-        print("✅ Quiz added successfully!")
+    with temporary_database():
+        try:
+            # Test the add_quiz function
+            tool.add_quiz(quiz_json)
+            print("✅ Quiz added successfully!")
         
-        # Verify it was saved by checking the database file
-        from utils.database import Database
-        saved_quizzes = Database.load_table("quizzes")
-        print(f"✅ Total quizzes in database: {len(saved_quizzes)}")
-        print(f"✅ Last saved quiz: {saved_quizzes[-1] if saved_quizzes else 'None'}")
+            # Verify it was saved by checking the database file
+            from utils.database import Database
+            saved_quizzes = Database.load_table("quizzes")
+            print(f"✅ Total quizzes in database: {len(saved_quizzes)}")
+            print(f"✅ Last saved quiz: {saved_quizzes[-1] if saved_quizzes else 'None'}")
         
-    except Exception as e:
-        print(f"❌ Error: {e}")
+        except Exception as e:
+            print(f"❌ Error: {e}")
 
 def test_invalid_quizz():
     """Test with invalid quiz data"""
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import threading
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database, VersionConflictError
+from tools.decks_tool import DecksTool
+from temp_database import temporary_database
+
+def test_conditional_row_updates():
+    """Test If-Match style deck updates and concurrent updates of different rows"""
+
+    with temporary_database():
+        Database.save_table("decks", [{"id": i, "name": f"Deck {i}", "description": ""} for i in range(1, 9)])
+        tool = DecksTool()
+
+        updated = tool.update_deck(1, {"name": "Renamed"}, expected_version=1)
+        assert updated["version"] == 2 and updated["name"] == "Renamed"
+
+        try:
+            tool.update_deck(1, {"name": "Stale edit"}, expected_version=1)
+            assert False, "a stale version should conflict"
+        except VersionConflictError as e:
+            assert e.current["name"] == "Renamed" and e.current["version"] == 2
+        print("✅ Stale versions are rejected")
+
+        # Writers on different rows re-read the table under its lock, so none is lost.
+        threads = [
+            threading.Thread(target=tool.update_deck, args=(deck_id, {"description": f"edited {deck_id}"}, 1))
+            for deck_id in range(2, 9)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        decks = {deck["id"]: deck for deck in tool.get_decks()}
+        assert all(decks[deck_id]["description"] == f"edited {deck_id}" for deck_id in range(2, 9))
+        assert decks[1]["name"] == "Renamed"
+        print("✅ Concurrent updates of different decks are all kept")
+
+def test_deletes_keep_concurrent_updates():
+    """Test that deleting a deck does not undo an update made while it was reading"""
+
+    with temporary_database():
+        Database.save_table("decks", [{"id": i, "name": f"Deck {i}", "description": ""} for i in range(1, 3)])
+        tool = DecksTool()
+
+        # Another request updates deck 2 right after the delete reads the table.
+        load_table = Database.load_table
+        updater = threading.Thread(target=tool.update_deck, args=(2, {"name": "Edited"}, 1))
+        def load_table_then_update(table_name):
+            rows = load_table(table_name)
+            if table_name == "decks" and updater.ident is None:
+                updater.start()
+                updater.join(timeout=0.2)
+            return rows
+        try:
+            Database.load_table = load_table_then_update
+            tool.delete_deck(1)
+        finally:
+            Database.load_table = load_table
+        updater.join()
+
+        decks = tool.get_decks()
+        assert [(deck["id"], deck["name"], deck["version"]) for deck in decks] == [(2, "Edited", 2)]
+        try:
+            tool.update_deck(2, {"name": "Stale edit"}, expected_version=1)
+            assert False, "a stale version should conflict"
+        except VersionConflictError:
+            pass
+        print("✅ Deletes keep updates made while they ran")
+
+if __name__ == "__main__":
+    print("=== Row Versions Test ===")
+    test_conditional_row_updates()
+    test_deletes_keep_concurrent_updates()
+    print("=== Test Complete ===")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.search_index import CardSearchIndex
+
+def bag_of_words_embedding(texts, dim=64):
+    """Deterministic stand-in for the sentence-transformers model"""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"\w+", text.lower()):
+            vectors[row, zlib.crc32(word.encode()) % dim] += 1.0
+    return vectors
+
+def wait_for_embeddings(index, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while index.stats()["pending_embeddings"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def make_card(card_id, question, answer, deck_id=1):
+    return {"id": card_id, "question": question, "answer": answer, "deck_id": deck_id, "difficulty": "EASY"}
+
+def test_search_index_incremental_updates():
+    """Test that adds, updates and deletes are reflected in hybrid search results"""
+
+    index = CardSearchIndex(embed_fn=bag_of_words_embedding)
+    index.rebuild([
+        make_card(1, "What is photosynthesis?", "Plants turning light into chemical energy."),
+        make_card(2, "What is a closure?", "A function that captures variables from its scope.", deck_id=2),
+    ], version=1)
+
+    index.add_cards([make_card(3, "Where does photosynthesis happen?", "In the chloroplasts.")], version=2)
+    wait_for_embeddings(index)
+    results, mode = index.search("chloroplasts", top_k=5)
+    print(f"✅ Results ({mode}): {[(r['id'], round(r['score'], 4)) for r in results]}")
+    assert mode == "hybrid"
+    assert results[0]["id"] == 3
+    assert results[0]["keyword_score"] > 0
+    assert results[0]["semantic_score"] is not None
+
+    index.update_card(make_card(2, "What is a closure in Python?", "A function capturing photosynthesis facts.", deck_id=2), version=3)
+    results, _ = index.search("photosynthesis", top_k=5, deck_id=2, mode="keyword")
+    assert [r["id"] for r in results] == [2]
+
+    index.remove_cards([3], version=4)
+    results, _ = index.search("chloroplasts", top_k=5, mode="keyword")
+    assert results == []
+    assert index.stats()["cards"] == 2 and index.version == 4
+
+def test_search_index_invalidates_on_missed_write():
+    """Test that a version gap marks the index stale instead of applying a partial update"""
+
+    index = CardSearchIndex(embed_fn=bag_of_words_embedding)
+    index.rebuild([make_card(1, "Capital of France?", "Paris")], version=5)
+    index.add_cards([make_card(2, "Capital of Italy?", "Rome")], version=7)
+    print(f"✅ Version after missed write: {index.version}")
+    assert index.version is None
+
+if __name__ == "__main__":
+    print("=== Search Index Test ===")
+    test_search_index_incremental_updates()
+    test_search_index_invalidates_on_missed_write()
+    print("=== Test Complete ===")
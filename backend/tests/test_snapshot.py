@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import tempfile
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.snapshot import SnapshotTable, write_snapshot
+from utils.database import Database
+from utils.quiz_index import QuizIndex
+from tools.decks_tool import DecksTool
+from temp_database import temporary_database
+
+ROWS = [
+    {"id": 1, "question": "Was ist das?", "answer": "Das ist ein Apfel"},
+    {"id": 2, "question": "Écrire « bonjour »", "answer": "bonjour"},
+    {"id": 3, "question": "2 + 2", "answer": "4"},
+]
+
+def test_snapshot_reads_records_lazily():
+    """Test that a snapshot decodes single records by position"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "flash_cards.snap")
+        write_snapshot(path, ROWS)
+        table = SnapshotTable(path)
+        assert len(table) == 3
+        assert table[1] == ROWS[1] and table[-1] == ROWS[2]
+        assert table[0:2] == ROWS[:2]
+        start, end = table.record_span(2)
+        with open(path, "rb") as f:
+            f.seek(start)
+            assert f.read(end - start) == b'{"id":3,"question":"2 + 2","answer":"4"}'
+        table.close()
+
+        write_snapshot(path, [])
+        assert list(SnapshotTable(path)) == []
+        print("✅ Snapshot records decode by position")
+
+def test_database_snapshot_storage():
+    """Test table reads and writes with the snapshot storage format"""
+
+    with temporary_database(storage_format="snapshot") as tmp_dir:
+        assert Database.load_table("flash_cards") == []
+
+        version = Database.table_version("flash_cards")
+        Database.save_table("flash_cards", ROWS[:2])
+        Database.add_to_table("flash_cards", ROWS[2])
+        assert Database.table_version("flash_cards") == version + 2
+        assert Database.load_table("flash_cards") == ROWS
+        assert Database.open_table("flash_cards")[2] == ROWS[2]
+        assert os.path.exists(os.path.join(tmp_dir, "flash_cards.snap"))
+        assert not os.path.exists(os.path.join(tmp_dir, "flash_cards.json"))
+
+        # Quiz spans come from the snapshot offsets.
+        Database.save_table("quizzes", [{"id": 7, "title": "Q", "questions": [{"question": "a"}]}])
+        index = QuizIndex()
+        assert index.summaries()[0]["question_count"] == 1
+        assert index.get_quiz(7)["questions"] == [{"question": "a"}]
+
+        # Appending a quiz extends the index without rescanning the snapshot.
+        quiz = {"id": 8, "title": "Über", "questions": [{"question": "b"}, {"question": "c"}]}
+        Database.add_to_table("quizzes", quiz)
+        index._rebuild = None
+        index.append(quiz, Database.table_version("quizzes"))
+        assert [summary["question_count"] for summary in index.summaries()] == [1, 2]
+        assert index.get_quiz(7)["questions"] == [{"question": "a"}]
+        assert index.get_quiz(8) == quiz
+
+        # A deck lookup stops decoding at the matching record.
+        Database.save_table("decks", [{"id": i, "name": f"Deck {i}", "description": ""} for i in range(1, 4)])
+        decoded = []
+        getitem = SnapshotTable.__getitem__
+        SnapshotTable.__getitem__ = lambda table, i: decoded.append(i) or getitem(table, i)
+        try:
+            assert DecksTool().get_deck_by_id(2)["name"] == "Deck 2"
+        finally:
+            SnapshotTable.__getitem__ = getitem
+        assert decoded == [0, 1]
+        print("✅ Database reads and writes snapshots")
+
+if __name__ == "__main__":
+    print("=== Snapshot Test ===")
+    test_snapshot_reads_records_lazily()
+    test_database_snapshot_storage()
+    print("=== Test Complete ===")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompts.socratic_tutor import get_cached_socratic_tutor_prompt, render_decks_compact
+from utils.deck_index import get_relevant_decks
+
+def test_compact_deck_rendering():
+    """Test the compact id/name deck list"""
+
+    decks = [
+        {"id": 1, "name": "Biology", "description": "Cells and organisms"},
+        {"id": 2, "name": "JavaScript", "description": "Closures and scope"},
+    ]
+    rendered = render_decks_compact(decks)
+    print(f"✅ Rendered decks:\n{rendered}")
+    assert rendered == "- 1: Biology\n- 2: JavaScript"
+    assert render_decks_compact([]) == "No flashcard decks yet."
+
+def test_prompt_cache_is_keyed_on_version_and_memory():
+    """Test that the prompt is reused until the deck version or memory changes"""
+
+    decks = [{"id": 1, "name": "Biology"}]
+    first = get_cached_socratic_tutor_prompt(decks, decks_version=("test", 1))
+    second = get_cached_socratic_tutor_prompt(decks, decks_version=("test", 1))
+    assert first is second
+    assert "- 1: Biology" in first
+
+    updated_decks = decks + [{"id": 2, "name": "Chemistry"}]
+    third = get_cached_socratic_tutor_prompt(updated_decks, decks_version=("test", 2))
+    assert "- 2: Chemistry" in third
+
+    with_memory = get_cached_socratic_tutor_prompt(updated_decks, decks_version=("test", 2), user_memory="Likes analogies")
+    assert "Likes analogies" in with_memory and with_memory is not third
+    print("✅ Prompt cache keyed on deck version and memory")
+
+def test_relevant_decks_selection():
+    """Test that only decks related to the message are kept for large libraries"""
+
+    decks = [{"id": i, "name": f"Filler Deck {i}", "description": "Miscellaneous trivia"} for i in range(1, 200)]
+    decks.append({"id": 200, "name": "Cell Biology", "description": "Photosynthesis, mitochondria and chloroplasts"})
+    decks.append({"id": 201, "name": "Plant Biology", "description": "How plants grow"})
+
+    relevant = get_relevant_decks(decks, ("test", 1), "How does photosynthesis work in plants?", top_k=5)
+    print(f"✅ Relevant decks: {[deck['name'] for deck in relevant]}")
+    assert sorted(deck["id"] for deck in relevant) == [200, 201]
+    assert get_relevant_decks(decks[:3], ("test", 2), "anything", top_k=5) == decks[:3]
+
+    rendered = render_decks_compact(relevant, total_decks=len(decks))
+    assert "199 other decks" in rendered
+
+if __name__ == "__main__":
+    print("=== Socratic Tutor Prompt Test ===")
+    test_compact_deck_rendering()
+    test_prompt_cache_is_keyed_on_version_and_memory()
+    test_relevant_decks_selection()
+    print("=== Test Complete ===")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import subprocess
+import tempfile
+
+# Add the backend directory to Python path so we can import our modules
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from utils.table_versions import VersionCounters
+
+def test_versions_are_shared_between_processes():
+    """Test that a bump in another process is visible without re-opening the counters"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "table_versions")
+        counters = VersionCounters(path, ["decks", "flash_cards"])
+        assert counters.get("decks") == 0
+        assert counters.bump("decks") == 1
+
+        subprocess.run([
+            sys.executable, "-c",
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from utils.table_versions import VersionCounters;"
+            "counters = VersionCounters(sys.argv[2], ['decks', 'flash_cards']);"
+            "counters.bump('decks'); counters.bump('flash_cards')",
+            BACKEND_DIR, path,
+        ], check=True)
+
+        assert counters.get("decks") == 2
+        assert counters.get("flash_cards") == 1
+        print("✅ Other workers' writes are visible through the shared counters")
+
+        try:
+            counters.get("missing")
+            assert False, "unknown tables should be rejected"
+        except ValueError:
+            pass
+
+if __name__ == "__main__":
+    print("=== Table Versions Test ===")
+    test_versions_are_shared_between_processes()
+    print("=== Test Complete ===")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import io
+import tempfile
+
+# Add the backend directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.uploads import LocalUploadBackend, UnsupportedUploadError, UploadTooLargeError, CHUNK_SIZE
+from utils.derivatives import build_derivatives, derivative_urls, DERIVATIVES
+
+def test_local_upload_deduplicates():
+    """Test that identical uploads are stored once under their content hash"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backend = LocalUploadBackend(root=tmp_dir)
+        payload = b"\x89PNG\r\n\x1a\n" + os.urandom(CHUNK_SIZE * 3 + 17)
+
+        first = backend.save(io.BytesIO(payload), "photo.PNG", "image/png")
+        second = backend.save(io.BytesIO(payload), "copy.png", "image/png")
+
+        print(f"✅ First upload: {first}")
+        print(f"✅ Second upload: {second}")
+        assert first["name"] == second["name"]
+        assert first["name"].endswith(".png")
+        assert not first["deduplicated"]
+        assert second["deduplicated"]
+
+        path = backend.path_for(first["name"])
+        with open(path, "rb") as f:
+            assert f.read() == payload
+
+        stored_files = [name for _, _, files in os.walk(tmp_dir) for name in files]
+        assert stored_files == [first["name"]]
+
+def test_local_upload_checks_content_type():
+    """Test that uploads are typed by their content, and non-images are rejected"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backend = LocalUploadBackend(root=tmp_dir)
+
+        result = backend.save(io.BytesIO(b"GIF89a" + os.urandom(64)), "animation.html", "text/html")
+        assert result["name"].endswith(".gif")
+        print(f"✅ Stored by content type: {result['name']}")
+
+        for payload, filename in [(b"<script>alert(1)</script>", "photo.png"), (b"<svg onload=alert(1)>", "icon.svg")]:
+            try:
+                backend.save(io.BytesIO(payload), filename, "image/png")
+                assert False, f"{filename} should have been rejected"
+            except UnsupportedUploadError as e:
+                print(f"✅ Rejected {filename}: {e}")
+
+        stored_files = [name for _, _, files in os.walk(tmp_dir) for name in files]
+        assert stored_files == [result["name"]]
+
+def test_local_upload_size_limit():
+    """Test that uploads over the size limit are stopped and leave nothing behind"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backend = LocalUploadBackend(root=tmp_dir, max_bytes=CHUNK_SIZE * 2)
+        try:
+            backend.save(io.BytesIO(b"\x89PNG\r\n\x1a\n" + bytes(CHUNK_SIZE * 3)), "huge.png", "image/png")
+            assert False, "an oversized upload should have been rejected"
+        except UploadTooLargeError as e:
+            print(f"✅ Rejected oversized upload: {e}")
+        assert [name for _, _, files in os.walk(tmp_dir) for name in files] == []
+        assert backend.save(io.BytesIO(b"\x89PNG\r\n\x1a\n" + bytes(CHUNK_SIZE)), "small.png")["name"].endswith(".png")
+
+def test_local_upload_rejects_invalid_names():
+    """Test that path_for only accepts content-addressed names"""
+
+    backend = LocalUploadBackend(root=tempfile.gettempdir())
+    assert backend.path_for("../../etc/passwd") is None
+    assert backend.path_for("not-a-hash.png") is None
+    assert backend.path_for("a" * 64 + ".jpg") is not None
+    print("✅ Invalid names rejected")
+
+def test_build_derivatives():
+    """Test thumbnail and web derivatives are built beside the original"""
+
+    from PIL import Image
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backend = LocalUploadBackend(root=tmp_dir)
+        image_buffer = io.BytesIO()
+        Image.new("RGB", (2000, 1500), (200, 40, 40)).save(image_buffer, format="PNG")
+        image_buffer.seek(0)
+
+        result = backend.save(image_buffer, "large.png", "image/png")
+        url = f"http://localhost:5001/api/uploads/{result['name']}"
+        assert derivative_urls(url, backend) == {kind: None for kind in DERIVATIVES}
+
+        built = build_derivatives(backend.path_for(result["name"]))
+        print(f"✅ Built derivatives: {built}")
+        with Image.open(backend.path_for(built["thumb"])) as thumb:
+            assert max(thumb.size) <= DERIVATIVES["thumb"][0]
+
+        urls = derivative_urls(url, backend)
+        assert urls["thumb"] == f"http://localhost:5001/api/uploads/{built['thumb']}"
+        assert urls["web"].endswith(built["web"])
+        assert derivative_urls("https://i.ibb.co/abc/photo.png", backend)["thumb"] is None
+
+if __name__ == "__main__":
+    print("=== Upload Store Test ===")
+    test_local_upload_deduplicates()
+    test_local_upload_checks_content_type()
+    test_local_upload_size_limit()
+    test_local_upload_rejects_invalid_names()
+    test_build_derivatives()
+    print("=== Test Complete ===")
@@ -1,6 +1,7 @@
 import json
 from models import Deck
 from utils import Database
+from utils.card_indexes import cards_removed
 from pydantic import ValidationError
 
 
@@ -38,63 +39,49 @@ class DecksTool:
         """
         Retrieves a single deck by its ID.
         """
-        decks = self.get_decks()
-        for deck in decks:
+        # open_table decodes snapshot rows one at a time, up to the match.
+        for deck in Database.open_table("decks"):
             if deck['id'] == deck_id:
                 return deck
         return None
 
-    def update_deck(self, deck_id: int, deck_update_data: dict):
+    def update_deck(self, deck_id: int, deck_update_data: dict, expected_version: int = None):
         """
         Updates a deck with new data.
+        With expected_version, raises VersionConflictError if the deck has
+        been changed since that version was read.
         """
-        try:
-            decks = self.get_decks()
-            deck_found = False
-            updated_decks = []
-            for deck in decks:
-                if deck['id'] == deck_id:
-                    deck_found = True
-                    # Update the deck's data
-                    deck['name'] = deck_update_data.get('name', deck['name'])
-                    deck['description'] = deck_update_data.get('description', deck['description'])
-                    
-                    # Validate the updated data
-                    validated_deck = Deck.model_validate(deck)
-                    updated_decks.append(validated_deck.model_dump(mode="json"))
-                else:
-                    updated_decks.append(deck)
-
-            if not deck_found:
-                raise ValueError(f"Deck with ID {deck_id} not found.")
-
-            Database.save_table("decks", updated_decks)
-            
-            # Find and return the updated deck data
-            for updated_deck in updated_decks:
-                if updated_deck['id'] == deck_id:
-                    return updated_deck
+        def apply_update(deck):
+            # Update the deck's data
+            deck['name'] = deck_update_data.get('name', deck['name'])
+            deck['description'] = deck_update_data.get('description', deck['description'])
+
+            # Validate the updated data
+            return Deck.model_validate(deck).model_dump(mode="json")
 
+        try:
+            result = Database.update_row("decks", deck_id, apply_update, expected_version)
         except ValidationError as e:
             raise ValueError(f"Pydantic validation error: {e}")
 
+        if result is None:
+            raise ValueError(f"Deck with ID {deck_id} not found.")
+        _, updated_deck = result
+        return updated_deck
+
 
     def delete_deck(self, deck_id: int):
         """
         Deletes a deck and all its associated flashcards.
         """
         # Delete the deck
-        decks = self.get_decks()
-        initial_decks_length = len(decks)
-        updated_decks = [deck for deck in decks if deck['id'] != deck_id]
-        if len(updated_decks) == initial_decks_length:
+        if not Database.delete_rows("decks", lambda deck: deck['id'] == deck_id):
             raise ValueError(f"Deck with ID {deck_id} not found.")
-        Database.save_table("decks", updated_decks)
 
         # Delete associated flashcards
-        flash_cards = Database.load_table("flash_cards")
-        updated_flash_cards = [card for card in flash_cards if card['deck_id'] != deck_id]
-        Database.save_table("flash_cards", updated_flash_cards)
+        removed_cards = Database.delete_rows("flash_cards", lambda card: card['deck_id'] == deck_id)
+        if removed_cards:
+            cards_removed([card['id'] for card in removed_cards])
 
     def find_or_create_deck(self, deck_name: str, all_decks: list, description: str = None):
         """
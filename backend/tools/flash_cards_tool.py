@@ -1,18 +1,29 @@
 import json
 from models import FlashCard
 from utils import Database
+from utils.card_indexes import cards_added, card_updated, cards_removed, card_reviewed
+from utils.dedupe import get_duplicate_index, minhash_signature, card_fingerprint_text, DuplicateIndex
 from pydantic import ValidationError
 from .decks_tool import DecksTool
 
 
 class FlashCardsTool:
 
-    def add_flash_cards(self, flash_cards_json_str: str):
+    DUPLICATE_POLICIES = ("flag", "skip", "allow")
+
+    def add_flash_cards(self, flash_cards_json_str: str, on_duplicate: str = "flag"):
         """
         Takes a JSON string representing a list of flashcards.
         For each card, it finds the corresponding deck or creates a new one,
         enriches the data, validates it, and adds it to the database.
+
+        Near-duplicates of existing cards (or of earlier cards in the same
+        batch) are marked with `duplicate_of` when on_duplicate is "flag",
+        left out when it is "skip", and added as-is when it is "allow".
+        Returns a summary with the added, flagged and skipped cards.
         """
+        if on_duplicate not in self.DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy '{on_duplicate}'.")
         try:
             # Convert JSON string to Python list of dicts
             flash_cards_data = json.loads(flash_cards_json_str)
@@ -23,13 +34,25 @@ class FlashCardsTool:
 
             decks_tool = DecksTool()
             all_decks = decks_tool.get_decks()
+            # Read the version first, so the index is never tagged newer than its rows.
+            version = Database.table_version("flash_cards")
             existing_cards = Database.load_table("flash_cards")
             next_card_id = (max(card['id'] for card in existing_cards) + 1) if existing_cards else 1
-            
+            duplicate_index = get_duplicate_index(existing_cards, version)
+            # Cards of this batch are only checked against each other here;
+            # they join the shared index once they are actually stored.
+            batch_index = DuplicateIndex()
+            batch_signatures = []
+
             cards_to_add = []
+            flagged = []
+            skipped = []
 
             for card_data in flash_cards_data:
                 deck_name = card_data.get("deck_name")
+                if not deck_name:
+                    # Imported cards reference the deck created for them by ID.
+                    deck_name = next((deck['name'] for deck in all_decks if deck['id'] == card_data.get("deck_id")), None)
                 if not deck_name:
                     print(f"Skipping flashcard due to missing 'deck_name': {card_data}")
                     continue
@@ -47,10 +70,28 @@ class FlashCardsTool:
                 new_card.setdefault('difficulty', "EASY")
                 new_card.setdefault('last_reviewed', "1970-01-01T00:00:00Z")
 
+                signature = minhash_signature(card_fingerprint_text(new_card))
+                duplicates = []
+                if on_duplicate != "allow":
+                    duplicates = duplicate_index.find_duplicates(signature) + batch_index.find_duplicates(signature)
+                    duplicates.sort(key=lambda match: (-match[1], match[0]))
+                if duplicates:
+                    if on_duplicate == "skip":
+                        print(f"--- [DEDUPE] Skipping near-duplicate of card {duplicates[0][0]}: {new_card.get('question')} ---")
+                        skipped.append({"question": new_card.get('question'), "duplicate_of": duplicates[0][0]})
+                        continue
+                    new_card['duplicate_of'] = duplicates[0][0]
+
                 try:
                     # Validate and store the card for batch adding
                     validated_card = FlashCard.model_validate(new_card)
-                    cards_to_add.append(validated_card.model_dump(mode="json"))
+                    card_dict = validated_card.model_dump(mode="json")
+                    cards_to_add.append(card_dict)
+                    if duplicates:
+                        flagged.append(card_dict)
+                    # Index right away so later cards in this batch are checked against it.
+                    batch_index.add_card(card_dict, signature)
+                    batch_signatures.append(signature)
                     next_card_id += 1
                 except ValidationError as e:
                     print(f"Pydantic validation error for flashcard: {e}")
@@ -61,6 +102,15 @@ class FlashCardsTool:
             # Batch add all validated cards to the database
             if cards_to_add:
                 Database.add_to_table("flash_cards", cards_to_add, batch=True)
+                for card, signature in zip(cards_to_add, batch_signatures):
+                    duplicate_index.add_card(card, signature)
+                cards_added(cards_to_add)
+
+            return {
+                "added": [card['id'] for card in cards_to_add],
+                "flagged": [{"id": card['id'], "duplicate_of": card['duplicate_of']} for card in flagged],
+                "skipped": skipped
+            }
 
         except json.JSONDecodeError as e:
             print(f"Invalid JSON format for flashcard: {e}")
@@ -80,58 +130,74 @@ class FlashCardsTool:
         """
         Retrieves all flashcards for a specific deck.
         """
-        all_cards = self.get_flash_cards()
-        return [card for card in all_cards if card['deck_id'] == deck_id]
+        # Iterates the table without materializing it; with snapshot storage
+        # only the matching cards are kept.
+        return [card for card in Database.open_table("flash_cards") if card['deck_id'] == deck_id]
 
-    def update_flash_card(self, card_id: int, card_update_data: dict):
+    def update_flash_card(self, card_id: int, card_update_data: dict, expected_version: int = None):
         """
         Updates a flashcard with new data.
+        With expected_version, raises VersionConflictError if the card has
+        been changed since that version was read.
         """
+        def apply_update(card):
+            # Update fields if provided
+            card['question'] = card_update_data.get('question', card['question'])
+            card['answer'] = card_update_data.get('answer', card['answer'])
+            card['question_image_url'] = card_update_data.get('question_image_url', card.get('question_image_url'))
+            card['answer_image_url'] = card_update_data.get('answer_image_url', card.get('answer_image_url'))
+            card['difficulty'] = card_update_data.get('difficulty', card['difficulty'])
+            card['last_reviewed'] = card_update_data.get('last_reviewed', card['last_reviewed'])
+
+            # Validate the updated data
+            return FlashCard.model_validate(card).model_dump(mode="json")
+
         try:
-            all_cards = self.get_flash_cards()
-            card_found = False
-            updated_cards = []
-            for card in all_cards:
-                if card['id'] == card_id:
-                    card_found = True
-                    # Update fields if provided
-                    card['question'] = card_update_data.get('question', card['question'])
-                    card['answer'] = card_update_data.get('answer', card['answer'])
-                    card['question_image_url'] = card_update_data.get('question_image_url', card.get('question_image_url'))
-                    card['answer_image_url'] = card_update_data.get('answer_image_url', card.get('answer_image_url'))
-                    card['difficulty'] = card_update_data.get('difficulty', card['difficulty'])
-                    card['last_reviewed'] = card_update_data.get('last_reviewed', card['last_reviewed'])
-                    
-                    # Validate the updated data
-                    validated_card = FlashCard.model_validate(card)
-                    updated_cards.append(validated_card.model_dump(mode="json"))
-                else:
-                    updated_cards.append(card)
-
-            if not card_found:
-                raise ValueError(f"Flashcard with ID {card_id} not found.")
-
-            Database.save_table("flash_cards", updated_cards)
-            
-            for updated_card in updated_cards:
-                if updated_card['id'] == card_id:
-                    return updated_card
-        
+            result = Database.update_row("flash_cards", card_id, apply_update, expected_version)
         except ValidationError as e:
             raise ValueError(f"Pydantic validation error: {e}")
 
+        if result is None:
+            raise ValueError(f"Flashcard with ID {card_id} not found.")
+        previous_card, updated_card = result
+        card_updated(updated_card)
+        card_reviewed(previous_card, updated_card)
+        return updated_card
+
     def delete_flash_card(self, card_id: int):
         """
         Deletes a single flashcard by its ID.
         """
-        all_cards = self.get_flash_cards()
-        initial_cards_length = len(all_cards)
-        updated_cards = [card for card in all_cards if card['id'] != card_id]
-
-        if len(updated_cards) == initial_cards_length:
+        removed_cards = Database.delete_rows("flash_cards", lambda card: card['id'] == card_id)
+        if not removed_cards:
             raise ValueError(f"Flashcard with ID {card_id} not found.")
-            
-        Database.save_table("flash_cards", updated_cards)
+        cards_removed([card_id])
+
+    def dedupe_flash_cards(self, deck_id: int = None, across_decks: bool = False, dry_run: bool = False):
+        """
+        Finds groups of near-duplicate flashcards and, unless dry_run is set,
+        deletes all but the oldest card of each group in a single write.
+        Groups stay within one deck unless across_decks is set.
+        """
+        version = Database.table_version("flash_cards")
+        all_cards = self.get_flash_cards()
+        duplicate_index = get_duplicate_index(all_cards, version)
+        groups = duplicate_index.duplicate_groups(deck_id=deck_id, across_decks=across_decks)
+        removed_ids = {card_id for group in groups for card_id in group[1:]}
+
+        removed_count = 0
+        if removed_ids and not dry_run:
+            removed_cards = Database.delete_rows("flash_cards", lambda card: card['id'] in removed_ids)
+            removed_count = len(removed_cards)
+            if removed_cards:
+                cards_removed(sorted(card['id'] for card in removed_cards))
+            print(f"--- [DEDUPE] Removed {removed_count} near-duplicate flashcards ---")
+
+        return {
+            "groups": [{"kept": group[0], "duplicates": group[1:]} for group in groups],
+            "removed": removed_count,
+            "dry_run": dry_run
+        }
 
 
 if __name__ == '__main__':
@@ -1,10 +1,19 @@
 
 
 import json
+import math
+import random
+from collections import Counter
 from models.quizz_model import Quizz
 from utils.database import Database
+from utils.quiz_builder import build_questions, normalize_answer
+from utils.quiz_index import get_quiz_index
 from pydantic import ValidationError
 
+# Decks too small to supply enough distinct answers borrow distractors
+# from a sample of this many cards in other decks.
+BORROWED_DISTRACTOR_POOL = 200
+
 class QuizzTool:
 
     def add_quiz(self, quiz_json_string):
@@ -28,9 +37,63 @@ class QuizzTool:
             validated_quiz = Quizz(**quiz_data)
 
             # 5. Use Database.add_to_table to save the new quiz dictionary.
-            Database.add_to_table("quizzes", validated_quiz.model_dump())
+            quiz_dict = validated_quiz.model_dump()
+            Database.add_to_table("quizzes", quiz_dict)
+            get_quiz_index().append(quiz_dict, Database.table_version("quizzes"))
+            return quiz_dict
 
         except ValidationError as e:
             raise ValueError(f"Validation error: {e}")
         except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON format: {e}")
\ No newline at end of file
+            raise ValueError(f"Invalid JSON format: {e}")
+
+    def build_quiz_from_deck(
+        self,
+        deck_id: int,
+        num_questions: int = 20,
+        num_options: int = 4,
+        title: str = None,
+        embed_fn=None,
+        seed: int = None
+    ):
+        """
+        Builds and saves a multiple-choice quiz from a deck's flashcards
+        without calling the model. Distractors are the answers of the most
+        similar other cards.
+        """
+        decks = Database.load_table("decks")
+        deck = next((deck for deck in decks if deck['id'] == deck_id), None)
+        if not deck:
+            raise ValueError(f"Deck with ID {deck_id} not found.")
+        if num_questions < 1 or num_options < 2:
+            raise ValueError("A quiz needs at least one question and two options per question.")
+
+        all_cards = [
+            card for card in Database.load_table("flash_cards")
+            if (card.get('question') or '').strip() and (card.get('answer') or '').strip()
+        ]
+        deck_cards = [card for card in all_cards if card['deck_id'] == deck_id]
+        if not deck_cards:
+            raise ValueError(f"Deck with ID {deck_id} has no text flashcards to build a quiz from.")
+
+        rng = random.Random(seed)
+        pool_cards = list(deck_cards)
+        if len({normalize_answer(card['answer']) for card in deck_cards}) < num_options:
+            other_cards = [card for card in all_cards if card['deck_id'] != deck_id]
+            pool_cards += rng.sample(other_cards, min(BORROWED_DISTRACTOR_POOL, len(other_cards)))
+        if len({normalize_answer(card['answer']) for card in pool_cards}) < 2:
+            raise ValueError("Not enough distinct answers to build multiple-choice questions.")
+
+        quiz_cards = rng.sample(deck_cards, min(num_questions, len(deck_cards)))
+        questions = build_questions(quiz_cards, pool_cards, num_options=num_options, embed_fn=embed_fn, seed=seed)
+        difficulty = Counter(card.get('difficulty', 'MEDIUM') for card in quiz_cards).most_common(1)[0][0]
+
+        quiz_data = {
+            "title": title or f"{deck['name']} Quiz",
+            "description": f"Generated from the {len(deck_cards)} flashcards in {deck['name']}.",
+            "difficulty": difficulty,
+            # About 30 seconds per question.
+            "time": max(1, math.ceil(len(questions) / 2)),
+            "questions": questions
+        }
+        return self.add_quiz(json.dumps(quiz_data))
@@ -1,5 +1,10 @@
-from .database import Database
+from .database import Database, VersionConflictError
+from .uploads import get_upload_backend, LocalUploadBackend, ImgbbUploadBackend
 
 __all__ = [
-    "Database"
-]
\ No newline at end of file
+    "Database",
+    "VersionConflictError",
+    "get_upload_backend",
+    "LocalUploadBackend",
+    "ImgbbUploadBackend"
+]
@@ -0,0 +1,188 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+_ACTION_MARKER = re.compile(r"//\s*ACTION:\s*([A-Z_]+)\s*//")
+_PAYLOAD_MARKER = re.compile(r"//\s*([A-Z_]+)_JSON:")
+# Anything that may still grow into one of the markers above.
+_PARTIAL_MARKER = re.compile(r"//[A-Z_: ]*/?")
+_MAX_MARKER_LENGTH = 80
+
+_TEXT, _PAYLOAD, _AFTER_PAYLOAD = range(3)
+
+
+class StreamedAction(NamedTuple):
+    """
+    An action block found in a model response, e.g. the payload of
+    `//ACTION: CREATE_QUIZ// //QUIZ_JSON: {...}//` has kind "QUIZ".
+    """
+    name: Optional[str]
+    kind: str
+    payload: str
+
+
+class ActionStreamParser:
+    """
+    Incrementally separates action blocks from the text of a streamed response.
+
+    `feed` takes each chunk as it arrives and returns the text that is safe
+    to show to the user plus any actions whose JSON payload is complete.
+    Payloads are delimited with a balanced bracket scanner that understands
+    JSON strings, so nested objects and arrays are extracted whole.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._state = _TEXT
+        self._pending_action = None
+        self._payload_kind = None
+        self._payload_start = None
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._skip_spaces = False
+
+    def feed(self, chunk: str) -> Tuple[str, List[StreamedAction]]:
+        self._buffer += chunk
+        return self._process(final=False)
+
+    def flush(self) -> Tuple[str, List[StreamedAction]]:
+        """
+        Processes whatever is left once the stream has ended.
+        An unterminated payload is dropped rather than shown to the user.
+        """
+        visible, actions = self._process(final=True)
+        if self._state == _PAYLOAD:
+            print(f"--- [ACTION ERROR] Unterminated {self._payload_kind}_JSON payload at end of stream ---")
+        self._buffer = ""
+        self._state = _TEXT
+        return visible, actions
+
+    def _process(self, final: bool):
+        visible_parts = []
+        actions = []
+
+        while self._buffer:
+            if self._state == _TEXT:
+                if self._skip_spaces:
+                    # Spaces right after a hidden block belong to the block.
+                    self._buffer = self._buffer.lstrip(" ")
+                    if not self._buffer:
+                        break
+                    self._skip_spaces = False
+
+                marker_pos = self._buffer.find("//")
+                if marker_pos == -1:
+                    # Hold back a trailing "/" that could start a marker.
+                    cut = len(self._buffer)
+                    if self._buffer.endswith("/") and not final:
+                        cut -= 1
+                    visible_parts.append(self._buffer[:cut])
+                    self._buffer = self._buffer[cut:]
+                    break
+
+                visible_parts.append(self._buffer[:marker_pos])
+                self._buffer = self._buffer[marker_pos:]
+
+                action_match = _ACTION_MARKER.match(self._buffer)
+                if action_match:
+                    self._pending_action = action_match.group(1)
+                    self._buffer = self._buffer[action_match.end():]
+                    self._skip_spaces = True
+                    continue
+
+                payload_match = _PAYLOAD_MARKER.match(self._buffer)
+                if payload_match:
+                    self._payload_kind = payload_match.group(1)
+                    self._buffer = self._buffer[payload_match.end():]
+                    self._start_payload()
+                    continue
+
+                if (
+                    not final
+                    and len(self._buffer) < _MAX_MARKER_LENGTH
+                    and _PARTIAL_MARKER.fullmatch(self._buffer)
+                ):
+                    break
+
+                # Plain "//" (a URL, a code comment): show it and move on.
+                visible_parts.append(self._buffer[:2])
+                self._buffer = self._buffer[2:]
+
+            elif self._state == _PAYLOAD:
+                action = self._scan_payload()
+                if action:
+                    actions.append(action)
+                elif self._state == _PAYLOAD:
+                    break
+
+            else:
+                # Swallow the "//" that closes a payload block.
+                stripped = self._buffer.lstrip(" ")
+                if stripped in ("", "/") and not final:
+                    break
+                if stripped.startswith("//") and not _ACTION_MARKER.match(stripped) and not _PAYLOAD_MARKER.match(stripped):
+                    stripped = stripped[2:]
+                self._buffer = stripped
+                self._skip_spaces = True
+                self._state = _TEXT
+
+        return "".join(visible_parts), actions
+
+    def _start_payload(self):
+        self._state = _PAYLOAD
+        self._payload_start = None
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def _scan_payload(self) -> Optional[StreamedAction]:
+        """
+        Advances the bracket scanner over newly buffered characters.
+        Returns an action once the payload closes, or None if more input is needed.
+        """
+        buffer = self._buffer
+        pos = self._scan_pos
+
+        if self._payload_start is None:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos == len(buffer):
+                self._scan_pos = pos
+                return None
+            if buffer[pos] not in "[{":
+                print(f"--- [ACTION ERROR] {self._payload_kind}_JSON is not followed by a JSON object or array ---")
+                self._buffer = buffer[pos:]
+                self._pending_action = None
+                self._state = _TEXT
+                return None
+            self._payload_start = pos
+
+        while pos < len(buffer):
+            char = buffer[pos]
+            pos += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    payload = buffer[self._payload_start:pos]
+                    action = StreamedAction(self._pending_action, self._payload_kind, payload)
+                    self._buffer = buffer[pos:]
+                    self._pending_action = None
+                    self._state = _AFTER_PAYLOAD
+                    return action
+
+        self._scan_pos = pos
+        return None
+
@@ -0,0 +1,420 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process only, the thread lock is enough.
+    fcntl = None
+
+from .database import Database
+from .deck_stats import parse_timestamp, REVIEW_INTERVAL_DAYS, NEVER_REVIEWED
+from .quiz_attempts import QUIZ_ATTEMPTS_PATH
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(_BASE_DIR))
+
+REVIEW_EVENTS_PATH = os.path.join(_PROJECT_ROOT, "database", "review_events.jsonl")
+
+DIFFICULTY_CODES = {"EASY": 0, "MEDIUM": 1, "HARD": 2}
+DIFFICULTY_NAMES = ["EASY", "MEDIUM", "HARD"]
+BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+CARD_COLUMNS = {"id": np.int64, "deck_id": np.int64, "difficulty": np.int8, "last_reviewed": np.float64}
+# Upper bounds (in days) of the review-interval bins of the retention curve.
+RETENTION_BINS = [1, 2, 4, 7, 14, 30, 60]
+
+
+def to_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(float(timestamp), tz=timezone.utc).isoformat()
+
+
+class ColumnBuffer:
+    """
+    Growable set of equally long NumPy columns.
+
+    Rows are appended into preallocated arrays that double when full, and
+    `column` returns views of the filled part, so queries run on contiguous
+    arrays without converting Python objects.
+    """
+
+    def __init__(self, dtypes: dict, capacity: int = 1024):
+        self._data = {name: np.zeros(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        self.size = 0
+
+    def _grow(self):
+        for name, array in self._data.items():
+            grown = np.zeros(len(array) * 2, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._data[name] = grown
+
+    def append(self, row: dict) -> int:
+        if self.size == len(next(iter(self._data.values()))):
+            self._grow()
+        for name, array in self._data.items():
+            array[self.size] = row[name]
+        self.size += 1
+        return self.size - 1
+
+    def set_row(self, index: int, row: dict):
+        for name, array in self._data.items():
+            array[index] = row[name]
+
+    def move_row(self, source: int, target: int):
+        for array in self._data.values():
+            array[target] = array[source]
+
+    def pop(self):
+        self.size -= 1
+
+    @property
+    def names(self) -> list:
+        return list(self._data)
+
+    def column(self, name: str) -> np.ndarray:
+        return self._data[name][:self.size]
+
+
+class CardColumns:
+    """
+    Columnar copy of flashcard metadata: id, deck_id, difficulty code and
+    last_reviewed epoch. Updated card by card like the other flashcard
+    indexes; a deleted card's row is filled with the last row.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._columns = ColumnBuffer(CARD_COLUMNS)
+        self._rows = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _row(card: dict) -> dict:
+        return {
+            "id": card["id"],
+            "deck_id": card["deck_id"],
+            "difficulty": DIFFICULTY_CODES.get(card.get("difficulty"), 0),
+            "last_reviewed": parse_timestamp(card.get("last_reviewed")),
+        }
+
+    def rebuild(self, cards: list, version=None):
+        with self._lock:
+            self._columns = ColumnBuffer(CARD_COLUMNS, capacity=max(1024, len(cards)))
+            self._rows = {}
+            for card in cards:
+                self._upsert(card)
+            self.version = version
+
+    def add_cards(self, cards: list, version=None):
+        self._apply(cards, [], version)
+
+    def update_card(self, card: dict, version=None):
+        self._apply([card], [], version)
+
+    def remove_cards(self, card_ids: list, version=None):
+        self._apply([], card_ids, version)
+
+    def _apply(self, cards: list, removed_ids: list, version):
+        with self._lock:
+            if self.version is None:
+                # Not built yet: the first query loads the whole table anyway.
+                return
+            if version is not None and self.version != version - 1:
+                # A write we did not see happened in between; rebuild on next query.
+                self.version = None
+                return
+            for card_id in removed_ids:
+                self._remove(card_id)
+            for card in cards:
+                self._upsert(card)
+            self.version = version
+
+    def _upsert(self, card: dict):
+        row = self._rows.get(card["id"])
+        if row is None:
+            self._rows[card["id"]] = self._columns.append(self._row(card))
+        else:
+            self._columns.set_row(row, self._row(card))
+
+    def _remove(self, card_id: int):
+        row = self._rows.pop(card_id, None)
+        if row is None:
+            return
+        last = self._columns.size - 1
+        if row != last:
+            self._columns.move_row(last, row)
+            self._rows[int(self._columns.column("id")[row])] = row
+        self._columns.pop()
+
+    def snapshot(self) -> dict:
+        """
+        Returns copies of the columns, safe to query without the lock.
+        """
+        with self._lock:
+            return {name: self._columns.column(name).copy() for name in CARD_COLUMNS}
+
+
+class JsonlColumns:
+    """
+    Columns read from an append-only JSON-lines log.
+
+    Only lines appended since the last read are parsed, so other processes'
+    writes are picked up cheaply. Appends are serialized with an flock.
+    `extract` maps a record to a column row.
+    """
+
+    def __init__(self, path: str, dtypes: dict, extract):
+        self.path = path
+        self._extract = extract
+        self._columns = ColumnBuffer(dtypes)
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _catch_up(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A line still being written; read it next time.
+                    break
+                self._offset += len(line)
+                if line.strip():
+                    self._columns.append(self._extract(json.loads(line)))
+
+    def append(self, record: dict):
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(self.path, "ab") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line)
+                f.flush()
+                # Read back to the end rather than assume where the line landed;
+                # another worker may have appended first.
+                self._catch_up()
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._catch_up()
+            return {name: self._columns.column(name).copy() for name in self._columns.names}
+
+
+def _review_row(event: dict) -> dict:
+    return {
+        "card_id": event["card_id"],
+        "deck_id": event["deck_id"],
+        "reviewed_at": event["reviewed_at"],
+        "previous_reviewed_at": event["previous_reviewed_at"],
+        "from_difficulty": DIFFICULTY_CODES.get(event["from_difficulty"], 0),
+        "to_difficulty": DIFFICULTY_CODES.get(event["to_difficulty"], 0),
+    }
+
+
+def _quiz_attempt_row(attempt: dict) -> dict:
+    return {
+        "quiz_id": attempt["quiz_id"],
+        "created_at": parse_timestamp(attempt["created_at"]),
+        "score": attempt["score"],
+    }
+
+
+# --- Vectorized queries ---
+
+def group_counts(keys: list, names: list) -> list:
+    """
+    Counts rows per distinct combination of the given key columns.
+    """
+    if not len(keys[0]):
+        return []
+    stacked = np.stack([np.asarray(key, dtype=np.int64) for key in keys], axis=1)
+    groups, counts = np.unique(stacked, axis=0, return_counts=True)
+    return [
+        {**{name: int(value) for name, value in zip(names, group)}, "count": int(count)}
+        for group, count in zip(groups, counts)
+    ]
+
+
+def time_buckets(timestamps: np.ndarray, bucket_seconds: int, values: np.ndarray = None) -> list:
+    """
+    Counts rows per time bucket, with the mean of `values` when given.
+    """
+    if not len(timestamps):
+        return []
+    buckets = np.floor(timestamps / bucket_seconds).astype(np.int64)
+    origin = buckets.min()
+    offsets = buckets - origin
+    counts = np.bincount(offsets)
+    sums = np.bincount(offsets, weights=values) if values is not None else None
+    result = []
+    for offset in np.nonzero(counts)[0]:
+        bucket = {"start": to_iso((origin + offset) * bucket_seconds), "count": int(counts[offset])}
+        if sums is not None:
+            bucket["mean"] = float(sums[offset] / counts[offset])
+        result.append(bucket)
+    return result
+
+
+def time_mask(timestamps: np.ndarray, since: float = None, until: float = None) -> np.ndarray:
+    mask = np.ones(len(timestamps), dtype=bool)
+    if since is not None:
+        mask &= timestamps >= since
+    if until is not None:
+        mask &= timestamps < until
+    return mask
+
+
+class AnalyticsEngine:
+    """
+    Learning analytics over columnar card metadata, review events and quiz
+    attempts. Every query filters with boolean masks and aggregates with
+    np.unique / np.bincount instead of looping over table rows.
+    """
+
+    def __init__(self, review_events_path: str = REVIEW_EVENTS_PATH, quiz_attempts_path: str = QUIZ_ATTEMPTS_PATH):
+        self.cards = CardColumns()
+        self.reviews = JsonlColumns(review_events_path, {
+            "card_id": np.int64,
+            "deck_id": np.int64,
+            "reviewed_at": np.float64,
+            "previous_reviewed_at": np.float64,
+            "from_difficulty": np.int8,
+            "to_difficulty": np.int8,
+        }, _review_row)
+        self.quiz_attempts = JsonlColumns(quiz_attempts_path, {
+            "quiz_id": np.int64,
+            "created_at": np.float64,
+            "score": np.float64,
+        }, _quiz_attempt_row)
+
+    def record_review(self, previous_card: dict, card: dict):
+        """
+        Logs a review event when a card's last_reviewed time changes.
+        """
+        self.reviews.append({
+            "card_id": card["id"],
+            "deck_id": card["deck_id"],
+            "reviewed_at": parse_timestamp(card.get("last_reviewed")),
+            "previous_reviewed_at": parse_timestamp(previous_card.get("last_reviewed")),
+            "from_difficulty": previous_card.get("difficulty"),
+            "to_difficulty": card.get("difficulty"),
+        })
+
+    def _current_cards(self) -> dict:
+        version = Database.table_version("flash_cards")
+        if self.cards.version != version:
+            print("--- [ANALYTICS] Building flashcard columns ---")
+            self.cards.rebuild(Database.load_table("flash_cards"), version)
+        return self.cards.snapshot()
+
+    # --- Cards ---
+
+    def card_groups(self, group_by: list, now: float) -> list:
+        """
+        Card counts grouped by any of deck_id and difficulty, with how many
+        of them are due at `now`.
+        """
+        cards = self._current_cards()
+        intervals = np.array([REVIEW_INTERVAL_DAYS[name] * 86400 for name in DIFFICULTY_NAMES])
+        due = (cards["last_reviewed"] + intervals[cards["difficulty"]]) <= now
+        keys = [cards[column] for column in group_by] or [np.zeros(len(cards["id"]), dtype=np.int64)]
+        names = group_by or ["all"]
+
+        groups = group_counts(keys + [due], names + ["due"])
+        merged = {}
+        for group in groups:
+            key = tuple(group[name] for name in names)
+            entry = merged.setdefault(key, {**{name: group[name] for name in names}, "count": 0, "due_count": 0})
+            entry["count"] += group["count"]
+            if group["due"]:
+                entry["due_count"] += group["count"]
+        for entry in merged.values():
+            if "difficulty" in entry:
+                entry["difficulty"] = DIFFICULTY_NAMES[entry["difficulty"]]
+            entry.pop("all", None)
+        return list(merged.values())
+
+    def never_reviewed_count(self) -> int:
+        cards = self._current_cards()
+        return int(np.count_nonzero(cards["last_reviewed"] <= NEVER_REVIEWED))
+
+    # --- Reviews ---
+
+    def _reviews(self, deck_id=None, since=None, until=None) -> dict:
+        reviews = self.reviews.snapshot()
+        mask = time_mask(reviews["reviewed_at"], since, until)
+        if deck_id is not None:
+            mask &= reviews["deck_id"] == deck_id
+        return {name: column[mask] for name, column in reviews.items()}
+
+    def review_volume(self, bucket: str = "day", deck_id=None, since=None, until=None) -> list:
+        reviews = self._reviews(deck_id, since, until)
+        return time_buckets(reviews["reviewed_at"], BUCKET_SECONDS[bucket])
+
+    def difficulty_transitions(self, deck_id=None, since=None, until=None) -> dict:
+        """
+        Counts reviews by (previous difficulty, new difficulty).
+        """
+        reviews = self._reviews(deck_id, since, until)
+        codes = reviews["from_difficulty"].astype(np.int64) * 3 + reviews["to_difficulty"]
+        matrix = np.bincount(codes, minlength=9).reshape(3, 3)
+        return {
+            source: {target: int(matrix[i, j]) for j, target in enumerate(DIFFICULTY_NAMES)}
+            for i, source in enumerate(DIFFICULTY_NAMES)
+        }
+
+    def retention_curve(self, deck_id=None, since=None, until=None) -> list:
+        """
+        Share of reviews not rated HARD, by days since the card's previous
+        review. Reviews of never-reviewed cards are left out.
+        """
+        reviews = self._reviews(deck_id, since, until)
+        seen_before = reviews["previous_reviewed_at"] > NEVER_REVIEWED
+        interval_days = (reviews["reviewed_at"] - reviews["previous_reviewed_at"])[seen_before] / 86400
+        recalled = (reviews["to_difficulty"] != DIFFICULTY_CODES["HARD"])[seen_before]
+
+        bins = np.digitize(interval_days, RETENTION_BINS)
+        totals = np.bincount(bins, minlength=len(RETENTION_BINS) + 1)
+        recalls = np.bincount(bins, weights=recalled, minlength=len(RETENTION_BINS) + 1)
+        lower_bounds = [0] + RETENTION_BINS
+        upper_bounds = RETENTION_BINS + [None]
+        return [
+            {
+                "min_days": lower_bounds[i],
+                "max_days": upper_bounds[i],
+                "reviews": int(totals[i]),
+                "retention": float(recalls[i] / totals[i]),
+            }
+            for i in range(len(totals)) if totals[i]
+        ]
+
+    # --- Quizzes ---
+
+    def quiz_activity(self, bucket: str = "day", quiz_id=None, since=None, until=None) -> list:
+        attempts = self.quiz_attempts.snapshot()
+        mask = time_mask(attempts["created_at"], since, until)
+        if quiz_id is not None:
+            mask &= attempts["quiz_id"] == quiz_id
+        return time_buckets(attempts["created_at"][mask], BUCKET_SECONDS[bucket], attempts["score"][mask])
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_analytics_engine() -> AnalyticsEngine:
+    """
+    Returns the shared analytics engine, creating it on first use.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AnalyticsEngine()
+        return _engine
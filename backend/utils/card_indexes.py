@@ -0,0 +1,46 @@
+from .analytics import get_analytics_engine
+from .database import Database
+from .dedupe import get_duplicate_index
+from .deck_stats import get_deck_stats_index, parse_timestamp
+from .search_index import get_card_search_index
+
+# Every in-memory index derived from the flashcards table is updated here
+# after FlashCardsTool or DecksTool writes it, so none of them has to reload
+# the table. Each one checks the table version and marks itself stale if it
+# missed a write.
+
+
+def cards_added(cards: list):
+    version = Database.table_version("flash_cards")
+    get_duplicate_index().set_version(version)
+    get_card_search_index().add_cards(cards, version=version)
+    get_deck_stats_index().add_cards(cards, version=version)
+    get_analytics_engine().cards.add_cards(cards, version=version)
+
+
+def card_updated(card: dict):
+    version = Database.table_version("flash_cards")
+    duplicate_index = get_duplicate_index()
+    duplicate_index.add_card(card)
+    duplicate_index.set_version(version)
+    get_card_search_index().update_card(card, version=version)
+    get_deck_stats_index().update_card(card, version=version)
+    get_analytics_engine().cards.update_card(card, version=version)
+
+
+def cards_removed(card_ids: list):
+    version = Database.table_version("flash_cards")
+    duplicate_index = get_duplicate_index()
+    duplicate_index.remove_cards(card_ids)
+    duplicate_index.set_version(version)
+    get_card_search_index().remove_cards(card_ids, version=version)
+    get_deck_stats_index().remove_cards(card_ids, version=version)
+    get_analytics_engine().cards.remove_cards(card_ids, version=version)
+
+
+def card_reviewed(previous_card: dict, card: dict):
+    """
+    Logs a review event for analytics when an update changed last_reviewed.
+    """
+    if parse_timestamp(card.get("last_reviewed")) != parse_timestamp(previous_card.get("last_reviewed")):
+        get_analytics_engine().record_review(previous_card, card)
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process only, the thread lock is enough.
+    fcntl = None
+
+
+def diff_rows(old_rows: list, new_rows: list) -> list:
+    """
+    Returns insert, update and delete changes between two versions of a
+    table, matched by row id. Tables whose rows have no id get a single
+    reset change instead.
+    """
+    if not all("id" in row for row in old_rows) or not all("id" in row for row in new_rows):
+        return [{"op": "reset"}]
+    old_by_id = {row["id"]: row for row in old_rows}
+    new_ids = set()
+    changes = []
+    for row in new_rows:
+        new_ids.add(row["id"])
+        old = old_by_id.get(row["id"])
+        if old is None:
+            changes.append({"op": "insert", "row_id": row["id"], "row": row})
+        elif old != row:
+            changes.append({"op": "update", "row_id": row["id"], "row": row})
+    changes.extend({"op": "delete", "row_id": row_id} for row_id in old_by_id if row_id not in new_ids)
+    return changes
+
+
+CHANGE_LOG_MAX_BYTES = int(os.getenv("CHANGE_LOG_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# A rotated log starts with this fixed-width line holding the id of its
+# first kept byte, so event ids keep growing across rotations.
+_HEADER_PREFIX = b"# base "
+_HEADER_SIZE = len(_HEADER_PREFIX) + 20 + 1
+
+
+def _header(base: int) -> bytes:
+    return _HEADER_PREFIX + b"%020d\n" % base
+
+
+class ChangeLog:
+    """
+    Append-only JSON-lines log of row changes, shared by all workers.
+
+    The id of an event is the byte offset just past its line, so ids only
+    grow, and a reader resumes after an event by seeking to its id. Writers
+    append under an flock; readers in this process are woken when a change
+    is appended, and pick up other workers' changes on their next poll.
+
+    Once the file passes `max_bytes`, its older half is dropped. The
+    rewritten file starts with a header holding the id of its first event,
+    so the remaining events keep their ids; readers whose position was
+    dropped find it before start_offset() and must resync.
+    """
+
+    def __init__(self, path: str, max_bytes: int = CHANGE_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._appended = threading.Condition()
+
+    @staticmethod
+    def _read_header(f) -> tuple:
+        # Returns (id of the first byte after the header, header size).
+        f.seek(0)
+        data = f.read(_HEADER_SIZE)
+        if not data.startswith(b"#"):
+            return 0, 0
+        if len(data) < _HEADER_SIZE:
+            # A new log whose header is still being written.
+            return 0, _HEADER_SIZE
+        return int(data[len(_HEADER_PREFIX):-1]), _HEADER_SIZE
+
+    def _bounds(self) -> tuple:
+        # Returns the first and the end offset of the events in the file.
+        try:
+            with open(self.path, "rb") as f:
+                base, header_size = self._read_header(f)
+                size = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            return 0, 0
+        return base, base + max(0, size - header_size)
+
+    def start_offset(self) -> int:
+        """
+        Returns the offset of the oldest event still in the log; readers
+        behind it missed events that were rotated away.
+        """
+        return self._bounds()[0]
+
+    def end_offset(self) -> int:
+        return self._bounds()[1]
+
+    def append(self, table_name: str, version: int, changes: list):
+        if not changes:
+            return
+        lines = b"".join(
+            (json.dumps({"table": table_name, "version": version, **change}) + "\n").encode("utf-8")
+            for change in changes
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            while True:
+                with open(self.path, "ab") as f:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    try:
+                        stat = os.fstat(f.fileno())
+                        try:
+                            current_inode = os.stat(self.path).st_ino
+                        except FileNotFoundError:
+                            current_inode = None
+                        if current_inode != stat.st_ino:
+                            # Another worker rotated the log while this one waited.
+                            continue
+                        f.write(lines if stat.st_size else _header(0) + lines)
+                        f.flush()
+                        if stat.st_size + len(lines) > self.max_bytes:
+                            self._rotate()
+                        break
+                    finally:
+                        if fcntl:
+                            fcntl.flock(f, fcntl.LOCK_UN)
+        with self._appended:
+            self._appended.notify_all()
+
+    def _rotate(self):
+        # Called with the log's flock held: keeps the newer half, from the
+        # start of a line, and renames the rewritten file into place.
+        with open(self.path, "rb") as f:
+            base, header_size = self._read_header(f)
+            keep_from = max(header_size, os.fstat(f.fileno()).st_size - self.max_bytes // 2)
+            f.seek(keep_from)
+            tail = f.read()
+        cut = tail.find(b"\n") + 1 if keep_from > header_size else 0
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_header(base + keep_from + cut - header_size))
+            f.write(tail[cut:])
+        os.replace(temp_path, self.path)
+        print(f"--- [CHANGE LOG] Rotated, events before {base + keep_from + cut - header_size} dropped ---")
+
+    def read_since(self, offset: int, limit: int = 500) -> list:
+        """
+        Returns up to `limit` events appended after `offset`, each with its
+        id. Returns nothing for an offset before start_offset().
+        """
+        events = []
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return events
+        with f:
+            base, header_size = self._read_header(f)
+            if offset < base:
+                return events
+            f.seek(header_size + offset - base)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written; read it next time.
+                    break
+                offset += len(line)
+                events.append({"id": offset, **json.loads(line)})
+                if len(events) >= limit:
+                    break
+        return events
+
+    def wait(self, offset: int, timeout: float) -> bool:
+        """
+        Waits until an event is appended after `offset` in this process, or
+        for `timeout` seconds. Returns whether the log has grown.
+        """
+        with self._appended:
+            if self.end_offset() <= offset:
+                self._appended.wait(timeout)
+        return self.end_offset() > offset
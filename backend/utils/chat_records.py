@@ -0,0 +1,174 @@
+import sys
+import threading
+
+from .database import Database
+
+MESSAGE_FIELDS = ("user_id", "session_id", "role", "content", "timestamp")
+
+
+class ChatMessage:
+    """
+    Compact in-memory form of one chat_history row.
+
+    A plain dict per message costs a hash table plus its own copy of every
+    id string. Records use fixed slots instead, and user_id, session_id and
+    role are interned so all messages of a session share one string object.
+    Keys other than the known fields are kept in `extra`, which stays None
+    for ordinary messages.
+    """
+
+    __slots__ = ("user_id", "session_id", "role", "content", "timestamp", "extra")
+
+    def __init__(self, user_id, session_id, role, content, timestamp=None, extra=None):
+        self.user_id = sys.intern(user_id) if isinstance(user_id, str) else user_id
+        self.session_id = sys.intern(session_id) if isinstance(session_id, str) else session_id
+        self.role = sys.intern(role) if isinstance(role, str) else role
+        self.content = content
+        self.timestamp = timestamp
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, message: dict) -> "ChatMessage":
+        extra = {key: value for key, value in message.items() if key not in MESSAGE_FIELDS} or None
+        return cls(
+            message.get("user_id"),
+            message.get("session_id"),
+            message.get("role"),
+            message.get("content"),
+            message.get("timestamp"),
+            extra,
+        )
+
+    def to_dict(self) -> dict:
+        message = {
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "role": self.role,
+            "content": self.content,
+        }
+        if self.timestamp is not None:
+            message["timestamp"] = self.timestamp
+        if self.extra:
+            message.update(self.extra)
+        return message
+
+
+class ChatHistoryStore:
+    """
+    The chat_history table as ChatMessage records grouped by session.
+
+    Sessions are kept in the order they were last written, so the latest
+    session of a user is the last one in its group. Routes read messages
+    from here instead of loading and filtering the whole table, and only
+    build dicts for the messages they return.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._sessions = {}
+        self._user_sessions = {}
+        self._lock = threading.RLock()
+
+    # --- Maintenance ---
+
+    def rebuild(self, history: list, version=None):
+        with self._lock:
+            self._sessions = {}
+            self._user_sessions = {}
+            for message in history:
+                record = ChatMessage.from_dict(message)
+                key = (record.user_id, record.session_id)
+                records = self._sessions.pop(key, None)
+                if records is None:
+                    records = []
+                # Re-inserting moves the session behind everything written before it.
+                self._sessions[key] = records
+                user_sessions = self._user_sessions.setdefault(record.user_id, {})
+                user_sessions.pop(record.session_id, None)
+                user_sessions[record.session_id] = records
+                records.append(record)
+            self.version = version
+
+    def replace_session(self, user_id: str, session_id: str, messages: list, version=None):
+        self._apply(user_id, session_id, messages, version)
+
+    def remove_session(self, user_id: str, session_id: str, version=None):
+        self._apply(user_id, session_id, [], version)
+
+    def _apply(self, user_id: str, session_id: str, messages: list, version):
+        with self._lock:
+            if self.version is None:
+                # Not built yet: the first read loads the whole table anyway.
+                return
+            if version is not None and self.version != version - 1:
+                # A write we did not see happened in between; rebuild on next read.
+                self.version = None
+                return
+            self._sessions.pop((user_id, session_id), None)
+            user_sessions = self._user_sessions.get(user_id, {})
+            user_sessions.pop(session_id, None)
+            if messages:
+                records = [ChatMessage.from_dict(message) for message in messages]
+                self._sessions[(user_id, session_id)] = records
+                self._user_sessions.setdefault(user_id, {})[session_id] = records
+            elif not user_sessions:
+                self._user_sessions.pop(user_id, None)
+            self.version = version
+
+    # --- Reads ---
+
+    def latest_session_id(self, user_id: str):
+        with self._lock:
+            user_sessions = self._user_sessions.get(user_id)
+            return next(reversed(user_sessions)) if user_sessions else None
+
+    def session_messages(self, user_id: str, session_id: str) -> list:
+        with self._lock:
+            return list(self._user_sessions.get(user_id, {}).get(session_id, []))
+
+    def user_sessions(self, user_id: str) -> dict:
+        """
+        Returns {session_id: [ChatMessage, ...]} for one user.
+        """
+        with self._lock:
+            return {session_id: list(records) for session_id, records in self._user_sessions.get(user_id, {}).items()}
+
+    def message_count(self) -> int:
+        with self._lock:
+            return sum(len(records) for records in self._sessions.values())
+
+
+def in_session(user_id: str, session_id: str):
+    """
+    Returns a predicate matching the chat_history rows of one session, for
+    Database.replace_rows.
+    """
+    return lambda row: row.get("user_id") == user_id and row.get("session_id") == session_id
+
+
+_chat_history_store = None
+_chat_history_store_lock = threading.Lock()
+
+
+def get_chat_history_store() -> ChatHistoryStore:
+    """
+    Returns the shared chat history store, creating it on first use.
+    """
+    global _chat_history_store
+    with _chat_history_store_lock:
+        if _chat_history_store is None:
+            _chat_history_store = ChatHistoryStore()
+        return _chat_history_store
+
+
+def current_chat_history() -> ChatHistoryStore:
+    """
+    Returns the shared store, reloading it first if chat_history changed
+    outside the conversation routes (or it was never loaded).
+    """
+    store = get_chat_history_store()
+    version = Database.table_version("chat_history")
+    if store.version != version:
+        print("--- [CHAT HISTORY] Loading chat history records ---")
+        store.rebuild(Database.load_table("chat_history"), version)
+    return store
@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+CHAT_STREAM_BUFFER_EVENTS = int(os.getenv("CHAT_STREAM_BUFFER_EVENTS", "1024"))
+CHAT_STREAM_TTL_SECONDS = int(os.getenv("CHAT_STREAM_TTL_SECONDS", "300"))
+
+
+def parse_event_id(event_id):
+    """
+    Splits a chat event id ("<stream>:<seq>:<chars>") into its parts, or
+    returns None if it is not one.
+    """
+    parts = str(event_id or "").split(":")
+    if len(parts) != 3:
+        return None
+    try:
+        return parts[0], int(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+
+
+class ChatStream:
+    """
+    The events of one chat generation, kept so a client can reconnect.
+
+    The generation appends typed events (token, action, error, done) while
+    it runs, independent of any connection. The last CHAT_STREAM_BUFFER_EVENTS
+    events are kept in a ring buffer; all visible text and every action are
+    kept as well, so a client whose last event was already evicted still
+    catches up on the text and actions it missed.
+
+    Event ids carry the stream id, the event's sequence number and the
+    number of text characters sent up to and including it.
+    """
+
+    def __init__(self, session_id: str, capacity: int = CHAT_STREAM_BUFFER_EVENTS):
+        self.id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.text = ""
+        self.seq = 0
+        self.finished_at = None
+        self._events = deque(maxlen=capacity)
+        self._actions = []
+        self._condition = threading.Condition()
+        self._listeners = set()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def event_id(self, seq: int, chars: int) -> str:
+        return f"{self.id}:{seq}:{chars}"
+
+    def append(self, event: str, data: dict):
+        with self._condition:
+            if self.finished:
+                return
+            self.seq += 1
+            if event == "token":
+                self.text += data["text"]
+            entry = (self.seq, len(self.text), event, data)
+            self._events.append(entry)
+            if event == "action":
+                self._actions.append(entry)
+            if event == "done":
+                self.finished_at = time.monotonic()
+            self._condition.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def finish(self):
+        """
+        Ends the stream with a done event, unless it already has one.
+        """
+        self.append("done", {"chars": len(self.text)})
+
+    def events_after(self, seq: int, chars: int) -> list:
+        """
+        Returns (seq, chars, event, data) entries after the client's last
+        event. If some of them were evicted, the missed text is sent as
+        catch-up token events split around the missed actions, so every
+        id stays a valid point to resume from.
+        """
+        with self._condition:
+            if not self._events or self._events[0][0] <= seq + 1:
+                return [entry for entry in self._events if entry[0] > seq]
+            first_seq, first_chars, first_event, first_data = self._events[0]
+            text_before = first_chars - (len(first_data["text"]) if first_event == "token" else 0)
+            missed_actions = [entry for entry in self._actions if seq < entry[0] < first_seq]
+            entries = []
+            # Each catch-up token takes the id just before the event it
+            # precedes, with the text sent up to that event.
+            for next_seq, next_chars, *action in missed_actions + [(first_seq, text_before)]:
+                if next_chars > chars:
+                    entries.append((next_seq - 1, next_chars, "token", {"text": self.text[chars:next_chars]}))
+                    chars = next_chars
+                if action:
+                    entries.append((next_seq, next_chars, *action))
+            entries.extend(self._events)
+            return entries
+
+    def wait(self, seq: int, timeout: float) -> bool:
+        """
+        Waits until an event after `seq` is appended or the timeout passes.
+        """
+        with self._condition:
+            if self.seq <= seq and not self.finished:
+                self._condition.wait(timeout)
+            return self.seq > seq
+
+    def add_listener(self, listener):
+        """
+        Registers a callable run after every appended event; used by async
+        readers, which cannot block on the condition.
+        """
+        with self._condition:
+            self._listeners.add(listener)
+
+    def remove_listener(self, listener):
+        with self._condition:
+            self._listeners.discard(listener)
+
+
+class ChatStreamRegistry:
+    """
+    Chat streams by id, plus the latest stream of each session. Finished
+    streams are dropped CHAT_STREAM_TTL_SECONDS after their done event.
+    Streams live in the memory of the process that runs them, so a client
+    can only resume on the worker that started its stream.
+    """
+
+    def __init__(self, ttl_seconds: int = CHAT_STREAM_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._streams = {}
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def create(self, session_id: str) -> ChatStream:
+        stream = ChatStream(session_id)
+        with self._lock:
+            self._prune()
+            self._streams[stream.id] = stream
+            self._latest[session_id] = stream.id
+        return stream
+
+    def get(self, stream_id: str):
+        with self._lock:
+            self._prune()
+            return self._streams.get(stream_id)
+
+    def latest(self, session_id: str):
+        with self._lock:
+            self._prune()
+            return self._streams.get(self._latest.get(session_id))
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [
+            stream_id for stream_id, stream in self._streams.items()
+            if stream.finished and now - stream.finished_at > self.ttl_seconds
+        ]
+        for stream_id in expired:
+            stream = self._streams.pop(stream_id)
+            if self._latest.get(stream.session_id) == stream_id:
+                del self._latest[stream.session_id]
+
+    def resolve(self, session_id: str, resume_from):
+        """
+        Returns the stream a client resumes and the (seq, chars) position
+        of its last event. Without a Last-Event-ID it is the session's
+        latest stream, from the start. Returns (None, None) if the stream
+        is unknown or has expired.
+        """
+        parsed = parse_event_id(resume_from)
+        if parsed is None:
+            return self.latest(session_id), (0, 0)
+        stream_id, seq, chars = parsed
+        stream = self.get(stream_id)
+        if stream is None or stream.session_id != session_id:
+            return None, None
+        return stream, (seq, chars)
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Maximum prompt tokens (system prompt + history) sent per model.
+MODEL_CONTEXT_BUDGETS = {
+    "google/gemma-3-27b-it:free": 8192,
+}
+DEFAULT_CONTEXT_BUDGET = 8192
+
+# Flat cost charged for an image part, roughly what vision models bill per image.
+IMAGE_TOKENS = 258
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimates the token count of a text locally, without a tokenizer model.
+    Words are charged one token per four characters, punctuation one each,
+    which tracks BPE tokenizers closely enough for budgeting.
+    """
+    if not text:
+        return 0
+    return sum(math.ceil(len(piece) / 4) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def message_text(content) -> str:
+    """
+    Returns the text of a message's content, joining the text parts of
+    multimodal content.
+    """
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return content or ""
+
+
+def count_message_tokens(message: dict) -> int:
+    content = message.get("content")
+    tokens = 4  # role and message framing
+    if isinstance(content, list):
+        for part in content:
+            if part.get("type") == "text":
+                tokens += count_tokens(part.get("text", ""))
+            else:
+                tokens += IMAGE_TOKENS
+    else:
+        tokens += count_tokens(content)
+    return tokens
+
+
+def _truncate_text(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        used += math.ceil(len(match.group()) / 4)
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + " …"
+    return text
+
+
+def _truncate_message(message: dict, max_tokens: int) -> dict:
+    """
+    Shortens a message to roughly max_tokens. Images in truncated
+    messages are replaced by their text, since they are the costliest part.
+    """
+    truncated = dict(message)
+    text = message_text(message.get("content"))
+    truncated["content"] = _truncate_text(text, max_tokens)
+    return truncated
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    text = " ".join(text.split())
+    sentence = _SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rstrip() + "…"
+    return sentence
+
+
+def _update_digest(digest, message: dict):
+    serialized = json.dumps([message.get("role"), message.get("content")], sort_keys=True)
+    digest.update(serialized.encode("utf-8"))
+
+
+class ContextWindowManager:
+    """
+    Keeps the messages sent to the model within a per-model token budget.
+
+    The latest messages are kept verbatim; older ones are truncated more
+    aggressively the further back they are, and messages that no longer
+    fit are folded into a rolling extractive summary. Summaries are cached
+    per session and extended incrementally as more turns fall out of the
+    window, so no model call is needed to maintain them.
+    """
+
+    def __init__(
+        self,
+        budgets: dict = None,
+        keep_recent: int = 6,
+        summary_tokens: int = 512,
+        older_message_tokens: int = 256,
+        min_message_tokens: int = 48,
+        max_sessions: int = 256,
+    ):
+        self.budgets = budgets if budgets is not None else MODEL_CONTEXT_BUDGETS
+        self.keep_recent = keep_recent
+        self.summary_tokens = summary_tokens
+        self.older_message_tokens = older_message_tokens
+        self.min_message_tokens = min_message_tokens
+        self.max_sessions = max_sessions
+
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def budget_for(self, model: str) -> int:
+        override = os.getenv("CHAT_CONTEXT_BUDGET")
+        if override:
+            return int(override)
+        return self.budgets.get(model, DEFAULT_CONTEXT_BUDGET)
+
+    def build_messages(self, session_id: str, system_prompt: dict, messages: list, model: str) -> list:
+        """
+        Returns the message list to send: the system prompt, an optional
+        summary of older turns, and as much recent history as the budget allows.
+        """
+        budget = self.budget_for(model) - count_message_tokens(system_prompt)
+        message_tokens = [count_message_tokens(message) for message in messages]
+        if sum(message_tokens) <= budget:
+            return [system_prompt] + messages
+
+        # The latest message is always sent, even if it alone exceeds the budget.
+        history_budget = budget - self.summary_tokens
+        kept = [messages[-1]]
+        used = message_tokens[-1]
+        for age, index in enumerate(range(len(messages) - 2, -1, -1), start=1):
+            message = messages[index]
+            tokens = message_tokens[index]
+            if age >= self.keep_recent:
+                # Recency weighting: each older message gets half the allowance of the next.
+                allowance = max(
+                    self.min_message_tokens,
+                    self.older_message_tokens >> min(age - self.keep_recent, 16)
+                )
+                if tokens > allowance:
+                    message = _truncate_message(message, allowance)
+                    tokens = count_message_tokens(message)
+            if used + tokens > history_budget:
+                break
+            kept.append(message)
+            used += tokens
+
+        kept.reverse()
+        dropped = messages[:len(messages) - len(kept)]
+        api_messages = [system_prompt]
+        if dropped:
+            summary = self._summarize(session_id, dropped)
+            api_messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier part of this conversation:\n{summary}"
+            })
+        print(f"--- [CONTEXT] Sending {len(kept)}/{len(messages)} messages, {len(dropped)} summarized ---")
+        return api_messages + kept
+
+    def _summarize(self, session_id: str, dropped: list) -> str:
+        with self._lock:
+            cached = self._summaries.get(session_id)
+
+        # Reuse the cached summary if the turns it covers are unchanged
+        # (the client may have edited or removed earlier messages).
+        digest = hashlib.sha1()
+        if cached and cached["count"] <= len(dropped):
+            for message in dropped[:cached["count"]]:
+                _update_digest(digest, message)
+        if cached and cached["count"] <= len(dropped) and digest.hexdigest() == cached["digest"]:
+            lines = list(cached["lines"])
+            omitted = cached["omitted"]
+            new_messages = dropped[cached["count"]:]
+        else:
+            digest = hashlib.sha1()
+            lines = []
+            omitted = 0
+            new_messages = dropped
+
+        for message in new_messages:
+            _update_digest(digest, message)
+            text = message_text(message.get("content"))
+            if not text.strip():
+                continue
+            speaker = "Student" if message.get("role") == "user" else "Tutor"
+            lines.append(f"- {speaker}: {_first_sentence(text)}")
+
+        # Keep the most recent lines that fit the summary budget.
+        used = 0
+        first_kept = len(lines)
+        while first_kept > 0:
+            used += count_tokens(lines[first_kept - 1]) + 1
+            if used > self.summary_tokens:
+                break
+            first_kept -= 1
+        omitted += first_kept
+        lines = lines[first_kept:]
+
+        with self._lock:
+            self._summaries[session_id] = {
+                "count": len(dropped),
+                "digest": digest.hexdigest(),
+                "lines": lines,
+                "omitted": omitted,
+            }
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_sessions:
+                self._summaries.popitem(last=False)
+
+        if omitted:
+            lines = [f"- ({omitted} earlier points omitted)"] + lines
+        return "\n".join(lines)
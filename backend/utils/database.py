@@ -1,13 +1,47 @@
 import json
 import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process only, the thread lock is enough.
+    fcntl = None
+
+from .snapshot import SnapshotTable, write_snapshot, SNAPSHOT_EXTENSION
+from .table_versions import VersionCounters
+from .change_log import ChangeLog, diff_rows
 
 _BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(_BASE_DIR))
 
 
+def row_version(row: dict) -> int:
+    """
+    Returns a row's version; rows written before versions existed count as 1.
+    """
+    return row.get("version", 1)
+
+
+class VersionConflictError(Exception):
+    """
+    Raised when a conditional update names a row version that is no longer
+    current. `current` is the row as it is stored now.
+    """
+
+    def __init__(self, table_name: str, current: dict, expected_version: int):
+        super().__init__(
+            f"{table_name} row {current['id']} is at version {row_version(current)}, not {expected_version}."
+        )
+        self.current = current
+
+
 class Database:
     """
     A simple database implementation using JSON files.
+
+    With DATABASE_FORMAT=snapshot, tables are stored as memory-mapped
+    snapshot files (see utils/snapshot.py) next to the JSON paths instead.
     """
 
     tables = {
@@ -19,40 +53,195 @@ class Database:
         "chat_history": os.path.join(_PROJECT_ROOT, "database", "chat_history.json")
     }
 
+    storage_format = os.environ.get("DATABASE_FORMAT", "json")
+
+    # Shared by all worker processes; see utils/table_versions.py.
+    versions = VersionCounters(
+        os.path.join(_PROJECT_ROOT, "database", "table_versions"), list(tables)
+    )
+
+    # Row-level insert/update/delete events for /api/changes; see utils/change_log.py.
+    changes = ChangeLog(os.path.join(_PROJECT_ROOT, "database", "changes.jsonl"))
+
+    _snapshots = {}
+    _snapshot_lock = threading.Lock()
+    _write_locks = {name: threading.Lock() for name in tables}
+
+    @staticmethod
+    def table_path(table_name):
+        """
+        Returns the file that holds a table in the configured storage format.
+        """
+        path = Database.tables[table_name]
+        if Database.storage_format == "snapshot":
+            return os.path.splitext(path)[0] + SNAPSHOT_EXTENSION
+        return path
+
+    @staticmethod
+    def table_version(table_name):
+        """
+        Returns a counter that increases whenever the table is written, by
+        this process or any other worker. Reading it does not touch the
+        table file.
+        """
+        return Database.versions.get(table_name)
+
+    @staticmethod
+    def notify_changed(table_name):
+        """
+        Announces a table file that was replaced outside Database (e.g. by
+        a maintenance script), so every worker drops its cached copies.
+        """
+        version = Database.versions.bump(table_name)
+        Database.changes.append(table_name, version, [{"op": "reset"}])
+        return version
+
     @staticmethod
     def load_table(table_name):
         """
         Loads data from a table.
         If the table doesn't exist, returns an empty list.
         """
+        if Database.storage_format == "snapshot":
+            return list(Database.open_table(table_name))
         if os.path.exists(Database.tables[table_name]):
             with open(Database.tables[table_name], "r") as f:
                 return json.load(f)
         return []
 
+    @staticmethod
+    def open_table(table_name):
+        """
+        Returns the table as a sequence of rows. Snapshot tables are
+        memory-mapped and decode a row only when it is accessed; JSON tables
+        are loaded as a list.
+        """
+        if Database.storage_format != "snapshot":
+            return Database.load_table(table_name)
+        path = Database.table_path(table_name)
+        if not os.path.exists(path):
+            return []
+        version = Database.table_version(table_name)
+        with Database._snapshot_lock:
+            cached = Database._snapshots.get(table_name)
+            if cached is None or cached[0] != version or cached[1].path != path:
+                cached = (version, SnapshotTable(path))
+                Database._snapshots[table_name] = cached
+            return cached[1]
+
+    @staticmethod
+    def _write_table(table_name, data, changes):
+        # The new file is renamed into place before the version changes, so
+        # a worker that sees the new version never reads a partial file.
+        if Database.storage_format == "snapshot":
+            write_snapshot(Database.table_path(table_name), data)
+        else:
+            path = Database.tables[table_name]
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_path, path)
+        version = Database.versions.bump(table_name)
+        Database.changes.append(table_name, version, changes)
+
+    @staticmethod
+    @contextmanager
+    def write_lock(table_name):
+        """
+        Holds a table's write lock, shared with other worker processes
+        through a lock file next to the table.
+        """
+        with Database._write_locks[table_name], open(f"{Database.table_path(table_name)}.lock", "a") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
     @staticmethod
     def add_to_table(table_name, data, batch=False):
         """
         Adds data to a table.
         If batch is True, data is expected to be a list of items to append.
         """
-        # Load existing data
-        existing_data = Database.load_table(table_name)
-        
-        # Append new data
-        if batch:
-            existing_data.extend(data)
-        else:
-            existing_data.append(data)
+        with Database.write_lock(table_name):
+            # Load existing data
+            existing_data = Database.load_table(table_name)
+
+            # Append new data
+            new_rows = data if batch else [data]
+            existing_data.extend(new_rows)
+
+            # Write back the complete list
+            Database._write_table(table_name, existing_data, diff_rows([], new_rows))
 
-        # Write back the complete list
-        with open(Database.tables[table_name], "w") as f:
-            json.dump(existing_data, f, indent=2)
+    @staticmethod
+    def update_row(table_name, row_id, update, expected_version=None):
+        """
+        Replaces one row with `update(row)` and increments its version.
+
+        The table is re-read under its write lock, so updates to other rows
+        made since the caller last read it are kept. With expected_version,
+        the update is only applied while the row is still at that version;
+        otherwise VersionConflictError is raised. Returns (previous row,
+        updated row), or None if no row has that id.
+        """
+        with Database.write_lock(table_name):
+            rows = Database.load_table(table_name)
+            index = next((i for i, row in enumerate(rows) if row["id"] == row_id), None)
+            if index is None:
+                return None
+            current = rows[index]
+            if expected_version is not None and row_version(current) != expected_version:
+                raise VersionConflictError(table_name, current, expected_version)
+            updated = update(dict(current))
+            updated["version"] = row_version(current) + 1
+            rows[index] = updated
+            Database._write_table(table_name, rows, [{"op": "update", "row_id": row_id, "row": updated}])
+            return current, updated
+
+    @staticmethod
+    def delete_rows(table_name, predicate):
+        """
+        Deletes the rows for which `predicate(row)` is true and returns them.
+
+        Like update_row, the table is re-read under its write lock, so
+        concurrent updates to the remaining rows are kept. Nothing is
+        written when no row matches.
+        """
+        with Database.write_lock(table_name):
+            rows = Database.load_table(table_name)
+            kept, removed = [], []
+            for row in rows:
+                (removed if predicate(row) else kept).append(row)
+            if removed:
+                Database._write_table(table_name, kept, [{"op": "delete", "row_id": row["id"]} for row in removed])
+            return removed
+
+    @staticmethod
+    def replace_rows(table_name, predicate, new_rows, changes=None):
+        """
+        Replaces the rows for which `predicate(row)` is true with `new_rows`,
+        appended after the remaining rows. Returns the replaced rows.
+
+        Like delete_rows, the table is re-read under its write lock, so rows
+        written by other workers since the caller last read it are kept.
+        `changes` are logged for the write; by default they are derived
+        from the replaced and the new rows.
+        """
+        with Database.write_lock(table_name):
+            kept, removed = [], []
+            for row in Database.load_table(table_name):
+                (removed if predicate(row) else kept).append(row)
+            if changes is None:
+                changes = diff_rows(removed, list(new_rows))
+            Database._write_table(table_name, kept + list(new_rows), changes)
+            return removed
 
     @staticmethod
-    def save_table(table_name, data):
+    def save_table(table_name, data, changes=None):
         """
         Saves data to a table, overwriting the existing content.
+        Callers that know what they changed pass the row `changes` to log;
+        otherwise a reset is logged and change feed clients reload the table.
         """
-        with open(Database.tables[table_name], "w") as f:
-            json.dump(data, f, indent=2)
\ No newline at end of file
+        with Database.write_lock(table_name):
+            Database._write_table(table_name, data, changes or [{"op": "reset"}])
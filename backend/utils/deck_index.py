@@ -0,0 +1,103 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can could did do does for from had has have how i if in into is it its
+me my of on or our so than that the their them then there these they this to us was we were what
+when where which who why will with would you your about please help explain tell know want need
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """
+    Lowercases a text and splits it into index terms, dropping stopwords
+    and folding simple plurals ("decks" -> "deck").
+    """
+    terms = []
+    for word in _WORD_PATTERN.findall((text or "").lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class DeckIndex:
+    """
+    Keyword index over deck names and descriptions.
+
+    Built once per deck table version; `search` scores decks by the IDF
+    of matching terms, with name matches weighted above description matches.
+    """
+
+    NAME_WEIGHT = 2.0
+    DESCRIPTION_WEIGHT = 1.0
+
+    def __init__(self, decks: list):
+        self.decks = decks
+        self.postings = defaultdict(dict)
+
+        for position, deck in enumerate(decks):
+            weights = Counter()
+            for term in tokenize(deck.get("name", "")):
+                weights[term] += self.NAME_WEIGHT
+            for term in tokenize(deck.get("description", "")):
+                weights[term] += self.DESCRIPTION_WEIGHT
+            for term, weight in weights.items():
+                self.postings[term][position] = weight
+
+        deck_count = len(decks)
+        self.idf = {
+            term: math.log(1 + deck_count / len(postings))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query: str, top_k: int) -> list:
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, weight in self.postings[term].items():
+                scores[position] += weight * idf
+
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        return [self.decks[position] for position in ranked[:top_k]]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def _get_index(decks: list, decks_version) -> DeckIndex:
+    global _index, _index_version
+
+    with _index_lock:
+        if _index is None or _index_version != decks_version:
+            _index = DeckIndex(decks)
+            _index_version = decks_version
+        return _index
+
+
+def get_relevant_decks(decks: list, decks_version, query: str, top_k: int = 10) -> list:
+    """
+    Returns the decks most relevant to a query, at most top_k of them.
+    Small libraries are returned whole; the index is rebuilt only when the
+    deck table version changes.
+    """
+    if len(decks) <= top_k:
+        return decks
+    return _get_index(decks, decks_version).search(query, top_k)
+
+
+def search_decks(decks: list, decks_version, query: str, top_k: int = 10) -> list:
+    """
+    Returns only the decks that match the query, best first.
+    """
+    return _get_index(decks, decks_version).search(query, top_k)
@@ -0,0 +1,163 @@
+import bisect
+import threading
+import time
+from datetime import datetime, timezone
+
+from .database import Database
+
+# Days until a card is due again after a review, by difficulty. Matches the
+# scheduling used by the deck views in the frontend.
+REVIEW_INTERVAL_DAYS = {"HARD": 1, "MEDIUM": 3, "EASY": 7}
+DIFFICULTIES = ("EASY", "MEDIUM", "HARD")
+NEVER_REVIEWED = 0.0
+
+
+def parse_timestamp(value) -> float:
+    """
+    Returns a POSIX timestamp for an ISO date; naive dates are taken as UTC.
+    """
+    if not value:
+        return NEVER_REVIEWED
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return NEVER_REVIEWED
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class DeckStatsIndex:
+    """
+    Per-deck card aggregates kept up to date card by card.
+
+    For each deck it tracks the total and per-difficulty counts, plus sorted
+    lists of due times and review times. The due count for any moment is a
+    binary search, so listing decks never touches the flashcards table.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._cards = {}
+        self._decks = {}
+        self._lock = threading.RLock()
+
+    def _deck(self, deck_id):
+        return self._decks.setdefault(deck_id, {
+            "counts": dict.fromkeys(DIFFICULTIES, 0),
+            "due_times": [],
+            "review_times": [],
+        })
+
+    # --- Maintenance ---
+
+    def rebuild(self, cards: list, version=None):
+        with self._lock:
+            self._cards = {}
+            self._decks = {}
+            for card in cards:
+                self._add(card)
+            self.version = version
+
+    def add_cards(self, cards: list, version=None):
+        self._apply(cards, [], version)
+
+    def update_card(self, card: dict, version=None):
+        self._apply([card], [], version)
+
+    def remove_cards(self, card_ids: list, version=None):
+        self._apply([], card_ids, version)
+
+    def _apply(self, cards: list, removed_ids: list, version):
+        with self._lock:
+            if self.version is None:
+                # Not built yet: the first listing loads the whole table anyway.
+                return
+            if version is not None and self.version != version - 1:
+                # A write we did not see happened in between; rebuild on next listing.
+                self.version = None
+                return
+            for card_id in removed_ids:
+                self._remove(card_id)
+            for card in cards:
+                self._remove(card["id"])
+                self._add(card)
+            self.version = version
+
+    def _add(self, card: dict):
+        difficulty = card.get("difficulty", "EASY")
+        reviewed_at = parse_timestamp(card.get("last_reviewed"))
+        due_at = reviewed_at + REVIEW_INTERVAL_DAYS.get(difficulty, 1) * 86400
+        entry = (card["deck_id"], difficulty, due_at, reviewed_at)
+        self._cards[card["id"]] = entry
+
+        deck = self._deck(card["deck_id"])
+        deck["counts"][difficulty] = deck["counts"].get(difficulty, 0) + 1
+        bisect.insort(deck["due_times"], due_at)
+        bisect.insort(deck["review_times"], reviewed_at)
+
+    def _remove(self, card_id: int):
+        entry = self._cards.pop(card_id, None)
+        if entry is None:
+            return
+        deck_id, difficulty, due_at, reviewed_at = entry
+        deck = self._decks[deck_id]
+        deck["counts"][difficulty] -= 1
+        del deck["due_times"][bisect.bisect_left(deck["due_times"], due_at)]
+        del deck["review_times"][bisect.bisect_left(deck["review_times"], reviewed_at)]
+
+    # --- Reads ---
+
+    def deck_stats(self, deck_id: int, now: float = None) -> dict:
+        now = time.time() if now is None else now
+        with self._lock:
+            deck = self._decks.get(deck_id)
+            if deck is None:
+                deck = {"counts": dict.fromkeys(DIFFICULTIES, 0), "due_times": [], "review_times": []}
+            last_reviewed = deck["review_times"][-1] if deck["review_times"] else NEVER_REVIEWED
+            return {
+                "card_count": len(deck["due_times"]),
+                "easy_count": deck["counts"]["EASY"],
+                "medium_count": deck["counts"]["MEDIUM"],
+                "hard_count": deck["counts"]["HARD"],
+                "due_count": bisect.bisect_right(deck["due_times"], now),
+                "last_reviewed": (
+                    datetime.fromtimestamp(last_reviewed, tz=timezone.utc).isoformat()
+                    if last_reviewed > NEVER_REVIEWED else None
+                ),
+            }
+
+    def with_stats(self, decks: list, now: float = None) -> list:
+        """
+        Returns copies of deck dicts with their card aggregates added.
+        """
+        now = time.time() if now is None else now
+        return [{**deck, **self.deck_stats(deck["id"], now)} for deck in decks]
+
+
+_deck_stats_index = None
+_deck_stats_index_lock = threading.Lock()
+
+
+def get_deck_stats_index() -> DeckStatsIndex:
+    """
+    Returns the shared deck stats index, creating it on first use.
+    """
+    global _deck_stats_index
+    with _deck_stats_index_lock:
+        if _deck_stats_index is None:
+            _deck_stats_index = DeckStatsIndex()
+        return _deck_stats_index
+
+
+def with_deck_stats(decks: list) -> list:
+    """
+    Adds card aggregates to decks, rebuilding the shared index first if the
+    flashcards table changed outside FlashCardsTool (or it was never built).
+    """
+    index = get_deck_stats_index()
+    version = Database.table_version("flash_cards")
+    if index.version != version:
+        print("--- [DECK STATS] Building deck stats index ---")
+        index.rebuild(Database.load_table("flash_cards"), version)
+    return index.with_stats(decks)
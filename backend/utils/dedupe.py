@@ -0,0 +1,221 @@
+import re
+import threading
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 Jaccard almost always share a bucket.
+LSH_BANDS = 16
+SHINGLE_SIZE = 5
+DUPLICATE_THRESHOLD = 0.75
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_random = np.random.RandomState(1)
+_PERM_A = _random.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _random.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+def card_fingerprint_text(card: dict) -> str:
+    """
+    Returns the card's question and answer, lowercased with punctuation and
+    extra whitespace removed.
+    """
+    question = " ".join(_WORD_PATTERN.findall((card.get("question") or "").lower()))
+    answer = " ".join(_WORD_PATTERN.findall((card.get("answer") or "").lower()))
+    return f"{question} | {answer}"
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """
+    Returns the character n-grams of a normalized text. Character shingles
+    suit flashcards, whose questions are often only a few words long.
+    """
+    if len(text) <= size:
+        return {text} if text.strip(" |") else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash_signature(text: str):
+    """
+    Returns a MinHash signature of NUM_PERM uint64 values, or None for an
+    empty text.
+    """
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams)
+    )
+    # Universal hashing (a*x + b) mod p for every permutation at once;
+    # uint64 overflow only perturbs the hash family, as in datasketch.
+    with np.errstate(over="ignore"):
+        permuted = (hashes[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % _MERSENNE_PRIME
+    return np.bitwise_and(permuted, _MAX_HASH).min(axis=0)
+
+
+def estimated_similarity(signature_a, signature_b) -> float:
+    return float(np.count_nonzero(signature_a == signature_b)) / NUM_PERM
+
+
+class DuplicateIndex:
+    """
+    MinHash/LSH index over flashcard question and answer text.
+
+    Each signature is split into LSH_BANDS bands; cards sharing any band are
+    candidates, and candidates are confirmed by their estimated Jaccard
+    similarity. A lookup only touches the matching buckets, so checking a
+    new card does not compare it with the whole table.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD, bands: int = LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.version = None
+        self._signatures = {}
+        self._deck_ids = {}
+        self._buckets = [defaultdict(set) for _ in range(bands)]
+        self._lock = threading.RLock()
+
+    def _band_keys(self, signature) -> list:
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    # --- Maintenance ---
+
+    def rebuild(self, cards: list, version=None):
+        with self._lock:
+            self._signatures = {}
+            self._deck_ids = {}
+            self._buckets = [defaultdict(set) for _ in range(self.bands)]
+            for card in cards:
+                self.add_card(card)
+            self.version = version
+
+    def add_card(self, card: dict, signature=None):
+        if signature is None:
+            signature = minhash_signature(card_fingerprint_text(card))
+        with self._lock:
+            self.remove_cards([card["id"]])
+            if signature is None:
+                return
+            self._signatures[card["id"]] = signature
+            self._deck_ids[card["id"]] = card.get("deck_id")
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band][key].add(card["id"])
+
+    def remove_cards(self, card_ids: list):
+        with self._lock:
+            for card_id in card_ids:
+                signature = self._signatures.pop(card_id, None)
+                self._deck_ids.pop(card_id, None)
+                if signature is None:
+                    continue
+                for band, key in enumerate(self._band_keys(signature)):
+                    bucket = self._buckets[band].get(key)
+                    if bucket is not None:
+                        bucket.discard(card_id)
+                        if not bucket:
+                            del self._buckets[band][key]
+
+    def set_version(self, version):
+        """
+        Records the table version after this process's own write. A gap
+        means another write was missed, so the index is marked stale.
+        """
+        with self._lock:
+            self.version = version if self.version == version - 1 else None
+
+    def invalidate(self):
+        with self._lock:
+            self.version = None
+
+    # --- Lookup ---
+
+    def find_duplicates(self, signature, exclude_id=None, deck_id=None) -> list:
+        """
+        Returns (card_id, similarity) pairs at or above the threshold, most
+        similar first.
+        """
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates |= self._buckets[band].get(key, set())
+            candidates.discard(exclude_id)
+            matches = []
+            for card_id in candidates:
+                if deck_id is not None and self._deck_ids.get(card_id) != deck_id:
+                    continue
+                similarity = estimated_similarity(signature, self._signatures[card_id])
+                if similarity >= self.threshold:
+                    matches.append((card_id, similarity))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def duplicate_groups(self, deck_id=None, across_decks: bool = False) -> list:
+        """
+        Groups cards that are near-duplicates of each other (transitively),
+        within a deck unless across_decks is set. Each group is a sorted list
+        of card IDs with at least two members.
+        """
+        with self._lock:
+            parent = {}
+
+            def find(card_id):
+                while parent.get(card_id, card_id) != card_id:
+                    card_id = parent[card_id]
+                return card_id
+
+            for buckets in self._buckets:
+                for bucket in buckets.values():
+                    if len(bucket) < 2:
+                        continue
+                    members = sorted(
+                        card_id for card_id in bucket
+                        if deck_id is None or self._deck_ids.get(card_id) == deck_id
+                    )
+                    for i, card_id in enumerate(members):
+                        for other_id in members[i + 1:]:
+                            if not across_decks and self._deck_ids.get(card_id) != self._deck_ids.get(other_id):
+                                continue
+                            if find(card_id) == find(other_id):
+                                continue
+                            similarity = estimated_similarity(self._signatures[card_id], self._signatures[other_id])
+                            if similarity >= self.threshold:
+                                parent[find(other_id)] = find(card_id)
+
+            groups = defaultdict(list)
+            for card_id in parent:
+                groups[find(card_id)].append(card_id)
+            for root in list(groups):
+                if root not in groups[root]:
+                    groups[root].append(root)
+        return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+
+_duplicate_index = None
+_duplicate_index_lock = threading.Lock()
+
+
+def get_duplicate_index(cards: list = None, version=None) -> DuplicateIndex:
+    """
+    Returns the shared duplicate index. When the caller passes the current
+    flashcards table and its version, a stale index is rebuilt from it first.
+    """
+    global _duplicate_index
+    with _duplicate_index_lock:
+        if _duplicate_index is None:
+            _duplicate_index = DuplicateIndex()
+        index = _duplicate_index
+    if cards is not None and index.version != version:
+        print("--- [DEDUPE] Building flashcard duplicate index ---")
+        index.rebuild(cards, version)
+    return index
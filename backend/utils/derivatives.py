@@ -0,0 +1,133 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from .uploads import LocalUploadBackend
+
+# Derivative name -> (max width, max height, WebP quality)
+DERIVATIVES = {
+    "thumb": (320, 320, 70),
+    "web": (1280, 1280, 82),
+}
+DERIVATIVE_FORMAT = "webp"
+
+_UPLOAD_URL_PATTERN = re.compile(r"^(?P<prefix>.*/api/uploads/)(?P<hash>[0-9a-f]{64})(\.[a-z0-9]{1,10})?$")
+
+
+def derivative_name(content_hash: str, kind: str) -> str:
+    return f"{content_hash}.{kind}.{DERIVATIVE_FORMAT}"
+
+
+def build_derivatives(source_path: str) -> dict:
+    """
+    Builds every missing derivative of an uploaded image next to the original.
+    Runs inside a worker process, so it only takes and returns plain values.
+    Returns a mapping of derivative kind to file name.
+    """
+    from PIL import Image, ImageOps
+
+    directory = os.path.dirname(source_path)
+    content_hash = os.path.basename(source_path).split(".")[0]
+    built = {}
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        for kind, (max_width, max_height, quality) in DERIVATIVES.items():
+            name = derivative_name(content_hash, kind)
+            target_path = os.path.join(directory, name)
+            if not os.path.exists(target_path):
+                derivative = image.copy()
+                derivative.thumbnail((max_width, max_height), Image.LANCZOS)
+                tmp_path = f"{target_path}.part"
+                derivative.save(tmp_path, format=DERIVATIVE_FORMAT.upper(), quality=quality, method=4)
+                os.replace(tmp_path, target_path)
+            built[kind] = name
+
+    return built
+
+
+class DerivativePipeline:
+    """
+    Builds image derivatives (thumbnails, web-optimized copies) for local
+    uploads in a pool of worker processes, off the request path.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def submit(self, source_path: str):
+        """
+        Schedules derivative generation for an uploaded file and returns the future.
+        """
+        future = self._get_executor().submit(build_derivatives, source_path)
+        future.add_done_callback(self._log_result)
+        return future
+
+    @staticmethod
+    def _log_result(future):
+        error = future.exception()
+        if error:
+            print(f"--- [DERIVATIVES ERROR] Failed to build image derivatives: {error} ---")
+        else:
+            print(f"--- [DERIVATIVES] Built {', '.join(future.result().values())} ---")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_pipeline = None
+
+
+def get_derivative_pipeline() -> DerivativePipeline:
+    global _pipeline
+    if _pipeline is None:
+        max_workers = os.getenv("DERIVATIVE_WORKERS")
+        _pipeline = DerivativePipeline(int(max_workers) if max_workers else None)
+    return _pipeline
+
+
+def derivative_urls(image_url: str, backend: LocalUploadBackend = None) -> dict:
+    """
+    Maps an image URL served from /api/uploads to the URLs of its derivatives.
+    A derivative URL is None until it has been built, and for remote images.
+    """
+    urls = {kind: None for kind in DERIVATIVES}
+    match = _UPLOAD_URL_PATTERN.match(image_url or "")
+    if not match:
+        return urls
+
+    backend = backend or LocalUploadBackend()
+    for kind in DERIVATIVES:
+        name = derivative_name(match.group("hash"), kind)
+        path = backend.path_for(name)
+        if path and os.path.exists(path):
+            urls[kind] = match.group("prefix") + name
+    return urls
+
+
+def with_image_derivatives(flash_cards: list) -> list:
+    """
+    Returns copies of flashcard dicts with question/answer thumbnail and
+    web-optimized image URLs added, e.g. `question_thumb_url`.
+    """
+    backend = LocalUploadBackend()
+    enriched_cards = []
+    for card in flash_cards:
+        enriched_card = dict(card)
+        for side in ("question", "answer"):
+            urls = derivative_urls(card.get(f"{side}_image_url"), backend)
+            for kind, url in urls.items():
+                enriched_card[f"{side}_{kind}_url"] = url
+        enriched_cards.append(enriched_card)
+    return enriched_cards
@@ -0,0 +1,235 @@
+import hashlib
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class EmbeddingService:
+    """
+    In-process embedding service with dynamic micro-batching.
+
+    Concurrent `embed` calls are queued; a dedicated thread collects every
+    request that arrives within `max_wait` seconds of the first one (up to
+    `max_batch_size` texts) and encodes them in a single model call, so the
+    model's vectorized batch path is used under load. Vectors are cached by
+    a hash of the text, so repeated texts are never encoded twice.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        cache_size: int = 20000,
+        encode_fn=None,
+    ):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self._encode_fn = encode_fn
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._warm_up_requested = False
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "texts": 0,
+            "cache_hits": 0,
+            "batches": 0,
+            "encoded_texts": 0,
+            "encode_seconds": 0.0,
+        }
+        self._latencies = deque(maxlen=1000)
+        self._started_at = time.monotonic()
+
+    # --- Model ---
+
+    def load_model(self):
+        """
+        Loads the sentence-transformers model if it is not loaded yet.
+        """
+        with self._model_lock:
+            if self._model is None and self._encode_fn is None:
+                from sentence_transformers import SentenceTransformer
+                print(f"--- [EMBEDDINGS] Loading embedding model {self.model_name} ---")
+                self._model = SentenceTransformer(self.model_name)
+            return self._model
+
+    def _encode(self, texts: list) -> np.ndarray:
+        if self._encode_fn is not None:
+            return np.asarray(self._encode_fn(texts), dtype=np.float32)
+        model = self._model or self.load_model()
+        return model.encode(texts, batch_size=len(texts), convert_to_numpy=True).astype(np.float32)
+
+    def is_ready(self) -> bool:
+        return self._encode_fn is not None or self._model is not None
+
+    def warm_up(self):
+        """
+        Starts loading the model on the service thread without blocking.
+        """
+        if self.is_ready() or self._warm_up_requested:
+            return
+        self._warm_up_requested = True
+        self._ensure_thread()
+        self._queue.put(None)
+
+    # --- Public API ---
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        Returns one embedding row per text, blocking until they are ready.
+        """
+        started = time.monotonic()
+        keys = [hashlib.sha1(text.encode("utf-8")).hexdigest() for text in texts]
+        vectors = [None] * len(texts)
+        missing = {}
+
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    vectors[i] = vector
+                else:
+                    missing.setdefault(key, texts[i])
+
+        if missing:
+            future = Future()
+            self._ensure_thread()
+            self._queue.put((missing, future))
+            encoded = future.result()
+            for i, key in enumerate(keys):
+                if vectors[i] is None:
+                    vectors[i] = encoded[key]
+
+        with self._stats_lock:
+            self._counters["requests"] += 1
+            self._counters["texts"] += len(texts)
+            self._counters["cache_hits"] += len(texts) - sum(1 for key in keys if key in missing)
+            self._latencies.append(time.monotonic() - started)
+
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            counters = dict(self._counters)
+            latencies = sorted(self._latencies)
+        uptime = time.monotonic() - self._started_at
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        batches = counters["batches"]
+        return {
+            **counters,
+            "model": self.model_name,
+            "ready": self.is_ready(),
+            "cache_size": len(self._cache),
+            "queue_depth": self._queue.qsize(),
+            "avg_batch_size": counters["encoded_texts"] / batches if batches else 0.0,
+            "texts_per_second": counters["texts"] / uptime if uptime else 0.0,
+            "encode_texts_per_second": (
+                counters["encoded_texts"] / counters["encode_seconds"] if counters["encode_seconds"] else 0.0
+            ),
+            "latency_ms_p50": percentile(0.50),
+            "latency_ms_p95": percentile(0.95),
+        }
+
+    # --- Batching thread ---
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self, first):
+        batch = [first]
+        text_count = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while text_count < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                continue
+            batch.append(request)
+            text_count += len(request[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                # Warm-up request: load the model before real traffic arrives.
+                try:
+                    self.load_model()
+                except Exception as e:
+                    print(f"--- [EMBEDDINGS ERROR] Failed to load embedding model: {e} ---")
+                    self._warm_up_requested = False
+                continue
+
+            batch = self._collect_batch(first)
+            unique_texts = {}
+            for missing, _ in batch:
+                unique_texts.update(missing)
+
+            try:
+                started = time.monotonic()
+                vectors = self._encode(list(unique_texts.values()))
+                encode_seconds = time.monotonic() - started
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            encoded = dict(zip(unique_texts.keys(), vectors))
+            with self._cache_lock:
+                for key, vector in encoded.items():
+                    self._cache[key] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            with self._stats_lock:
+                self._counters["batches"] += 1
+                self._counters["encoded_texts"] += len(unique_texts)
+                self._counters["encode_seconds"] += encode_seconds
+
+            for missing, future in batch:
+                future.set_result({key: encoded[key] for key in missing})
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name: str = EMBEDDING_MODEL) -> EmbeddingService:
+    """
+    Returns the shared embedding service for a model, creating it on first use.
+    """
+    with _services_lock:
+        if model_name not in _services:
+            _services[model_name] = EmbeddingService(model_name=model_name)
+        return _services[model_name]
@@ -0,0 +1,206 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from .context_window import message_text
+from .database import Database
+from .deck_index import tokenize
+
+SNIPPET_RADIUS = 80
+SNIPPETS_PER_SESSION = 3
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def make_snippet(text: str, terms: set, radius: int = SNIPPET_RADIUS) -> str:
+    """
+    Returns the part of a message around its first matching term.
+    """
+    for match in _WORD_PATTERN.finditer(text):
+        if any(term in terms for term in tokenize(match.group(0))):
+            start = max(0, match.start() - radius)
+            end = min(len(text), match.end() + radius)
+            snippet = " ".join(text[start:end].split())
+            return f"{'...' if start else ''}{snippet}{'...' if end < len(text) else ''}"
+    return " ".join(text[:2 * radius].split())
+
+
+class HistoryIndex:
+    """
+    Inverted index over chat history message text, partitioned by user.
+
+    Each message is a document; a session is replaced as a whole when it is
+    saved and dropped when it is deleted, so the index follows the
+    chat_history table without re-reading it. Searches rank sessions by the
+    summed BM25 scores of their matching messages.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.version = None
+        self._messages = {}
+        self._sessions = {}
+        self._postings = defaultdict(lambda: defaultdict(dict))
+        self._user_lengths = defaultdict(lambda: [0, 0])
+        self._next_id = 0
+        self._lock = threading.RLock()
+
+    # --- Maintenance ---
+
+    def rebuild(self, history: list, version=None):
+        sessions = defaultdict(list)
+        for message in history:
+            sessions[(message.get("user_id"), message.get("session_id"))].append(message)
+        with self._lock:
+            self._messages = {}
+            self._sessions = {}
+            self._postings = defaultdict(lambda: defaultdict(dict))
+            self._user_lengths = defaultdict(lambda: [0, 0])
+            for (user_id, session_id), messages in sessions.items():
+                self._add_session(user_id, session_id, messages)
+            self.version = version
+
+    def replace_session(self, user_id: str, session_id: str, messages: list, version=None):
+        self._apply(user_id, session_id, messages, version)
+
+    def remove_session(self, user_id: str, session_id: str, version=None):
+        self._apply(user_id, session_id, [], version)
+
+    def _apply(self, user_id: str, session_id: str, messages: list, version):
+        with self._lock:
+            if self.version is None:
+                # Not built yet: the first search loads the whole table anyway.
+                return
+            if version is not None and self.version != version - 1:
+                # A write we did not see happened in between; rebuild on next search.
+                self.version = None
+                return
+            self._remove_session(user_id, session_id)
+            if messages:
+                self._add_session(user_id, session_id, messages)
+            self.version = version
+
+    def _add_session(self, user_id: str, session_id: str, messages: list):
+        message_ids = self._sessions.setdefault((user_id, session_id), [])
+        user_postings = self._postings[user_id]
+        lengths = self._user_lengths[user_id]
+        for message in messages:
+            text = message_text(message.get("content"))
+            terms = Counter(tokenize(text))
+            if not terms:
+                continue
+            message_id = self._next_id
+            self._next_id += 1
+            self._messages[message_id] = {
+                "user_id": user_id,
+                "session_id": session_id,
+                "role": message.get("role"),
+                "timestamp": message.get("timestamp"),
+                "text": text,
+                "terms": terms,
+                "length": sum(terms.values()),
+            }
+            message_ids.append(message_id)
+            lengths[0] += 1
+            lengths[1] += self._messages[message_id]["length"]
+            for term, count in terms.items():
+                user_postings[term][message_id] = count
+
+    def _remove_session(self, user_id: str, session_id: str):
+        message_ids = self._sessions.pop((user_id, session_id), [])
+        user_postings = self._postings.get(user_id)
+        lengths = self._user_lengths[user_id]
+        for message_id in message_ids:
+            message = self._messages.pop(message_id)
+            lengths[0] -= 1
+            lengths[1] -= message["length"]
+            for term in message["terms"]:
+                postings = user_postings[term]
+                postings.pop(message_id, None)
+                if not postings:
+                    del user_postings[term]
+
+    # --- Search ---
+
+    def search(self, user_id: str, query: str, limit: int = 20) -> list:
+        """
+        Returns the user's sessions matching the query, best first, each
+        with snippets from its best-matching messages.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            user_postings = self._postings.get(user_id)
+            message_count, total_length = self._user_lengths.get(user_id, (0, 0))
+            if not user_postings or not message_count:
+                return []
+            average_length = total_length / message_count or 1.0
+
+            message_scores = defaultdict(float)
+            for term in terms:
+                postings = user_postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (message_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for message_id, tf in postings.items():
+                    length = self._messages[message_id]["length"]
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    message_scores[message_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            session_matches = defaultdict(list)
+            for message_id, score in message_scores.items():
+                session_matches[self._messages[message_id]["session_id"]].append((score, message_id))
+
+            results = []
+            for session_id, matches in session_matches.items():
+                matches.sort(key=lambda match: (-match[0], match[1]))
+                session_messages = [self._messages[message_id] for message_id in self._sessions[(user_id, session_id)]]
+                results.append({
+                    "session_id": session_id,
+                    "score": sum(score for score, _ in matches),
+                    "match_count": len(matches),
+                    "timestamp": max((message["timestamp"] or "" for message in session_messages), default=None),
+                    "snippets": [
+                        {
+                            "role": self._messages[message_id]["role"],
+                            "timestamp": self._messages[message_id]["timestamp"],
+                            "snippet": make_snippet(self._messages[message_id]["text"], terms),
+                        }
+                        for _, message_id in matches[:SNIPPETS_PER_SESSION]
+                    ],
+                })
+
+        results.sort(key=lambda result: (-result["score"], result["session_id"]))
+        return results[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "messages": len(self._messages),
+                "sessions": len(self._sessions),
+                "users": len(self._postings),
+                "version": self.version,
+            }
+
+
+_history_index = HistoryIndex()
+
+
+def get_history_index() -> HistoryIndex:
+    return _history_index
+
+
+def search_history(user_id: str, query: str, limit: int = 20) -> list:
+    """
+    Searches the shared index, rebuilding it first if chat_history changed
+    outside the conversation routes (or the index was never built).
+    """
+    version = Database.table_version("chat_history")
+    if _history_index.version != version:
+        print("--- [SEARCH] Building chat history index ---")
+        _history_index.rebuild(Database.load_table("chat_history"), version)
+    return _history_index.search(user_id, query, limit=limit)
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process only, the thread lock is enough.
+    fcntl = None
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(_BASE_DIR))
+
+JOB_KEYS_PATH = os.path.join(_PROJECT_ROOT, "database", "job_keys.json")
+JOB_KEY_TTL_SECONDS = int(os.getenv("JOB_KEY_TTL_SECONDS", str(24 * 3600)))
+
+
+class IdempotencyKeys:
+    """
+    Idempotency keys of submitted jobs, kept for `ttl_seconds` after the
+    job was last updated (so well past its completion).
+
+    With a path, the keys live in a small JSON file that every worker
+    process reads and rewrites under an flock, so a retried request is
+    recognized whichever worker it reaches and across restarts. Without a
+    path they are kept in this process only.
+    """
+
+    def __init__(self, path: str = None, ttl_seconds: int = JOB_KEY_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def _update(self, change):
+        """
+        Applies `change(keys)` to the current, unexpired keys and stores
+        the result. Returns what `change` returns.
+        """
+        with self._lock:
+            if self.path is None:
+                self._prune(self._keys)
+                return change(self._keys)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    keys = {}
+                    if os.path.exists(self.path):
+                        with open(self.path, "r") as f:
+                            keys = json.load(f)
+                    self._prune(keys)
+                    result = change(keys)
+                    temp_path = f"{self.path}.tmp"
+                    with open(temp_path, "w") as f:
+                        json.dump(keys, f)
+                    os.replace(temp_path, self.path)
+                    return result
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _prune(self, keys: dict):
+        now = time.time()
+        for key in [key for key, record in keys.items() if now - record["updated_at"] > self.ttl_seconds]:
+            del keys[key]
+
+    def claim(self, key: str, job: dict):
+        """
+        Records `job` under `key` unless the key is already held, in which
+        case the existing record is returned instead.
+        """
+        def change(keys):
+            if key in keys:
+                return dict(keys[key])
+            keys[key] = {"job_id": job["id"], "kind": job["kind"], "status": job["status"],
+                         "session_id": job["session_id"], "updated_at": time.time()}
+            return None
+        return self._update(change)
+
+    def finish(self, key: str, job_id: str, status: str):
+        """
+        Marks the key's job as finished. A failed job releases its key so
+        the action can be submitted again.
+        """
+        def change(keys):
+            if keys.get(key, {}).get("job_id") != job_id:
+                return
+            if status == "failed":
+                del keys[key]
+            else:
+                keys[key].update(status=status, updated_at=time.time())
+        self._update(change)
+
+
+class JobQueue:
+    """
+    In-process job queue served by a pool of worker threads.
+
+    Jobs are dispatched to handlers registered per kind. Transient failures
+    are retried with exponential backoff; a ValueError is treated as a
+    permanent failure (invalid payload) and is not retried. Jobs of the same
+    kind run one at a time because their handlers rewrite whole tables.
+    Submitting a job with an idempotency key that was already seen returns
+    the existing job instead of running the handler again; see
+    IdempotencyKeys for how long and where keys are kept.
+    """
+
+    def __init__(self, workers: int = 2, max_attempts: int = 3, retry_delay: float = 1.0, max_jobs: int = 1000,
+                 idempotency_keys: IdempotencyKeys = None):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_jobs = max_jobs
+
+        self._handlers = {}
+        self._kind_locks = {}
+        self._jobs = OrderedDict()
+        self._idempotency_keys = idempotency_keys or IdempotencyKeys()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def register(self, kind: str, handler):
+        self._handlers[kind] = handler
+        self._kind_locks[kind] = threading.Lock()
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind: str, payload, idempotency_key: str = None, session_id: str = None) -> dict:
+        """
+        Queues a job and returns a snapshot of it.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'.")
+
+        now = datetime.utcnow().isoformat()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "attempts": 0,
+            "error": None,
+            "session_id": session_id,
+            "idempotency_key": idempotency_key,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if idempotency_key:
+            existing = self._idempotency_keys.claim(idempotency_key, job)
+            if existing:
+                print(f"--- [JOBS] Skipping duplicate {kind} job {existing['job_id']} ---")
+                with self._lock:
+                    existing_job = self._jobs.get(existing["job_id"])
+                    if existing_job:
+                        return dict(existing_job)
+                # Submitted by another worker, or finished and evicted here.
+                return {**job, "id": existing["job_id"], "status": existing["status"], "session_id": existing["session_id"]}
+
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._evict_finished_jobs()
+
+        self.start()
+        self._queue.put((job["id"], payload))
+        return dict(job)
+
+    def get_job(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_jobs(self, session_id: str = None) -> list:
+        with self._lock:
+            return [
+                dict(job) for job in self._jobs.values()
+                if session_id is None or job["session_id"] == session_id
+            ]
+
+    def _worker(self):
+        while True:
+            job_id, payload = self._queue.get()
+            try:
+                self._run(job_id, payload)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: str, payload):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["status"] = "running"
+            job["attempts"] += 1
+            job["updated_at"] = datetime.utcnow().isoformat()
+            kind = job["kind"]
+
+        try:
+            with self._kind_locks[kind]:
+                self._handlers[kind](payload)
+        except Exception as e:
+            retry = not isinstance(e, ValueError) and job["attempts"] < self.max_attempts
+            if not retry and job["idempotency_key"]:
+                self._idempotency_keys.finish(job["idempotency_key"], job_id, "failed")
+            with self._lock:
+                job["status"] = "queued" if retry else "failed"
+                job["error"] = str(e)
+                job["updated_at"] = datetime.utcnow().isoformat()
+            if retry:
+                delay = self.retry_delay * (2 ** (job["attempts"] - 1))
+                print(f"--- [JOBS] {kind} job {job_id} failed ({e}), retrying in {delay}s ---")
+                timer = threading.Timer(delay, self._queue.put, args=((job_id, payload),))
+                timer.daemon = True
+                timer.start()
+            else:
+                print(f"--- [JOBS ERROR] {kind} job {job_id} failed: {e} ---")
+            return
+
+        if job["idempotency_key"]:
+            self._idempotency_keys.finish(job["idempotency_key"], job_id, "succeeded")
+        with self._lock:
+            job["status"] = "succeeded"
+            job["error"] = None
+            job["updated_at"] = datetime.utcnow().isoformat()
+        print(f"--- [JOBS] {kind} job {job_id} succeeded ---")
+
+    def _evict_finished_jobs(self):
+        while len(self._jobs) > self.max_jobs:
+            finished_id = next(
+                (job_id for job_id, job in self._jobs.items() if job["status"] in ("succeeded", "failed")),
+                None
+            )
+            if finished_id is None:
+                return
+            # Its idempotency key outlives it; see IdempotencyKeys.
+            self._jobs.pop(finished_id)
+
+
+def make_idempotency_key(*parts) -> str:
+    """
+    Builds a stable key from the parts that identify an action,
+    e.g. the session ID, the action kind and its payload.
+    """
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,69 @@
+import threading
+import time
+
+
+class LazyResource:
+    """
+    A heavy subsystem (SDK client, model, vector store) created on first use.
+
+    The factory runs at most once, even under concurrent first calls.
+    `warm_up` creates it ahead of time and records failures instead of
+    raising, so it can run on a background thread at startup. `is_loaded`,
+    if given, reports a subsystem that was loaded without going through
+    this resource (e.g. by another component sharing it).
+    """
+
+    def __init__(self, name: str, factory, is_loaded=None):
+        self.name = name
+        self._factory = factory
+        self._is_loaded = is_loaded
+        self._value = None
+        self._state = "cold"
+        self._error = None
+        self._load_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._state == "ready" or (self._is_loaded is not None and self._is_loaded())
+
+    def get(self):
+        if self._state == "ready":
+            return self._value
+        with self._lock:
+            if self._state != "ready":
+                self._state = "loading"
+                started = time.monotonic()
+                try:
+                    self._value = self._factory()
+                except Exception as e:
+                    self._state = "failed"
+                    self._error = str(e)
+                    raise
+                self._load_seconds = time.monotonic() - started
+                self._state = "ready"
+                self._error = None
+                print(f"--- [STARTUP] {self.name} initialized in {self._load_seconds:.2f}s ---")
+        return self._value
+
+    def warm_up(self):
+        try:
+            self.get()
+        except Exception as e:
+            print(f"--- [STARTUP ERROR] Failed to initialize {self.name}: {e} ---")
+
+    def status(self) -> dict:
+        return {"state": "ready" if self.ready else self._state, "load_seconds": self._load_seconds, "error": self._error}
+
+
+def start_background_warm_up(resources: list) -> threading.Thread:
+    """
+    Initializes the given resources one after another on a daemon thread.
+    """
+    def warm_up_all():
+        for resource in resources:
+            resource.warm_up()
+
+    thread = threading.Thread(target=warm_up_all, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process only, the thread lock is enough.
+    fcntl = None
+
+from .embedding_service import EMBEDDING_MODEL, get_embedding_service
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(_BASE_DIR))
+
+MEMORY_DIR = os.path.join(_PROJECT_ROOT, "database", "memory")
+
+MAX_MEMORY_CHARS = 1000
+
+
+class LocalMemoryStore:
+    """
+    Long-term memory of past conversation turns, kept in a local vector index.
+
+    Each memory is one line in `records.jsonl` and one row of float32 values
+    in `vectors.f32`; both files are append-only, so adding a memory never
+    rewrites the index. Vectors are L2-normalized so search is a single
+    matrix-vector product over the user's rows.
+
+    Both files are appended under an flock, so line i of the records always
+    belongs to row i of the vectors, whichever worker wrote them. Rows added
+    by other workers are read before each search.
+    """
+
+    def __init__(self, path: str = MEMORY_DIR, embed_fn=None, model_name: str = EMBEDDING_MODEL):
+        self.path = path
+        self.model_name = model_name
+        self._embed_fn = embed_fn
+        # Without an explicit embed_fn, embeddings go through the shared
+        # micro-batching service for the model.
+        self._embedding_service = None if embed_fn else get_embedding_service(model_name)
+
+        self._records = []
+        self._vectors = None
+        self._size = 0
+        self._user_rows = {}
+        self._dim = None
+        self._records_offset = 0
+        self._model_mismatch = False
+
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-search")
+
+    # --- Embedding ---
+
+    def is_ready(self) -> bool:
+        return self._embedding_service is None or self._embedding_service.is_ready()
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        Returns L2-normalized float32 embeddings, one row per text.
+        """
+        if self._embedding_service is not None:
+            vectors = self._embedding_service.embed(texts)
+        else:
+            vectors = np.asarray(self._embed_fn(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    # --- Storage ---
+
+    @property
+    def _records_path(self):
+        return os.path.join(self.path, "records.jsonl")
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def _read_meta(self) -> bool:
+        """
+        Reads the vector dimension from meta.json; returns whether the
+        stored index can be used with this store's model.
+        """
+        if self._dim is not None:
+            return True
+        if self._model_mismatch or not os.path.exists(self._meta_path):
+            return False
+        with open(self._meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            print(f"--- [MEMORY] Index was built with {meta.get('model')}, not {self.model_name}; ignoring it ---")
+            self._model_mismatch = True
+            return False
+        self._dim = meta["dim"]
+        return True
+
+    def _load(self):
+        """
+        Reads the rows appended since the last read, by any worker.
+        """
+        if not self._read_meta():
+            return
+        row_bytes = self._dim * 4
+        vector_rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        if vector_rows <= self._size or not os.path.exists(self._records_path):
+            return
+
+        # Only rows with both a record and a vector are read; a writer may
+        # still be between its two appends.
+        new_records = []
+        with open(self._records_path, "rb") as f:
+            f.seek(self._records_offset)
+            for line in f:
+                if self._size + len(new_records) >= vector_rows or not line.endswith(b"\n"):
+                    break
+                self._records_offset += len(line)
+                new_records.append(json.loads(line))
+        if not new_records:
+            return
+        vectors = np.fromfile(
+            self._vectors_path, dtype=np.float32, count=len(new_records) * self._dim, offset=self._size * row_bytes
+        ).reshape(-1, self._dim)
+        for record, vector in zip(new_records, vectors):
+            self._add_row(record, vector)
+
+    def _add_row(self, record: dict, vector: np.ndarray):
+        # Grow the in-memory matrix geometrically instead of re-stacking per row.
+        if self._vectors is None:
+            self._vectors = np.empty((16, vector.shape[0]), dtype=np.float32)
+        elif self._size == len(self._vectors):
+            grown = np.empty((len(self._vectors) * 2, vector.shape[0]), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._vectors[self._size] = vector
+        self._records.append(record)
+        self._user_rows.setdefault(record["user_id"], []).append(self._size)
+        self._size += 1
+
+    def _append(self, record: dict, vector: np.ndarray):
+        os.makedirs(self.path, exist_ok=True)
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with open(os.path.join(self.path, "append.lock"), "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(self._meta_path):
+                    with open(self._meta_path, "w") as f:
+                        json.dump({"model": self.model_name, "dim": int(vector.shape[0])}, f)
+                if self._read_meta():
+                    # Read every complete row first; anything left past them
+                    # is a crashed append, cut off so the files stay aligned.
+                    self._load()
+                    for path, size in ((self._records_path, self._records_offset), (self._vectors_path, self._size * self._dim * 4)):
+                        if os.path.exists(path) and os.path.getsize(path) > size:
+                            os.truncate(path, size)
+                with open(self._vectors_path, "ab") as f:
+                    f.write(vector.astype(np.float32).tobytes())
+                with open(self._records_path, "ab") as f:
+                    f.write(line)
+                self._records_offset += len(line)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._add_row(record, vector)
+
+    # --- Public API ---
+
+    def add(self, user_id: str, text: str, session_id: str = None, kind: str = "turn") -> dict:
+        text = text[:MAX_MEMORY_CHARS]
+        vector = self.embed([text])[0]
+        record = {
+            "user_id": user_id,
+            "session_id": session_id,
+            "kind": kind,
+            "text": text,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            self._load()
+            self._append(record, vector)
+        return record
+
+    def add_turn(self, user_id: str, session_id: str, user_message: str, assistant_message: str) -> dict:
+        text = f"Student: {user_message}\nTutor: {assistant_message}"
+        return self.add(user_id, text, session_id=session_id, kind="turn")
+
+    def get_records(self, start: int = 0) -> list:
+        with self._lock:
+            self._load()
+            return list(self._records[start:])
+
+    def search(self, user_id: str, query: str, top_k: int = 5, min_score: float = 0.3) -> list:
+        """
+        Returns the user's memories most similar to the query, best first.
+        """
+        if not query or not query.strip():
+            return []
+        query_vector = self.embed([query])[0]
+        with self._lock:
+            self._load()
+            rows = self._user_rows.get(user_id)
+            if not rows:
+                return []
+            rows = np.asarray(rows)
+            scores = self._vectors[rows] @ query_vector
+            records = self._records
+
+        count = min(top_k, len(rows))
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {**records[rows[i]], "score": float(scores[i])}
+            for i in best if scores[i] >= min_score
+        ]
+
+    def search_within(self, user_id: str, query: str, top_k: int = 5, timeout: float = 0.15) -> list:
+        """
+        Like `search`, but gives up after `timeout` seconds so memory lookup
+        never delays a chat turn. While the embedding model is still loading,
+        it returns nothing and lets the model load in the background.
+        """
+        if not self.is_ready():
+            self._embedding_service.warm_up()
+            return []
+        future = self._executor.submit(self.search, user_id, query, top_k)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            print(f"--- [MEMORY] Memory search exceeded {timeout * 1000:.0f}ms budget, skipping ---")
+            return []
+        except Exception as e:
+            print(f"--- [MEMORY ERROR] Memory search failed: {e} ---")
+            return []
+
+
+def format_memories(memories: list) -> str:
+    """
+    Renders retrieved memories for the system prompt, one bullet each.
+    """
+    lines = []
+    for memory in memories:
+        date = memory.get("timestamp", "")[:10]
+        text = " ".join(memory["text"].split())
+        lines.append(f"- ({date}) {text}")
+    return "\n".join(lines)
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process only, the thread lock is enough.
+    fcntl = None
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(_BASE_DIR))
+
+QUIZ_ATTEMPTS_PATH = os.path.join(_PROJECT_ROOT, "database", "quiz_attempts.jsonl")
+
+
+def normalize_choice(choice) -> str:
+    return " ".join(str(choice or "").split()).lower()
+
+
+def grade_attempt(quiz: dict, answers) -> dict:
+    """
+    Grades submitted answers against each question's correct_answer.
+    `answers` is a list aligned with the questions or a dict keyed by
+    question index; unanswered questions count as wrong.
+    """
+    if isinstance(answers, dict):
+        answers = {int(index): answer for index, answer in answers.items()}
+    elif isinstance(answers, list):
+        answers = dict(enumerate(answers))
+    else:
+        raise ValueError("answers must be a list or an object keyed by question index.")
+
+    results = []
+    for index, question in enumerate(quiz["questions"]):
+        answer = answers.get(index)
+        results.append({
+            "question_index": index,
+            "answer": answer,
+            "correct_answer": question["correct_answer"],
+            "correct": answer is not None and normalize_choice(answer) == normalize_choice(question["correct_answer"]),
+        })
+
+    correct_count = sum(result["correct"] for result in results)
+    total = len(results)
+    return {
+        "correct_count": correct_count,
+        "total": total,
+        # Percent, like Quizz.best_score.
+        "score": round(100 * correct_count / total) if total else 0,
+        "results": results,
+    }
+
+
+class QuizAttemptLog:
+    """
+    Append-only log of graded quiz attempts with running aggregates.
+
+    Each attempt is one JSON line; recording an attempt appends that line
+    and folds it into per-quiz counters (completions, best and total score,
+    per-question accuracy), so quiz definitions are never rewritten. Appends
+    from all processes are serialized with an flock, and lines appended by
+    other processes are folded in on the next read.
+    """
+
+    def __init__(self, path: str = QUIZ_ATTEMPTS_PATH):
+        self.path = path
+        self._offset = 0
+        self._attempts = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _fold(self, attempt: dict):
+        stats = self._stats.setdefault(attempt["quiz_id"], {
+            "completed_times": 0,
+            "best_score": 0,
+            "total_score": 0,
+            "last_attempt_at": None,
+            "questions": {},
+        })
+        stats["completed_times"] += 1
+        stats["best_score"] = max(stats["best_score"], attempt["score"])
+        stats["total_score"] += attempt["score"]
+        stats["last_attempt_at"] = attempt["created_at"]
+        for result in attempt["results"]:
+            question = stats["questions"].setdefault(result["question_index"], [0, 0])
+            question[0] += 1
+            question[1] += int(result["correct"])
+        self._attempts.setdefault(attempt["quiz_id"], []).append(attempt)
+
+    def _catch_up(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A line another process is still writing; read it next time.
+                    break
+                self._offset += len(line)
+                if line.strip():
+                    self._fold(json.loads(line))
+
+    def record(self, quiz: dict, answers, user_id: str = None, duration_seconds: float = None) -> dict:
+        """
+        Grades and stores an attempt, returning it with its per-question results.
+        """
+        attempt = {
+            "id": uuid.uuid4().hex,
+            "quiz_id": quiz["id"],
+            "user_id": user_id,
+            "duration_seconds": duration_seconds,
+            "created_at": datetime.utcnow().isoformat(),
+            **grade_attempt(quiz, answers),
+        }
+        line = (json.dumps(attempt) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(self.path, "ab") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line)
+                f.flush()
+                # Other workers may have appended before this line, so the log
+                # is read back to its end (this attempt included) rather than
+                # assuming where the line landed.
+                self._catch_up()
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return attempt
+
+    def get_attempts(self, quiz_id: int, user_id: str = None) -> list:
+        with self._lock:
+            self._catch_up()
+            attempts = list(self._attempts.get(quiz_id, []))
+        if user_id is not None:
+            attempts = [attempt for attempt in attempts if attempt["user_id"] == user_id]
+        return attempts
+
+    def get_stats(self, quiz_id: int) -> dict:
+        with self._lock:
+            self._catch_up()
+            stats = self._stats.get(quiz_id)
+            if stats is None:
+                return {"completed_times": 0, "best_score": 0, "average_score": None, "last_attempt_at": None, "questions": []}
+            return {
+                "completed_times": stats["completed_times"],
+                "best_score": stats["best_score"],
+                "average_score": stats["total_score"] / stats["completed_times"],
+                "last_attempt_at": stats["last_attempt_at"],
+                "questions": [
+                    {"question_index": index, "attempts": attempts, "correct": correct, "accuracy": correct / attempts}
+                    for index, (attempts, correct) in sorted(stats["questions"].items())
+                ],
+            }
+
+    def with_stats(self, quizzes: list) -> list:
+        """
+        Returns copies of quiz dicts whose completed_times and best_score
+        include the logged attempts.
+        """
+        with self._lock:
+            self._catch_up()
+            enriched = []
+            for quiz in quizzes:
+                stats = self._stats.get(quiz["id"])
+                if stats is None:
+                    enriched.append(quiz)
+                    continue
+                enriched.append({
+                    **quiz,
+                    "completed_times": quiz.get("completed_times", 0) + stats["completed_times"],
+                    "best_score": max(quiz.get("best_score", 0), stats["best_score"]),
+                })
+            return enriched
@@ -0,0 +1,100 @@
+import math
+import random
+from collections import Counter
+
+import numpy as np
+
+from .deck_index import tokenize
+
+# Distractors from the quiz's own deck are preferred over equally similar
+# answers borrowed from other decks.
+SAME_DECK_BONUS = 1.0
+
+
+def normalize_answer(answer: str) -> str:
+    return " ".join((answer or "").lower().split())
+
+
+def tfidf_matrix(texts: list) -> np.ndarray:
+    """
+    Returns L2-normalized TF-IDF rows (sublinear tf, smoothed idf), one per text.
+    """
+    documents = [Counter(tokenize(text)) for text in texts]
+    vocabulary = {}
+    for document in documents:
+        for term in document:
+            vocabulary.setdefault(term, len(vocabulary))
+
+    matrix = np.zeros((len(texts), max(len(vocabulary), 1)), dtype=np.float32)
+    for row, document in enumerate(documents):
+        for term, count in document.items():
+            matrix[row, vocabulary[term]] = 1.0 + math.log(count)
+
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= (np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def embedding_matrix(texts: list, embed_fn) -> np.ndarray:
+    vectors = np.asarray(embed_fn(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def build_questions(
+    quiz_cards: list,
+    pool_cards: list,
+    num_options: int = 4,
+    embed_fn=None,
+    seed: int = None,
+) -> list:
+    """
+    Turns flashcards into multiple-choice questions.
+
+    Each card's answer is the correct option; distractors are the answers of
+    the most similar other cards in `pool_cards` (question and answer text,
+    by embeddings when embed_fn is given, TF-IDF otherwise). Similarities
+    for all questions come from one matrix product.
+    """
+    rng = random.Random(seed)
+    pool_texts = [f"{card['question']} {card['answer']}" for card in pool_cards]
+    vectors = embedding_matrix(pool_texts, embed_fn) if embed_fn else tfidf_matrix(pool_texts)
+
+    positions = {card["id"]: position for position, card in enumerate(pool_cards)}
+    rows = np.array([positions[card["id"]] for card in quiz_cards])
+    deck_ids = np.array([card["deck_id"] for card in pool_cards])
+
+    similarities = vectors[rows] @ vectors.T
+    similarities += SAME_DECK_BONUS * (deck_ids[None, :] == deck_ids[rows][:, None])
+    similarities[np.arange(len(rows)), rows] = -np.inf
+
+    # Look a little past num_options so repeated answers can be skipped.
+    candidate_count = min(len(pool_cards), num_options * 4)
+    candidates = np.argpartition(-similarities, candidate_count - 1, axis=1)[:, :candidate_count]
+
+    questions = []
+    for i, card in enumerate(quiz_cards):
+        ranked = candidates[i][np.argsort(-similarities[i, candidates[i]])]
+        seen = {normalize_answer(card["answer"])}
+        distractors = []
+        for position in ranked:
+            answer = pool_cards[position]["answer"]
+            key = normalize_answer(answer)
+            if key in seen or not np.isfinite(similarities[i, position]):
+                continue
+            seen.add(key)
+            distractors.append(answer)
+            if len(distractors) == num_options - 1:
+                break
+
+        options = [card["answer"]] + distractors
+        rng.shuffle(options)
+        questions.append({
+            "question_text": card["question"],
+            "options": options,
+            "correct_answer": card["answer"],
+        })
+    return questions
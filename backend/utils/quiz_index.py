@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+
+from .database import Database
+from .snapshot import SnapshotTable, encode_record, SNAPSHOT_EXTENSION
+
+QUIZ_INDEX_FILE = "quiz_index.json"
+
+SUMMARY_FIELDS = ("id", "title", "description", "difficulty", "time", "completed_times", "best_score", "question_count")
+
+
+def quiz_summary(quiz: dict) -> dict:
+    summary = {field: quiz.get(field) for field in SUMMARY_FIELDS if field != "question_count"}
+    summary["question_count"] = len(quiz.get("questions", []))
+    return summary
+
+
+class QuizIndex:
+    """
+    Side index over the quizzes table with one summary and one byte span per quiz.
+
+    Listings are served from the summaries and a single quiz is read by
+    seeking to its span, so neither parses the whole table. The index is
+    saved next to the table with the table version it describes; when the
+    version moves on, the table is scanned once to rebuild it. Quizzes
+    appended through QuizzTool are added without a rescan.
+
+    The table and index paths are looked up on every call, so the index
+    follows Database when its tables are moved (e.g. to a test directory).
+    """
+
+    def __init__(self, index_path: str = None):
+        self._index_path = index_path
+        self.version = None
+        self._table_path = None
+        self._entries = []
+        self._lock = threading.Lock()
+
+    @property
+    def table_path(self) -> str:
+        return Database.table_path("quizzes")
+
+    @property
+    def index_path(self) -> str:
+        return self._index_path or os.path.join(os.path.dirname(Database.tables["quizzes"]), QUIZ_INDEX_FILE)
+
+    # --- Maintenance ---
+
+    def _ensure_current(self):
+        table_path = self.table_path
+        version = Database.table_version("quizzes")
+        if self.version == version and self._table_path == table_path:
+            return
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    saved = json.load(f)
+                if saved.get("version") == version and saved.get("table") == os.path.basename(table_path):
+                    self._entries = saved["quizzes"]
+                    self.version, self._table_path = version, table_path
+                    return
+            except (ValueError, KeyError):
+                pass
+        self._rebuild(version, table_path)
+
+    def _rebuild(self, version, table_path):
+        # The version is read before the table, so a write that lands during
+        # the scan leaves the index stale rather than wrongly current.
+        print("--- [QUIZ INDEX] Rebuilding quiz summary index ---")
+        self._entries = []
+        exists = os.path.exists(table_path)
+        if exists and table_path.endswith(SNAPSHOT_EXTENSION):
+            # Snapshot records are compact JSON at known offsets already.
+            table = SnapshotTable(table_path)
+            self._entries = [
+                {**quiz_summary(table[i]), "span": list(table.record_span(i))}
+                for i in range(len(table))
+            ]
+            table.close()
+        elif exists:
+            with open(table_path, "rb") as f:
+                raw = f.read()
+            text = raw.decode("utf-8")
+            decoder = json.JSONDecoder()
+            position = text.index("[") + 1
+            byte_position = len(text[:position].encode("utf-8"))
+            while True:
+                # Skip whitespace and the separating comma between elements.
+                start = position
+                while start < len(text) and text[start] in " \t\r\n,":
+                    start += 1
+                if start >= len(text) or text[start] == "]":
+                    break
+                quiz, end = decoder.raw_decode(text, start)
+                byte_start = byte_position + len(text[position:start].encode("utf-8"))
+                byte_end = byte_start + len(text[start:end].encode("utf-8"))
+                self._entries.append({**quiz_summary(quiz), "span": [byte_start, byte_end]})
+                position, byte_position = end, byte_end
+        self.version, self._table_path = version, table_path
+        self._save()
+
+    def _save(self):
+        # Written to a temporary file first, so other workers never read a
+        # half-written index.
+        index_path = self.index_path
+        temp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"version": self.version, "table": os.path.basename(self._table_path), "quizzes": self._entries}, f)
+        os.replace(temp_path, index_path)
+
+    def append(self, quiz: dict, version: int):
+        """
+        Adds a quiz that Database.add_to_table just wrote as the table's last
+        element, at table version `version`. The index is only extended when
+        that write is the only one since the index was built; otherwise it
+        is marked stale and rebuilt on the next read.
+        """
+        with self._lock:
+            table_path = self.table_path
+            if self.version != version - 1 or self._table_path != table_path or not self._entries:
+                self.version = None
+                return
+            if table_path.endswith(SNAPSHOT_EXTENSION):
+                appended = self._append_snapshot(quiz, table_path)
+            else:
+                # The element is the last one in the file, just before "\n]".
+                element = json.dumps([quiz], indent=2)[len("[\n  "):-len("\n]")].encode("utf-8")
+                start = os.path.getsize(table_path) - len("\n]") - len(element)
+                self._entries.append({**quiz_summary(quiz), "span": [start, start + len(element)]})
+                appended = True
+            if not appended:
+                self.version = None
+                return
+            self.version = version
+            self._save()
+
+    def _append_snapshot(self, quiz: dict, table_path: str) -> bool:
+        table = SnapshotTable(table_path)
+        try:
+            if len(table) != len(self._entries) + 1 or table.raw(-1) != encode_record(quiz):
+                return False
+            # The longer offset index moved every record, so the spans are
+            # re-read from it; no record is decoded.
+            for i, entry in enumerate(self._entries):
+                entry["span"] = list(table.record_span(i))
+            self._entries.append({**quiz_summary(quiz), "span": list(table.record_span(-1))})
+            return True
+        finally:
+            table.close()
+
+    # --- Reads ---
+
+    def summaries(self) -> list:
+        with self._lock:
+            self._ensure_current()
+            return [
+                {field: value for field, value in entry.items() if field != "span"}
+                for entry in self._entries
+            ]
+
+    def get_quiz(self, quiz_id: int):
+        """
+        Returns one full quiz, reading only its bytes from the table.
+        """
+        with self._lock:
+            self._ensure_current()
+            entry = next((entry for entry in self._entries if entry["id"] == quiz_id), None)
+            if entry is None:
+                return None
+            start, end = entry["span"]
+            with open(self._table_path, "rb") as f:
+                f.seek(start)
+                return json.loads(f.read(end - start))
+
+
+_quiz_index = None
+_quiz_index_lock = threading.Lock()
+
+
+def get_quiz_index() -> QuizIndex:
+    """
+    Returns the shared quiz index, creating it on first use.
+    """
+    global _quiz_index
+    with _quiz_index_lock:
+        if _quiz_index is None:
+            _quiz_index = QuizIndex()
+        return _quiz_index
@@ -0,0 +1,313 @@
+import math
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .database import Database
+from .deck_index import tokenize
+from .embedding_service import EMBEDDING_MODEL, get_embedding_service
+
+# Reciprocal rank fusion constant: larger values flatten the rank curve.
+RRF_K = 60
+EMBED_CHUNK_SIZE = 256
+
+
+def card_text(card: dict) -> str:
+    return f"{card.get('question', '')}\n{card.get('answer', '')}"
+
+
+class CardSearchIndex:
+    """
+    Hybrid search index over flashcard questions and answers.
+
+    Keyword matching uses a BM25 inverted index; semantic matching uses an
+    L2-normalized embedding matrix searched with one matrix-vector product.
+    Both are updated card by card as FlashCardsTool writes, and rankings are
+    combined with reciprocal rank fusion. Cards waiting for an embedding are
+    still found by keyword; embeddings are computed on a background thread so
+    writes and searches never wait on the model.
+    """
+
+    def __init__(self, embed_fn=None, model_name: str = EMBEDDING_MODEL, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._embed_fn = embed_fn
+        self._embedding_service = None if embed_fn else get_embedding_service(model_name)
+
+        self.version = None
+        self._cards = {}
+        self._term_counts = {}
+        self._lengths = {}
+        self._postings = defaultdict(dict)
+        self._total_length = 0
+
+        self._vectors = None
+        self._row_ids = None
+        self._rows = {}
+        self._free_rows = []
+        self._size = 0
+        self._pending = set()
+        self._embedding_scheduled = False
+
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-embeddings")
+
+    # --- Maintenance ---
+
+    def rebuild(self, cards: list, version=None):
+        with self._lock:
+            self._cards = {}
+            self._term_counts = {}
+            self._lengths = {}
+            self._postings = defaultdict(dict)
+            self._total_length = 0
+            self._vectors = None
+            self._row_ids = None
+            self._rows = {}
+            self._free_rows = []
+            self._size = 0
+            self._pending = set()
+            for card in cards:
+                self._index_card(card)
+            self.version = version
+        self._schedule_embedding()
+
+    def add_cards(self, cards: list, version=None):
+        self._apply(cards, [], version)
+
+    def update_card(self, card: dict, version=None):
+        self._apply([card], [], version)
+
+    def remove_cards(self, card_ids: list, version=None):
+        self._apply([], card_ids, version)
+
+    def _apply(self, cards: list, removed_ids: list, version):
+        with self._lock:
+            if self.version is None:
+                # Not built yet: the first search loads the whole table anyway.
+                return
+            if version is not None and self.version != version - 1:
+                # A write we did not see happened in between; rebuild on next search.
+                self.version = None
+                return
+            for card_id in removed_ids:
+                self._unindex_card(card_id)
+            for card in cards:
+                self._index_card(card)
+            self.version = version
+        self._schedule_embedding()
+
+    def _index_card(self, card: dict):
+        card_id = card["id"]
+        previous = self._cards.get(card_id)
+        if previous is not None:
+            text_changed = card_text(previous) != card_text(card)
+            self._unindex_card(card_id, keep_vector=not text_changed)
+
+        terms = Counter(tokenize(card_text(card)))
+        self._cards[card_id] = card
+        self._term_counts[card_id] = terms
+        self._lengths[card_id] = sum(terms.values())
+        self._total_length += self._lengths[card_id]
+        for term, count in terms.items():
+            self._postings[term][card_id] = count
+        if card_id not in self._rows:
+            self._pending.add(card_id)
+
+    def _unindex_card(self, card_id: int, keep_vector: bool = False):
+        if card_id not in self._cards:
+            return
+        terms = self._term_counts.pop(card_id)
+        del self._cards[card_id]
+        self._total_length -= self._lengths.pop(card_id)
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(card_id, None)
+            if not postings:
+                del self._postings[term]
+        self._pending.discard(card_id)
+        if not keep_vector and card_id in self._rows:
+            row = self._rows.pop(card_id)
+            self._row_ids[row] = -1
+            self._free_rows.append(row)
+
+    # --- Embeddings ---
+
+    def semantic_ready(self) -> bool:
+        return self._embedding_service is None or self._embedding_service.is_ready()
+
+    def _embed(self, texts: list) -> np.ndarray:
+        if self._embedding_service is not None:
+            vectors = self._embedding_service.embed(texts)
+        else:
+            vectors = np.asarray(self._embed_fn(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _schedule_embedding(self):
+        with self._lock:
+            if not self._pending or self._embedding_scheduled or not self.semantic_ready():
+                return
+            self._embedding_scheduled = True
+        self._executor.submit(self._embed_pending)
+
+    def _embed_pending(self):
+        try:
+            while True:
+                with self._lock:
+                    chunk = [
+                        (card_id, card_text(self._cards[card_id]))
+                        for card_id in list(self._pending)[:EMBED_CHUNK_SIZE]
+                    ]
+                    if not chunk:
+                        self._embedding_scheduled = False
+                        return
+                vectors = self._embed([text for _, text in chunk])
+                with self._lock:
+                    for (card_id, text), vector in zip(chunk, vectors):
+                        card = self._cards.get(card_id)
+                        # Skip cards deleted or edited while they were being embedded.
+                        if card is None or card_text(card) != text or card_id not in self._pending:
+                            continue
+                        self._store_vector(card_id, vector)
+                        self._pending.discard(card_id)
+        except Exception as e:
+            print(f"--- [SEARCH ERROR] Failed to embed flashcards: {e} ---")
+            with self._lock:
+                self._embedding_scheduled = False
+
+    def _store_vector(self, card_id: int, vector: np.ndarray):
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            # Grow the matrix geometrically instead of re-stacking per card.
+            if self._vectors is None:
+                self._vectors = np.zeros((64, vector.shape[0]), dtype=np.float32)
+                self._row_ids = np.full(64, -1, dtype=np.int64)
+            elif self._size == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                self._row_ids = np.concatenate([self._row_ids, np.full(len(self._row_ids), -1, dtype=np.int64)])
+            row = self._size
+            self._size += 1
+        self._vectors[row] = vector
+        self._row_ids[row] = card_id
+        self._rows[card_id] = row
+
+    # --- Search ---
+
+    def _keyword_scores(self, query: str) -> dict:
+        count = len(self._cards)
+        if not count:
+            return {}
+        average_length = self._total_length / count or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for card_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[card_id] / average_length)
+                scores[card_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def _semantic_scores(self, query_vector: np.ndarray, limit: int) -> dict:
+        if self._vectors is None or not self._size:
+            return {}
+        row_ids = self._row_ids[:self._size]
+        similarities = self._vectors[:self._size] @ query_vector
+        similarities[row_ids < 0] = -np.inf
+        count = min(limit, self._size)
+        best = np.argpartition(-similarities, count - 1)[:count]
+        return {
+            int(row_ids[row]): float(similarities[row])
+            for row in best if row_ids[row] >= 0 and similarities[row] > 0
+        }
+
+    def search(self, query: str, top_k: int = 20, deck_id: int = None, mode: str = "hybrid") -> tuple:
+        """
+        Ranks cards for a query. Returns (results, mode actually used); each
+        result is the card plus its fused, keyword and semantic scores.
+        Falls back to keyword search while the embedding model is loading.
+        """
+        if mode not in ("hybrid", "keyword", "semantic"):
+            raise ValueError(f"Unknown search mode '{mode}'.")
+        if not query or not query.strip():
+            return [], mode
+
+        if mode != "keyword" and not self.semantic_ready():
+            self._embedding_service.warm_up()
+            mode = "keyword"
+        query_vector = self._embed([query])[0] if mode != "keyword" else None
+        self._schedule_embedding()
+
+        with self._lock:
+            keyword = self._keyword_scores(query) if mode != "semantic" else {}
+            # Over-fetch so deck filtering still leaves enough candidates.
+            semantic = (
+                self._semantic_scores(query_vector, max(top_k * 5, 100))
+                if query_vector is not None else {}
+            )
+            cards = self._cards
+
+            fused = defaultdict(float)
+            for scores in (keyword, semantic):
+                ranked = sorted(
+                    (card_id for card_id in scores if deck_id is None or cards[card_id]["deck_id"] == deck_id),
+                    key=lambda card_id: -scores[card_id]
+                )
+                for rank, card_id in enumerate(ranked):
+                    fused[card_id] += 1.0 / (RRF_K + rank + 1)
+
+            best = sorted(fused, key=lambda card_id: (-fused[card_id], card_id))[:top_k]
+            results = [
+                {
+                    **cards[card_id],
+                    "score": fused[card_id],
+                    "keyword_score": keyword.get(card_id),
+                    "semantic_score": semantic.get(card_id),
+                }
+                for card_id in best
+            ]
+        return results, mode
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cards": len(self._cards),
+                "terms": len(self._postings),
+                "embedded": len(self._rows),
+                "pending_embeddings": len(self._pending),
+                "version": self.version,
+            }
+
+
+_card_index = None
+_card_index_lock = threading.Lock()
+
+
+def get_card_search_index() -> CardSearchIndex:
+    """
+    Returns the shared flashcard search index, creating it on first use.
+    """
+    global _card_index
+    with _card_index_lock:
+        if _card_index is None:
+            _card_index = CardSearchIndex()
+        return _card_index
+
+
+def search_flash_cards(query: str, top_k: int = 20, deck_id: int = None, mode: str = "hybrid") -> tuple:
+    """
+    Searches the shared index, rebuilding it first if the flashcards table
+    changed outside FlashCardsTool (or the index was never built).
+    """
+    index = get_card_search_index()
+    version = Database.table_version("flash_cards")
+    if index.version != version:
+        print("--- [SEARCH] Building flashcard search index ---")
+        index.rebuild(Database.load_table("flash_cards"), version)
+    return index.search(query, top_k=top_k, deck_id=deck_id, mode=mode)
@@ -0,0 +1,90 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# Layout: header (magic, format version, record count), then count + 1
+# little-endian uint64 offsets, then the records as compact UTF-8 JSON one
+# after another. Record i is the bytes between offsets i and i + 1, relative
+# to the end of the offset index.
+SNAPSHOT_MAGIC = b"TBLS"
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_EXTENSION = ".snap"
+
+_HEADER = struct.Struct("<4sHxxQ")
+
+
+def encode_record(record) -> bytes:
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def write_snapshot(path: str, records) -> None:
+    """
+    Writes records as a snapshot file. The file is written next to `path`
+    and renamed over it, so readers never see a partial snapshot.
+    """
+    encoded = [encode_record(record) for record in records]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(record) for record in encoded], out=offsets[1:])
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, len(encoded)))
+        f.write(offsets.tobytes())
+        for record in encoded:
+            f.write(record)
+    os.replace(temp_path, path)
+
+
+class SnapshotTable:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Opening it reads only the header and the offset index; a record is
+    decoded when it is accessed, so a lookup by position touches only that
+    record's bytes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._map, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a table snapshot.")
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version} in {path}.")
+        # Copied so the map holds no exported buffers and can be closed.
+        self._offsets = np.frombuffer(self._map, dtype="<u8", count=count + 1, offset=_HEADER.size).copy()
+        self._data_start = _HEADER.size + 8 * (count + 1)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def record_span(self, index: int) -> tuple:
+        """
+        Returns the (start, end) byte positions of a record in the file.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("snapshot record index out of range")
+        return self._data_start + int(self._offsets[index]), self._data_start + int(self._offsets[index + 1])
+
+    def raw(self, index: int) -> bytes:
+        start, end = self.record_span(index)
+        return self._map[start:end]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return json.loads(self.raw(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        self._map.close()
@@ -0,0 +1,29 @@
+import json
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stops nginx from buffering the stream.
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(data, event: str = None, event_id=None) -> str:
+    """
+    Formats one server-sent event with a JSON payload.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def last_event_id(headers, params):
+    """
+    Returns the Last-Event-ID a client resumes from: the header browsers send
+    when EventSource reconnects, or a last_event_id query parameter for the
+    first connection.
+    """
+    return headers.get("Last-Event-ID") or params.get("last_event_id")
@@ -0,0 +1,75 @@
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process only, the thread lock is enough.
+    fcntl = None
+
+MAX_TABLES = 64
+_COUNTER = struct.Struct("<Q")
+
+
+class VersionCounters:
+    """
+    Per-table change counters shared by every process that serves the
+    database.
+
+    The counters live in a small file that each process memory-maps, so
+    reading a table's version is a memory read with no system call. A
+    writer increments the counter under an exclusive file lock after the
+    new table file is in place; other workers see the new value on their
+    next read and drop their cached copies.
+    """
+
+    def __init__(self, path: str, table_names: list):
+        self.path = path
+        self._slots = {name: slot for slot, name in enumerate(table_names)}
+        if len(self._slots) > MAX_TABLES:
+            raise ValueError(f"At most {MAX_TABLES} tables can have version counters.")
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _slot(self, table_name: str) -> int:
+        if table_name not in self._slots:
+            raise ValueError(f"Table '{table_name}' has no version counter.")
+        return self._slots[table_name] * _COUNTER.size
+
+    def _ensure_map(self):
+        if self._map is not None:
+            return self._map
+        with self._lock:
+            if self._map is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a+b") as f:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    # Zero-filled on first use; existing counters are kept.
+                    if os.fstat(f.fileno()).st_size < MAX_TABLES * _COUNTER.size:
+                        f.truncate(MAX_TABLES * _COUNTER.size)
+                    self._map = mmap.mmap(f.fileno(), MAX_TABLES * _COUNTER.size)
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+        return self._map
+
+    def get(self, table_name: str) -> int:
+        return _COUNTER.unpack_from(self._ensure_map(), self._slot(table_name))[0]
+
+    def bump(self, table_name: str) -> int:
+        """
+        Increments a table's counter and returns the new version.
+        """
+        counters = self._ensure_map()
+        offset = self._slot(table_name)
+        with self._lock, open(self.path, "r+b") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                version = _COUNTER.unpack_from(counters, offset)[0] + 1
+                _COUNTER.pack_into(counters, offset, version)
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return version
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+import tempfile
+
+import requests
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(_BASE_DIR))
+
+UPLOADS_DIR = os.path.join(_PROJECT_ROOT, "database", "uploads")
+CHUNK_SIZE = 64 * 1024
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Content hash, optionally followed by a derivative suffix and an extension.
+_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,10}){0,2}$")
+
+# The raster image types the local store accepts, by stored extension.
+IMAGE_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+
+class UnsupportedUploadError(ValueError):
+    """
+    Raised when an upload is not one of the accepted image types.
+    """
+
+
+class UploadTooLargeError(ValueError):
+    """
+    Raised when an upload is larger than UPLOAD_MAX_BYTES.
+    """
+
+
+def sniff_image_type(header: bytes):
+    """
+    Returns the stored extension for an image from its first bytes, or None
+    if the content is not one of IMAGE_TYPES. The client's file name and
+    MIME type are never trusted for this.
+    """
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if header.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return ".gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+class UploadBackend:
+    """
+    Base class for upload storage backends.
+
+    `save` consumes a binary stream and returns a dict with either a
+    public "url" (remote backends) or a local "name" that the API serves
+    itself, plus a "deduplicated" flag.
+    """
+
+    def save(self, stream, filename: str, mimetype: str = None) -> dict:
+        raise NotImplementedError
+
+
+class LocalUploadBackend(UploadBackend):
+    """
+    Content-addressed upload store on the local disk.
+
+    Files are streamed to a temporary file in chunks while being hashed,
+    then renamed to `<sha256><ext>` under a two-character shard directory.
+    Uploading the same bytes twice keeps a single copy. Only the image types
+    in IMAGE_TYPES are stored, and the extension comes from the content.
+    Uploads larger than `max_bytes` are stopped while streaming.
+    """
+
+    def __init__(self, root: str = UPLOADS_DIR, max_bytes: int = UPLOAD_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def path_for(self, name: str):
+        """
+        Returns the on-disk path for a stored file name, or None if the
+        name is not a valid content address.
+        """
+        if not _NAME_PATTERN.match(name):
+            return None
+        return os.path.join(self.root, name[:2], name)
+
+    def save(self, stream, filename: str, mimetype: str = None) -> dict:
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLargeError(f"File exceeds the upload limit of {self.max_bytes} bytes.")
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+
+            with open(tmp_path, "rb") as tmp_file:
+                ext = sniff_image_type(tmp_file.read(12))
+            if ext is None:
+                raise UnsupportedUploadError("Unsupported file type. Please upload a PNG, JPEG, GIF or WebP image.")
+
+            name = digest.hexdigest() + ext
+            path = self.path_for(name)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                return {"name": name, "deduplicated": True}
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            return {"name": name, "deduplicated": False}
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class ImgbbUploadBackend(UploadBackend):
+    """
+    Remote backend that forwards uploads to imgbb and returns its public URL.
+    """
+
+    url = "https://api.imgbb.com/1/upload"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def save(self, stream, filename: str, mimetype: str = None) -> dict:
+        files = {"image": (filename, stream, mimetype)}
+        response = requests.post(self.url, params={"key": self.api_key}, files=files)
+        response.raise_for_status()
+
+        result = response.json()
+        if not result.get("success"):
+            error_message = result.get("error", {}).get("message", "Unknown error from imgbb")
+            raise ValueError(f"Failed to upload to imgbb: {error_message}")
+        return {"url": result["data"]["url"], "deduplicated": False}
+
+
+def get_upload_backend() -> UploadBackend:
+    """
+    Returns the configured upload backend.
+    UPLOAD_BACKEND selects "local" (default) or "imgbb".
+    """
+    backend_name = os.getenv("UPLOAD_BACKEND", "local").lower()
+    if backend_name == "imgbb":
+        api_key = os.getenv("IMGBB_API_KEY")
+        if not api_key:
+            raise ValueError("IMGBB_API_KEY environment variable is not set")
+        return ImgbbUploadBackend(api_key)
+    return LocalUploadBackend()